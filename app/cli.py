@@ -0,0 +1,486 @@
+"""Command-line entry point: python -m app.cli <command>"""
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from app.config import settings
+from app.providers.local_fs import LocalFSAnnotationProvider, LocalFSImageProvider
+from app.services.model_factory import build_model_runner, build_onnx_runner, resolve_model_path
+
+logger = logging.getLogger(__name__)
+
+
+def _configure_logging() -> None:
+    level = getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO)
+    logging.basicConfig(level=level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+
+def _write_json(payload: Dict, path: str | None) -> None:
+    text = json.dumps(payload, indent=2, ensure_ascii=False)
+    if path:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(text + "\n", encoding="utf-8")
+        logger.info("Report written: %s", path)
+    else:
+        print(text)
+
+
+def _read_json(path: str) -> Any:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def _build_worker(data_path: str | None = None):
+    from app.services.model_worker import ModelWorker
+
+    return ModelWorker(
+        LocalFSImageProvider(data_path=data_path),
+        LocalFSAnnotationProvider(data_path=data_path),
+        build_model_runner(),
+        read_ahead=settings.DATASET_READ_AHEAD,
+        read_ahead_bytes=settings.DATASET_READ_AHEAD_BYTES,
+    )
+
+
+def _parse_thresholds(text: str | None) -> List[float]:
+    from app.services.payloads import parse_thresholds
+
+    return parse_thresholds(text)
+
+
+def cmd_quantize(args: argparse.Namespace) -> int:
+    from app.services.quantization import build_quantization_report, quantize_model
+
+    image_provider = LocalFSImageProvider(data_path=args.data_path)
+    annotation_provider = LocalFSAnnotationProvider(data_path=args.data_path)
+    fp32_path = Path(args.model) if args.model else resolve_model_path("fp32")
+    int8_path = Path(args.output) if args.output else resolve_model_path("int8")
+
+    quantize_model(
+        fp32_path,
+        int8_path,
+        mode=args.mode,
+        image_provider=image_provider,
+        calibration_size=args.calibration_size,
+        seed=args.seed,
+        img_size=settings.MODEL_IMG_SIZE,
+        letterbox=settings.MODEL_LETTERBOX,
+    )
+    logger.info("INT8 model written: %s", int8_path)
+    if args.skip_report:
+        return 0
+
+    report = build_quantization_report(
+        build_onnx_runner(fp32_path),
+        build_onnx_runner(int8_path),
+        image_provider,
+        annotation_provider,
+        latency_sample_size=args.latency_sample_size,
+        iou_threshold=args.iou_threshold,
+        class_aware=not args.class_agnostic,
+        seed=args.seed,
+    )
+    report["mode"] = args.mode
+    _write_json(report, args.report)
+    return 0
+
+
+def cmd_renditions(args: argparse.Namespace) -> int:
+    from app.services.renditions import build_rendition_service
+
+    image_provider = LocalFSImageProvider(data_path=args.data_path)
+    service = build_rendition_service(image_provider)
+    image_ids = args.image_ids or image_provider.list_image_ids()
+    levels = [int(level) for level in args.levels.split(",")] if args.levels else None
+    counters = service.pregenerate(
+        image_ids,
+        levels=levels,
+        tiles=args.tiles,
+        image_format=args.format,
+        quality=args.quality,
+    )
+    logger.info(
+        "Renditions generated: images=%d renditions=%d tiles=%d",
+        counters["images"],
+        counters["renditions"],
+        counters["tiles"],
+    )
+    return 0
+
+
+def cmd_inference_server(args: argparse.Namespace) -> int:
+    import signal
+
+    from app.infrastructure.inference_server import InferenceServer
+
+    model_path = Path(args.model) if args.model else resolve_model_path()
+    runner = build_onnx_runner(model_path)
+    runner.warmup(settings.MODEL_WARMUP_RUNS)
+    server = InferenceServer(
+        runner,
+        args.address,
+        authkey=settings.SECRET_KEY.encode("utf-8"),
+        max_batch=args.max_batch,
+        max_wait_ms=args.max_wait_ms,
+    )
+    signal.signal(signal.SIGTERM, lambda *_: server.stop())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+    return 0
+
+
+def cmd_evaluate(args: argparse.Namespace) -> int:
+    from functools import partial
+
+    from app.core.evaluation import STATE_VERSION
+    from app.core.sharding import parse_shard
+    from app.services.batch_evaluation import EvaluationCheckpoint, ProgressReporter, run_evaluation
+    from app.services.report_export import build_evaluation_tables, build_report_table, render_csv, render_xlsx
+
+    worker = _build_worker(args.data_path)
+    thresholds = _parse_thresholds(args.thresholds)
+    class_aware = not args.class_agnostic
+    image_ids = sorted(LocalFSImageProvider(data_path=args.data_path).list_image_ids())
+    if args.shard:
+        image_ids = parse_shard(args.shard).select(image_ids)
+    config = {
+        "iou_threshold": args.iou_threshold,
+        "class_aware": class_aware,
+        "thresholds": sorted(set(thresholds)),
+        "model_fingerprint": worker.model_fingerprint,
+        # Rows hold serialized counters: a layout change invalidates them.
+        "state_version": STATE_VERSION,
+    }
+    checkpoint = EvaluationCheckpoint(args.checkpoint, config, restart=args.restart)
+    progress = ProgressReporter(
+        len(image_ids),
+        done=sum(image_id in checkpoint.completed for image_id in image_ids),
+        interval_s=args.progress_interval,
+    )
+    logger.info(
+        "Evaluating: images=%d resumed=%d workers=%d checkpoint=%s",
+        len(image_ids),
+        progress.done,
+        args.workers,
+        args.checkpoint,
+    )
+    try:
+        result = run_evaluation(
+            partial(
+                worker.evaluate_item,
+                iou_threshold=args.iou_threshold,
+                class_aware=class_aware,
+                thresholds=thresholds,
+                allow_missing_annotations=args.allow_missing_annotations,
+            ),
+            image_ids,
+            checkpoint,
+            workers=args.workers,
+            progress=progress,
+        )
+    except KeyboardInterrupt:
+        logger.warning("Interrupted; rerun with the same --checkpoint to resume")
+        return 130
+    finally:
+        checkpoint.close()
+    progress.report()
+
+    rows = result.pop("images")
+    if args.report:
+        headers, data = build_report_table(rows)
+        render = render_csv if args.report.endswith(".csv") else render_xlsx
+        Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.report).write_bytes(render(headers, data, build_evaluation_tables(result)))
+        logger.info("Report written: %s", args.report)
+    _write_json(result, args.output)
+    return 1 if result["failed_count"] else 0
+
+
+def cmd_export(args: argparse.Namespace) -> int:
+    import tempfile
+
+    from app.core.sharding import parse_shard
+    from app.services.columnar_export import bundle_zip, write_columnar_export
+
+    worker = _build_worker(args.data_path)
+    image_ids = LocalFSImageProvider(data_path=args.data_path).iter_image_ids(ordered=True)
+    if args.shard:
+        image_ids = parse_shard(args.shard).iter_select(image_ids)
+    exported = 0
+
+    def analyze_all():
+        nonlocal exported
+        for result in worker.iter_analyze(
+            image_ids,
+            iou_threshold=args.iou_threshold,
+            class_aware=not args.class_agnostic,
+            allow_missing_annotations=True,
+        ):
+            exported += 1
+            yield result
+
+    results = analyze_all()
+    output = Path(args.output)
+    if output.suffix == ".zip":
+        with tempfile.TemporaryDirectory(prefix="export-") as tmp:
+            paths = write_columnar_export(results, tmp, args.format, batch_rows=args.batch_rows)
+            output.parent.mkdir(parents=True, exist_ok=True)
+            bundle_zip(paths, output)
+    else:
+        write_columnar_export(results, output, args.format, batch_rows=args.batch_rows)
+    logger.info("Columnar export written: path=%s format=%s images=%d", output, args.format, exported)
+    return 0
+
+
+def cmd_sample(args: argparse.Namespace) -> int:
+    snapshots = _build_worker(args.data_path).sample_dataset(
+        sample_size=args.size,
+        seed=args.seed,
+        stratify=args.stratify,
+        iou_threshold=args.iou_threshold,
+        class_aware=not args.class_agnostic,
+        confidence=args.confidence,
+        method=args.method,
+        resamples=args.resamples,
+        target_half_width=args.target_half_width,
+        report_every=args.report_every,
+    )
+    for snapshot in snapshots:
+        print(json.dumps(snapshot, ensure_ascii=False), flush=True)
+    return 0
+
+
+def cmd_evaluate_shard(args: argparse.Namespace) -> int:
+    from app.core.sharding import parse_shard
+
+    partial = _build_worker(args.data_path).evaluate_partial(
+        parse_shard(args.shard),
+        iou_threshold=args.iou_threshold,
+        thresholds=_parse_thresholds(args.thresholds),
+        allow_missing_annotations=args.allow_missing_annotations,
+    )
+    logger.info("Shard evaluated: shard=%s images=%d", partial["shard"], partial["evaluation"]["image_count"])
+    _write_json(partial, args.output)
+    return 0
+
+
+def _merged_report(partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    from app.core.sharding import merge_partials
+
+    merged = merge_partials(partials)
+    return {
+        "image_count": merged.image_count,
+        "processed_count": merged.image_count,
+        "shards": [partial["shard"] for partial in partials],
+        **merged.to_dict(),
+    }
+
+
+def cmd_merge_shards(args: argparse.Namespace) -> int:
+    _write_json(_merged_report([_read_json(path) for path in args.partials]), args.output)
+    return 0
+
+
+def _init_shard_process(settings_state: Dict[str, Any]) -> None:
+    # Spawned children re-read the environment; carry over the parent's settings.
+    for name, value in settings_state.items():
+        setattr(settings, name, value)
+    _configure_logging()
+
+
+def _evaluate_shard_process(shard: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    from app.core.sharding import parse_shard
+
+    worker = _build_worker(options["data_path"])
+    return worker.evaluate_partial(
+        parse_shard(shard),
+        iou_threshold=options["iou_threshold"],
+        thresholds=options["thresholds"],
+        allow_missing_annotations=options["allow_missing_annotations"],
+    )
+
+
+def run_sharded(
+    shards: int,
+    processes: int,
+    *,
+    data_path: str | None = None,
+    iou_threshold: float = 0.5,
+    thresholds: List[float] | None = None,
+    allow_missing_annotations: bool = False,
+    partials_dir: str | None = None,
+) -> Dict[str, Any]:
+    """Evaluate `shards` shards in `processes` local processes and merge them"""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    options = {
+        "data_path": data_path,
+        "iou_threshold": iou_threshold,
+        "thresholds": thresholds or [],
+        "allow_missing_annotations": allow_missing_annotations,
+    }
+    specs = [f"{index}/{shards}" for index in range(shards)]
+    with ProcessPoolExecutor(
+        max_workers=max(1, min(processes, shards)),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_shard_process,
+        initargs=(settings.model_dump(),),
+    ) as pool:
+        partials = list(pool.map(_evaluate_shard_process, specs, [options] * shards))
+    if partials_dir:
+        for index, partial in enumerate(partials):
+            _write_json(partial, str(Path(partials_dir) / f"shard-{index:04d}-of-{shards:04d}.json"))
+    return _merged_report(partials)
+
+
+def cmd_evaluate_sharded(args: argparse.Namespace) -> int:
+    report = run_sharded(
+        args.shards or args.processes,
+        args.processes,
+        data_path=args.data_path,
+        iou_threshold=args.iou_threshold,
+        thresholds=_parse_thresholds(args.thresholds),
+        allow_missing_annotations=args.allow_missing_annotations,
+        partials_dir=args.partials_dir,
+    )
+    _write_json(report, args.output)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=settings.APP_NAME)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    quantize = subparsers.add_parser(
+        "quantize",
+        help="Produce INT8 copy of the configured ONNX model and FP32/INT8 report",
+    )
+    quantize.add_argument("--model", help="FP32 model path (default: MODELS_PATH/MODEL_FILE)")
+    quantize.add_argument("--output", help="INT8 model path (default: <model>.int8.onnx)")
+    quantize.add_argument("--mode", choices=["dynamic", "static"], default="dynamic")
+    quantize.add_argument("--data-path", default=None, help="Dataset root (default: DATA_PATH)")
+    quantize.add_argument("--calibration-size", type=int, default=32)
+    quantize.add_argument("--latency-sample-size", type=int, default=32)
+    quantize.add_argument("--iou-threshold", type=float, default=0.5)
+    quantize.add_argument("--class-agnostic", action="store_true")
+    quantize.add_argument("--seed", type=int, default=0)
+    quantize.add_argument("--report", help="Report JSON path (default: stdout)")
+    quantize.add_argument("--skip-report", action="store_true")
+    quantize.set_defaults(handler=cmd_quantize)
+
+    renditions = subparsers.add_parser(
+        "renditions",
+        help="Pre-generate viewer renditions/tiles into the disk cache",
+    )
+    renditions.add_argument("image_ids", nargs="*", help="Image ids (default: all)")
+    renditions.add_argument("--data-path", default=None, help="Dataset root (default: DATA_PATH)")
+    renditions.add_argument("--levels", help="Comma-separated levels (default: all)")
+    renditions.add_argument("--tiles", action="store_true", help="Also generate tiles for each level")
+    renditions.add_argument("--format", choices=["webp", "jpeg"], default=settings.RENDITION_FORMAT)
+    renditions.add_argument("--quality", type=int, default=settings.RENDITION_QUALITY)
+    renditions.set_defaults(handler=cmd_renditions)
+
+    inference_server = subparsers.add_parser(
+        "inference-server",
+        help="Run the shared ONNX inference process for INFERENCE_MODE=server",
+    )
+    inference_server.add_argument("--model", help="Model path (default: per MODEL_PRECISION)")
+    inference_server.add_argument("--address", default=settings.INFERENCE_SERVER_ADDRESS)
+    inference_server.add_argument("--max-batch", type=int, default=settings.MODEL_BATCH_SIZE)
+    inference_server.add_argument("--max-wait-ms", type=float, default=settings.INFERENCE_SERVER_MAX_WAIT_MS)
+    inference_server.set_defaults(handler=cmd_inference_server)
+
+    evaluate = subparsers.add_parser(
+        "evaluate",
+        help="Evaluate the dataset without HTTP; resumable via a per-image checkpoint",
+    )
+    evaluate.add_argument("--data-path", default=None, help="Dataset root (default: DATA_PATH)")
+    evaluate.add_argument("--iou-threshold", type=float, default=0.5)
+    evaluate.add_argument("--class-agnostic", action="store_true", help="Per-image rows use class-agnostic matching")
+    evaluate.add_argument("--thresholds", help="Extra comma-separated IoU thresholds, e.g. 0.5,0.75")
+    evaluate.add_argument("--allow-missing-annotations", action="store_true")
+    evaluate.add_argument("--shard", help="Only this shard: index/count or start:end")
+    evaluate.add_argument("--workers", type=int, default=settings.ANALYSIS_BATCH_READ_WORKERS)
+    evaluate.add_argument("--checkpoint", default="./cache/evaluate.checkpoint.jsonl")
+    evaluate.add_argument("--restart", action="store_true", help="Discard the checkpoint and start over")
+    evaluate.add_argument("--progress-interval", type=float, default=2.0, help="Seconds between progress lines")
+    evaluate.add_argument("--report", help="Per-image report path (.xlsx or .csv)")
+    evaluate.add_argument("--output", help="Aggregate JSON path (default: stdout)")
+    evaluate.set_defaults(handler=cmd_evaluate)
+
+    export = subparsers.add_parser(
+        "export",
+        help="Write images/boxes/matches tables (Parquet or Arrow) for every box and match",
+    )
+    export.add_argument("--output", required=True, help="Directory for the tables, or a .zip path")
+    export.add_argument("--format", choices=["parquet", "arrow"], default="parquet")
+    export.add_argument("--data-path", default=None, help="Dataset root (default: DATA_PATH)")
+    export.add_argument("--iou-threshold", type=float, default=0.5)
+    export.add_argument("--class-agnostic", action="store_true")
+    export.add_argument("--shard", help="Only this shard: index/count or start:end")
+    export.add_argument("--batch-rows", type=int, default=settings.EXPORT_BATCH_ROWS)
+    export.set_defaults(handler=cmd_export)
+
+    sample = subparsers.add_parser(
+        "sample",
+        help="Stats over a seeded random sample; prints JSON lines as the intervals narrow",
+    )
+    sample.add_argument("--data-path", default=None, help="Dataset root (default: DATA_PATH)")
+    sample.add_argument("--size", type=int, default=None, help="Max images to sample (default: all)")
+    sample.add_argument("--seed", type=int, default=0)
+    sample.add_argument("--stratify", action="store_true", help="Sample each dominant expert class in proportion")
+    sample.add_argument("--iou-threshold", type=float, default=0.5)
+    sample.add_argument("--class-agnostic", action="store_true")
+    sample.add_argument("--confidence", type=float, default=0.95)
+    sample.add_argument("--method", choices=["bootstrap", "wilson"], default="bootstrap")
+    sample.add_argument("--resamples", type=int, default=1000, help="Bootstrap resamples (100-10000)")
+    sample.add_argument("--target-half-width", type=float, default=None, help="Stop once every interval is this tight")
+    sample.add_argument("--report-every", type=int, default=100, help="Images between progress lines")
+    sample.set_defaults(handler=cmd_sample)
+
+    evaluate_shard = subparsers.add_parser(
+        "evaluate-shard",
+        help="Evaluate one dataset shard and write its mergeable partial result",
+    )
+    evaluate_shard.add_argument("--shard", required=True, help="index/count (e.g. 2/8) or start:end id range")
+    evaluate_shard.add_argument("--output", help="Partial JSON path (default: stdout)")
+    merge_shards = subparsers.add_parser(
+        "merge-shards",
+        help="Merge shard partials into the single-run evaluation result",
+    )
+    merge_shards.add_argument("partials", nargs="+", help="Partial JSON files")
+    merge_shards.add_argument("--output", help="Report JSON path (default: stdout)")
+    merge_shards.set_defaults(handler=cmd_merge_shards)
+    evaluate_sharded = subparsers.add_parser(
+        "evaluate-sharded",
+        help="Evaluate the dataset in several local processes and merge the shards",
+    )
+    evaluate_sharded.add_argument("--processes", type=int, default=2)
+    evaluate_sharded.add_argument("--shards", type=int, help="Shard count (default: --processes)")
+    evaluate_sharded.add_argument("--partials-dir", help="Also keep each shard's partial JSON here")
+    evaluate_sharded.add_argument("--output", help="Report JSON path (default: stdout)")
+    for sharded in (evaluate_shard, evaluate_sharded):
+        sharded.add_argument("--data-path", default=None, help="Dataset root (default: DATA_PATH)")
+        sharded.add_argument("--iou-threshold", type=float, default=0.5)
+        sharded.add_argument("--thresholds", help="Extra comma-separated IoU thresholds, e.g. 0.5,0.75")
+        sharded.add_argument("--allow-missing-annotations", action="store_true")
+    evaluate_shard.set_defaults(handler=cmd_evaluate_shard)
+    evaluate_sharded.set_defaults(handler=cmd_evaluate_sharded)
+
+    return parser
+
+
+def main(argv: List[str] | None = None) -> int:
+    _configure_logging()
+    args = build_parser().parse_args(argv)
+    handler: Callable[[argparse.Namespace], int] = args.handler
+    return handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
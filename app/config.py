@@ -28,6 +28,9 @@ class Settings(BaseSettings):
     MODELS_PATH: str = "./models"
     IMAGES_DIR: str = "images"
     LABELS_DIR: str = "labels"
+    # Sorted image-id manifests for stable-order dataset scans (exports,
+    # shards); rebuilt when the images directory listing changes
+    IMAGE_MANIFEST_PATH: str = "./cache/manifests"
     MODEL_FILE: str = "yolov8n_bccd.onnx"
 
     # Model inference defaults
@@ -35,9 +38,106 @@ class Settings(BaseSettings):
     MODEL_CONF_THRESHOLD: float = 0.25
     MODEL_MAX_DET: int = 100
     MODEL_LETTERBOX: bool = False
+    # Serve INT8 copy produced by `python -m app.cli quantize`
+    MODEL_PRECISION: Literal["fp32", "int8"] = "fp32"
+    # Empty means "<MODEL_FILE stem>.int8.onnx" in MODELS_PATH
+    MODEL_INT8_FILE: str = ""
+    # Bind preallocated input/output buffers (ORT IOBinding) for single-image
+    # inference; models with dynamic output shapes fall back to session.run
+    MODEL_IO_BINDING: bool = True
+
+    # Tiled inference for large images (0 disables tiling)
+    MODEL_TILE_SIZE: int = 0
+    MODEL_TILE_OVERLAP: int = 64
+    MODEL_TILE_BATCH_SIZE: int = 4
+    MODEL_TILE_NMS_IOU: float = 0.5
+    # Region reads of JPEG/PNG/compressed TIFF decode the whole image (3 bytes
+    # per pixel); larger images are refused by tiling and viewer tiles
+    # (0 = no limit)
+    IMAGE_MAX_DECODED_PIXELS: int = 200_000_000
+
+    # Batch analysis (POST /api/v1/analysis/batch); batching needs a model
+    # exported with a dynamic batch dimension
+    MODEL_BATCH_SIZE: int = 8
+    ANALYSIS_BATCH_MAX_IMAGES: int = 256
+    ANALYSIS_BATCH_READ_WORKERS: int = 4
+
+    # Dataset runs (analysis, evaluation, export): image+label reads kept in
+    # flight ahead of inference, capped by buffered bytes (0 disables)
+    DATASET_READ_AHEAD: int = 8
+    DATASET_READ_AHEAD_BYTES: int = 256 * 1024 * 1024
+    # Threads behind the async provider methods (get_image_async, ...)
+    PROVIDER_IO_WORKERS: int = 8
+
+    # Parquet/Arrow export: rows per record batch (row group) and scratch
+    # directory for the tables before they are zipped (empty: system temp)
+    EXPORT_BATCH_ROWS: int = 65536
+    EXPORT_TMP_PATH: str = ""
+
+    # Model warm-up (background load + dummy inferences before /ready)
+    MODEL_WARMUP_RUNS: int = 3
+    MODEL_READY_TIMEOUT: float = 30.0
+    # Hot reload: poll the serving model file every N seconds and swap in a
+    # warmed copy when it changes (0 disables; POST /api/v1/admin/model/reload
+    # works either way)
+    MODEL_WATCH_INTERVAL: float = 0.0
+
+    # Runner selection: onnx (stub fallback when the model is missing), stub,
+    # or synthetic (random boxes + simulated latency for load tests)
+    MODEL_RUNNER: Literal["onnx", "stub", "synthetic"] = "onnx"
+    SYNTHETIC_BOX_COUNT: int = 20
+    SYNTHETIC_LATENCY_MS: float = 0.0
+    SYNTHETIC_JITTER_MS: float = 0.0
+
+    # Inference placement: local (session per API worker) or server (one
+    # `python -m app.cli inference-server` process shared by all workers;
+    # tensors travel through shared memory). Address is a Unix socket path
+    # or host:port; SECRET_KEY authenticates the connection.
+    INFERENCE_MODE: Literal["local", "server"] = "local"
+    INFERENCE_SERVER_ADDRESS: str = "./cache/inference.sock"
+    INFERENCE_SERVER_MAX_WAIT_MS: float = 2.0
+    INFERENCE_SHM_SLOTS: int = 4
     
+    # Viewer renditions (downscaled levels and tiles cached on disk)
+    RENDITION_CACHE_PATH: str = "./cache/renditions"
+    RENDITION_CACHE_MAX_BYTES: int = 1024 * 1024 * 1024
+    RENDITION_TILE_SIZE: int = 256
+    RENDITION_FORMAT: Literal["webp", "jpeg"] = "webp"
+    RENDITION_QUALITY: int = 80
+
+    # HTTP caching (max-age for image files, renditions and tiles)
+    HTTP_CACHE_MAX_AGE: int = 3600
+    # Dataset validators are reused while the images/labels directory mtime
+    # is unchanged, for at most this long (in-place file edits do not bump it)
+    DATASET_VERSION_TTL_S: float = 2.0
+
+    # Coalesce identical concurrent analysis/dataset/export computations
+    # (same image or dataset version, model fingerprint and parameters)
+    ANALYSIS_SINGLE_FLIGHT: bool = True
+
+    # Response compression (br if brotli is installed, else gzip)
+    RESPONSE_COMPRESSION_MIN_SIZE: int = 1024
+    RESPONSE_GZIP_LEVEL: int = 6
+    RESPONSE_BROTLI_QUALITY: int = 4
+
+    # Prometheus /metrics; for several uvicorn workers also set the
+    # PROMETHEUS_MULTIPROC_DIR environment variable to an empty directory
+    METRICS_ENABLED: bool = True
+
+    # Per-request profiling: profile=true adds stage timings, profile_dump=true
+    # also runs cProfile (top functions inline, .prof files in PROFILE_DUMP_PATH)
+    PROFILING_ENABLED: bool = False
+    PROFILE_TOP_N: int = 25
+    PROFILE_DUMP_PATH: str = ""
+    # Fraction of profile_dump requests that actually run cProfile
+    PROFILE_SAMPLE_RATE: float = 1.0
+    # Log stage breakdown for requests slower than this (0 disables)
+    SLOW_REQUEST_THRESHOLD_MS: float = 0.0
+
     # Security
     SECRET_KEY: str = "dev-secret-key"
+    # X-Admin-Token for /api/v1/admin/* (empty disables admin endpoints)
+    ADMIN_TOKEN: str = ""
 
     # Logging
     LOG_LEVEL: str = "INFO"
@@ -0,0 +1,151 @@
+"""Struct-of-arrays box container"""
+from typing import Any, Dict, Iterable, List, Sequence
+
+import numpy as np
+
+COORD_KEYS: Sequence[str] = ("x_center", "y_center", "width", "height")
+# float32 carries ~7 significant digits; rounding on export avoids
+# 0.10000000149011612-style noise in API payloads.
+_EXPORT_DECIMALS = 7
+
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    array.setflags(write=False)
+    return array
+
+
+class BoxSet:
+    """Boxes in normalized center format stored as parallel NumPy arrays.
+
+    class_id is int16, xywh is float32 (N, 4) with x_center, y_center, width,
+    height, and score is float32 (N,) or None for boxes without confidence
+    (expert annotations). Arrays are read-only so instances can be shared.
+    """
+
+    __slots__ = ("class_id", "xywh", "score")
+
+    def __init__(
+        self,
+        class_id: np.ndarray,
+        xywh: np.ndarray,
+        score: np.ndarray | None = None,
+    ) -> None:
+        class_id = np.asarray(class_id, dtype=np.int16).reshape(-1)
+        xywh = np.asarray(xywh, dtype=np.float32).reshape(-1, 4)
+        if xywh.shape[0] != class_id.shape[0]:
+            raise ValueError("class_id and xywh lengths differ")
+        if score is not None:
+            score = np.asarray(score, dtype=np.float32).reshape(-1)
+            if score.shape[0] != class_id.shape[0]:
+                raise ValueError("class_id and score lengths differ")
+            score = _readonly(score)
+        self.class_id = _readonly(class_id)
+        self.xywh = _readonly(xywh)
+        self.score = score
+
+    def __len__(self) -> int:
+        return int(self.class_id.shape[0])
+
+    def __repr__(self) -> str:
+        return f"BoxSet(n={len(self)}, scored={self.score is not None})"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, BoxSet):
+            return NotImplemented
+        if (self.score is None) != (other.score is None):
+            return False
+        return (
+            np.array_equal(self.class_id, other.class_id)
+            and np.array_equal(self.xywh, other.xywh)
+            and (self.score is None or np.array_equal(self.score, other.score))
+        )
+
+    @property
+    def nbytes(self) -> int:
+        score_bytes = self.score.nbytes if self.score is not None else 0
+        return self.class_id.nbytes + self.xywh.nbytes + score_bytes
+
+    @classmethod
+    def empty(cls, scored: bool = False) -> "BoxSet":
+        return cls(
+            np.empty(0, dtype=np.int16),
+            np.empty((0, 4), dtype=np.float32),
+            np.empty(0, dtype=np.float32) if scored else None,
+        )
+
+    @classmethod
+    def from_dicts(cls, boxes: Iterable[Dict[str, Any]]) -> "BoxSet":
+        rows = list(boxes)
+        if not rows:
+            return cls.empty()
+        class_id = [int(box.get("class_id", 0)) for box in rows]
+        xywh = [[float(box[key]) for key in COORD_KEYS] for box in rows]
+        scored = all("score" in box for box in rows)
+        score = [float(box["score"]) for box in rows] if scored else None
+        return cls(np.asarray(class_id), np.asarray(xywh), None if score is None else np.asarray(score))
+
+    @classmethod
+    def concat(cls, sets: Sequence["BoxSet"]) -> "BoxSet":
+        if not sets:
+            return cls.empty()
+        scored = all(item.score is not None for item in sets)
+        return cls(
+            np.concatenate([item.class_id for item in sets]),
+            np.concatenate([item.xywh for item in sets]),
+            np.concatenate([item.score for item in sets]) if scored else None,
+        )
+
+    def take(self, indices: np.ndarray) -> "BoxSet":
+        return BoxSet(
+            self.class_id[indices],
+            self.xywh[indices],
+            self.score[indices] if self.score is not None else None,
+        )
+
+    def xyxy(self, clip: bool = True) -> np.ndarray:
+        """Corner coordinates (float64), clipped to [0, 1] by default"""
+        xywh = self.xywh.astype(np.float64)
+        half = xywh[:, 2:] / 2
+        corners = np.concatenate([xywh[:, :2] - half, xywh[:, :2] + half], axis=1)
+        if clip:
+            np.clip(corners, 0.0, 1.0, out=corners)
+        return corners
+
+    def to_columns(self) -> Dict[str, Any]:
+        """Parallel lists per field (API boundary)"""
+        coords = self.xywh.astype(np.float64).round(_EXPORT_DECIMALS)
+        columns: Dict[str, Any] = {"class_id": self.class_id.tolist()}
+        for index, key in enumerate(COORD_KEYS):
+            columns[key] = coords[:, index].tolist()
+        if self.score is not None:
+            columns["score"] = self.score.astype(np.float64).round(_EXPORT_DECIMALS).tolist()
+        columns["count"] = len(self)
+        return columns
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """List of box dicts (API boundary)"""
+        coords = self.xywh.astype(np.float64).round(_EXPORT_DECIMALS).tolist()
+        class_ids = self.class_id.tolist()
+        if self.score is None:
+            return [
+                {
+                    "class_id": class_id,
+                    "x_center": x_center,
+                    "y_center": y_center,
+                    "width": width,
+                    "height": height,
+                }
+                for class_id, (x_center, y_center, width, height) in zip(class_ids, coords)
+            ]
+        scores = self.score.astype(np.float64).round(_EXPORT_DECIMALS).tolist()
+        return [
+            {
+                "class_id": class_id,
+                "x_center": x_center,
+                "y_center": y_center,
+                "width": width,
+                "height": height,
+                "score": score,
+            }
+            for class_id, (x_center, y_center, width, height), score in zip(class_ids, coords, scores)
+        ]
@@ -0,0 +1,239 @@
+"""Single-pass evaluation: class-aware and class-agnostic matching plus confusion matrix"""
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from app.core.boxes import BoxSet
+from app.core.iou import compute_iou_matrix
+from app.core.matcher import MatchResult, match_iou_matrix
+from app.core.metrics import _safe_div, build_stats_from_counts
+from app.core.sketches import DistributionSketches
+
+BACKGROUND = "background"
+# Bump when the serialized partial or checkpoint row layout changes; merge
+# refuses other versions.
+STATE_VERSION = 3
+
+
+@dataclass
+class ImageEvaluation:
+    """Both matching variants for one image, derived from one IoU matrix"""
+
+    class_aware: MatchResult
+    class_agnostic: MatchResult
+    iou_matrix: np.ndarray | None = None
+
+
+def evaluate_image(pred_boxes: BoxSet, gt_boxes: BoxSet, iou_threshold: float = 0.5) -> ImageEvaluation:
+    iou_matrix = compute_iou_matrix(pred_boxes, gt_boxes)
+    return ImageEvaluation(
+        class_aware=match_iou_matrix(
+            iou_matrix, pred_boxes.class_id, gt_boxes.class_id, iou_threshold, class_aware=True
+        ),
+        class_agnostic=match_iou_matrix(
+            iou_matrix, pred_boxes.class_id, gt_boxes.class_id, iou_threshold, class_aware=False
+        ),
+        iou_matrix=iou_matrix,
+    )
+
+
+def _count(values: np.ndarray) -> Counter:
+    labels, counts = np.unique(values, return_counts=True)
+    return Counter(dict(zip(labels.tolist(), counts.tolist())))
+
+
+class DatasetEvaluation:
+    """Mergeable per-class counters and confusion matrix over many images.
+
+    Per-class TP comes from class-aware matching. The confusion matrix comes
+    from class-agnostic matching: a matched pair counts at (gt class, pred
+    class), an unmatched prediction at (background, pred class) and an
+    unmatched ground truth at (gt class, background).
+
+    Optional `thresholds` add TP counters (class-aware and class-agnostic)
+    at further IoU thresholds, matched on the same IoU matrix. All counters
+    are integers, so merging partial results is exact; the distribution
+    sketches (IoU, scores and areas of class-aware matching) merge with
+    exact counts and histograms and approximate quantiles. With
+    `distributions=False` the sketches are skipped and left out of the state.
+    """
+
+    def __init__(
+        self, iou_threshold: float = 0.5, thresholds: Sequence[float] = (), distributions: bool = True
+    ) -> None:
+        self.iou_threshold = iou_threshold
+        self.thresholds = tuple(sorted({float(threshold) for threshold in thresholds}))
+        self.image_count = 0
+        self.tp_aware: Counter = Counter()
+        self.tp_agnostic = 0
+        self.pred_counts: Counter = Counter()
+        self.gt_counts: Counter = Counter()
+        # (gt label, pred label) -> count; labels are class ids or BACKGROUND.
+        self.confusion: Counter = Counter()
+        self.threshold_tp_aware: Counter = Counter()
+        self.threshold_tp_agnostic: Counter = Counter()
+        self.with_distributions = distributions
+        self.distributions = DistributionSketches()
+
+    def add(self, pred_boxes: BoxSet, gt_boxes: BoxSet, evaluation: ImageEvaluation | None = None) -> ImageEvaluation:
+        if evaluation is None:
+            evaluation = evaluate_image(pred_boxes, gt_boxes, self.iou_threshold)
+        self.image_count += 1
+        self.pred_counts.update(_count(pred_boxes.class_id))
+        self.gt_counts.update(_count(gt_boxes.class_id))
+
+        aware = evaluation.class_aware
+        self.tp_aware.update(_count(pred_boxes.class_id[aware.pred_index]))
+        if self.with_distributions:
+            self.distributions.add(pred_boxes, gt_boxes, aware)
+
+        agnostic = evaluation.class_agnostic
+        self.tp_agnostic += len(agnostic)
+        pairs = zip(
+            gt_boxes.class_id[agnostic.gt_index].tolist(),
+            pred_boxes.class_id[agnostic.pred_index].tolist(),
+        )
+        self.confusion.update(pairs)
+        self.confusion.update((BACKGROUND, label) for label in pred_boxes.class_id[agnostic.unmatched_pred].tolist())
+        self.confusion.update((label, BACKGROUND) for label in gt_boxes.class_id[agnostic.unmatched_gt].tolist())
+
+        if self.thresholds:
+            iou_matrix = evaluation.iou_matrix
+            if iou_matrix is None:
+                iou_matrix = compute_iou_matrix(pred_boxes, gt_boxes)
+            for threshold in self.thresholds:
+                self.threshold_tp_aware[threshold] += len(
+                    match_iou_matrix(iou_matrix, pred_boxes.class_id, gt_boxes.class_id, threshold, class_aware=True)
+                )
+                self.threshold_tp_agnostic[threshold] += len(
+                    match_iou_matrix(iou_matrix, pred_boxes.class_id, gt_boxes.class_id, threshold, class_aware=False)
+                )
+        return evaluation
+
+    def merge(self, other: "DatasetEvaluation") -> "DatasetEvaluation":
+        if other.iou_threshold != self.iou_threshold or other.thresholds != self.thresholds:
+            raise ValueError("Cannot merge evaluations with different IoU thresholds")
+        self.image_count += other.image_count
+        self.tp_aware.update(other.tp_aware)
+        self.tp_agnostic += other.tp_agnostic
+        self.pred_counts.update(other.pred_counts)
+        self.gt_counts.update(other.gt_counts)
+        self.confusion.update(other.confusion)
+        self.threshold_tp_aware.update(other.threshold_tp_aware)
+        self.threshold_tp_agnostic.update(other.threshold_tp_agnostic)
+        self.distributions.merge(other.distributions)
+        return self
+
+    @property
+    def class_ids(self) -> List[int]:
+        return sorted(set(self.pred_counts) | set(self.gt_counts))
+
+    def per_class(self) -> List[Dict[str, Any]]:
+        rows = []
+        for class_id in self.class_ids:
+            tp = self.tp_aware[class_id]
+            pred_count = self.pred_counts[class_id]
+            gt_count = self.gt_counts[class_id]
+            precision = _safe_div(tp, pred_count)
+            recall = _safe_div(tp, gt_count)
+            rows.append(
+                {
+                    "class_id": class_id,
+                    "expert_count": gt_count,
+                    "model_count": pred_count,
+                    "tp": tp,
+                    "fp": pred_count - tp,
+                    "fn": gt_count - tp,
+                    "precision": precision,
+                    "recall": recall,
+                    "f1": _safe_div(2 * precision * recall, precision + recall),
+                }
+            )
+        return rows
+
+    def confusion_matrix(self) -> Dict[str, Any]:
+        labels: List[Any] = [*self.class_ids, BACKGROUND]
+        return {
+            "labels": labels,
+            "rows": "expert",
+            "columns": "model",
+            "matrix": [[self.confusion[(row, column)] for column in labels] for row in labels],
+        }
+
+    def threshold_sweep(self) -> List[Dict[str, Any]]:
+        pred_total = sum(self.pred_counts.values())
+        gt_total = sum(self.gt_counts.values())
+        return [
+            {
+                "iou_threshold": threshold,
+                "class_aware": build_stats_from_counts(
+                    self.threshold_tp_aware[threshold], pred_total, gt_total, threshold, class_aware=True
+                ),
+                "class_agnostic": build_stats_from_counts(
+                    self.threshold_tp_agnostic[threshold], pred_total, gt_total, threshold, class_aware=False
+                ),
+            }
+            for threshold in self.thresholds
+        ]
+
+    def to_state(self) -> Dict[str, Any]:
+        """JSON-serializable counters; `from_state` restores an equal instance"""
+        state = {
+            "version": STATE_VERSION,
+            "iou_threshold": self.iou_threshold,
+            "thresholds": list(self.thresholds),
+            "image_count": self.image_count,
+            "tp_aware": sorted(self.tp_aware.items()),
+            "tp_agnostic": self.tp_agnostic,
+            "pred_counts": sorted(self.pred_counts.items()),
+            "gt_counts": sorted(self.gt_counts.items()),
+            "confusion": [[gt, pred, count] for (gt, pred), count in sorted(self.confusion.items(), key=str)],
+            "threshold_tp_aware": sorted(self.threshold_tp_aware.items()),
+            "threshold_tp_agnostic": sorted(self.threshold_tp_agnostic.items()),
+        }
+        if self.with_distributions:
+            state["distributions"] = self.distributions.to_state()
+        return state
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "DatasetEvaluation":
+        if state.get("version") != STATE_VERSION:
+            raise ValueError(f"Unsupported evaluation state version: {state.get('version')}")
+        evaluation = cls(state["iou_threshold"], state["thresholds"], distributions="distributions" in state)
+        evaluation.image_count = int(state["image_count"])
+        evaluation.tp_aware = Counter({int(label): count for label, count in state["tp_aware"]})
+        evaluation.tp_agnostic = int(state["tp_agnostic"])
+        evaluation.pred_counts = Counter({int(label): count for label, count in state["pred_counts"]})
+        evaluation.gt_counts = Counter({int(label): count for label, count in state["gt_counts"]})
+        evaluation.confusion = Counter({(gt, pred): count for gt, pred, count in state["confusion"]})
+        evaluation.threshold_tp_aware = Counter(
+            {float(threshold): count for threshold, count in state["threshold_tp_aware"]}
+        )
+        evaluation.threshold_tp_agnostic = Counter(
+            {float(threshold): count for threshold, count in state["threshold_tp_agnostic"]}
+        )
+        if evaluation.with_distributions:
+            evaluation.distributions = DistributionSketches.from_state(state["distributions"])
+        return evaluation
+
+    def to_dict(self) -> Dict[str, Any]:
+        pred_total = sum(self.pred_counts.values())
+        gt_total = sum(self.gt_counts.values())
+        result = {
+            "image_count": self.image_count,
+            "class_aware": build_stats_from_counts(
+                sum(self.tp_aware.values()), pred_total, gt_total, self.iou_threshold, class_aware=True
+            ),
+            "class_agnostic": build_stats_from_counts(
+                self.tp_agnostic, pred_total, gt_total, self.iou_threshold, class_aware=False
+            ),
+            "per_class": self.per_class(),
+            "confusion_matrix": self.confusion_matrix(),
+        }
+        if self.with_distributions:
+            result["distributions"] = self.distributions.to_dict()
+        if self.thresholds:
+            result["thresholds"] = self.threshold_sweep()
+        return result
@@ -1,6 +1,10 @@
 """IoU utilities"""
 from typing import Dict, Tuple
 
+import numpy as np
+
+from app.core.boxes import BoxSet
+
 
 def _to_xyxy(box: Dict[str, float]) -> Tuple[float, float, float, float] | None:
     try:
@@ -56,3 +60,32 @@ def compute_iou(box_a: Dict[str, float], box_b: Dict[str, float]) -> float:
         return 0.0
 
     return inter_area / union
+
+
+def compute_iou_matrix(boxes_a: BoxSet, boxes_b: BoxSet) -> np.ndarray:
+    """Pairwise IoU (len(a), len(b)) for boxes in normalized center format.
+
+    Matches compute_iou: boxes are clipped to [0, 1] and degenerate boxes
+    have IoU 0 with everything.
+    """
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float64)
+
+    xyxy_a = boxes_a.xyxy()
+    xyxy_b = boxes_b.xyxy()
+    valid_a = (boxes_a.xywh[:, 2] > 0) & (boxes_a.xywh[:, 3] > 0)
+    valid_a &= (xyxy_a[:, 2] > xyxy_a[:, 0]) & (xyxy_a[:, 3] > xyxy_a[:, 1])
+    valid_b = (boxes_b.xywh[:, 2] > 0) & (boxes_b.xywh[:, 3] > 0)
+    valid_b &= (xyxy_b[:, 2] > xyxy_b[:, 0]) & (xyxy_b[:, 3] > xyxy_b[:, 1])
+
+    inter_w = np.minimum(xyxy_a[:, None, 2], xyxy_b[None, :, 2]) - np.maximum(xyxy_a[:, None, 0], xyxy_b[None, :, 0])
+    inter_h = np.minimum(xyxy_a[:, None, 3], xyxy_b[None, :, 3]) - np.maximum(xyxy_a[:, None, 1], xyxy_b[None, :, 1])
+    inter = np.clip(inter_w, 0.0, None) * np.clip(inter_h, 0.0, None)
+
+    area_a = (xyxy_a[:, 2] - xyxy_a[:, 0]) * (xyxy_a[:, 3] - xyxy_a[:, 1])
+    area_b = (xyxy_b[:, 2] - xyxy_b[:, 0]) * (xyxy_b[:, 3] - xyxy_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    iou = np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+    iou[~valid_a, :] = 0.0
+    iou[:, ~valid_b] = 0.0
+    return iou
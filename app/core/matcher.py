@@ -1,46 +1,109 @@
 """Box matching utilities"""
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List
 
-from app.core.iou import compute_iou
+import numpy as np
+
+from app.core.boxes import BoxSet
+from app.core.iou import compute_iou_matrix
+
+
+class MatchResult:
+    """Greedy matching result as parallel index arrays"""
+
+    __slots__ = ("pred_index", "gt_index", "iou", "unmatched_pred", "unmatched_gt")
+
+    def __init__(
+        self,
+        pred_index: np.ndarray,
+        gt_index: np.ndarray,
+        iou: np.ndarray,
+        unmatched_pred: np.ndarray,
+        unmatched_gt: np.ndarray,
+    ) -> None:
+        self.pred_index = pred_index
+        self.gt_index = gt_index
+        self.iou = iou
+        self.unmatched_pred = unmatched_pred
+        self.unmatched_gt = unmatched_gt
+
+    def __len__(self) -> int:
+        return int(self.pred_index.shape[0])
+
+    def to_columns(self) -> Dict[str, Any]:
+        return {
+            "pred_index": self.pred_index.tolist(),
+            "gt_index": self.gt_index.tolist(),
+            "iou": self.iou.tolist(),
+            "count": len(self),
+        }
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return [
+            {"pred_index": pred_idx, "gt_index": gt_idx, "iou": iou}
+            for pred_idx, gt_idx, iou in zip(
+                self.pred_index.tolist(),
+                self.gt_index.tolist(),
+                self.iou.tolist(),
+            )
+        ]
+
+
+def _as_boxset(boxes: BoxSet | Iterable[Dict[str, Any]]) -> BoxSet:
+    return boxes if isinstance(boxes, BoxSet) else BoxSet.from_dicts(boxes)
 
 
 def match_boxes(
-    pred_boxes: List[Dict[str, Any]],
-    gt_boxes: List[Dict[str, Any]],
+    pred_boxes: BoxSet | List[Dict[str, Any]],
+    gt_boxes: BoxSet | List[Dict[str, Any]],
     iou_threshold: float = 0.5,
     class_aware: bool = True,
-) -> Dict[str, Any]:
+) -> MatchResult:
     """Greedy IoU matching between predicted and ground-truth boxes."""
-    candidates: List[tuple[float, int, int]] = []
-    for pred_idx, pred in enumerate(pred_boxes):
-        pred_class = pred.get("class_id")
-        for gt_idx, gt in enumerate(gt_boxes):
-            gt_class = gt.get("class_id")
-            if class_aware and pred_class is not None and gt_class is not None:
-                if pred_class != gt_class:
-                    continue
-            iou = compute_iou(pred, gt)
-            if iou >= iou_threshold:
-                candidates.append((iou, pred_idx, gt_idx))
-
-    candidates.sort(key=lambda item: item[0], reverse=True)
-
-    matched_preds: set[int] = set()
-    matched_gts: set[int] = set()
-    matches: List[Dict[str, Any]] = []
-
-    for iou, pred_idx, gt_idx in candidates:
-        if pred_idx in matched_preds or gt_idx in matched_gts:
+    pred_boxes = _as_boxset(pred_boxes)
+    gt_boxes = _as_boxset(gt_boxes)
+    return match_iou_matrix(
+        compute_iou_matrix(pred_boxes, gt_boxes),
+        pred_boxes.class_id,
+        gt_boxes.class_id,
+        iou_threshold=iou_threshold,
+        class_aware=class_aware,
+    )
+
+
+def match_iou_matrix(
+    iou_matrix: np.ndarray,
+    pred_class_ids: np.ndarray,
+    gt_class_ids: np.ndarray,
+    iou_threshold: float = 0.5,
+    class_aware: bool = True,
+) -> MatchResult:
+    """Greedy matching on a precomputed (pred, gt) IoU matrix"""
+    pred_count, gt_count = iou_matrix.shape
+    candidate_mask = iou_matrix >= iou_threshold
+    if class_aware:
+        candidate_mask &= pred_class_ids[:, None] == gt_class_ids[None, :]
+    pred_candidates, gt_candidates = np.nonzero(candidate_mask)
+    candidate_iou = iou_matrix[pred_candidates, gt_candidates]
+    # Stable sort keeps pred-major order among equal IoU values.
+    order = np.argsort(-candidate_iou, kind="stable")
+
+    matched_preds = np.zeros(pred_count, dtype=bool)
+    matched_gts = np.zeros(gt_count, dtype=bool)
+    match_order: List[int] = []
+    for candidate in order.tolist():
+        pred_idx = pred_candidates[candidate]
+        gt_idx = gt_candidates[candidate]
+        if matched_preds[pred_idx] or matched_gts[gt_idx]:
             continue
-        matched_preds.add(pred_idx)
-        matched_gts.add(gt_idx)
-        matches.append({"pred_index": pred_idx, "gt_index": gt_idx, "iou": iou})
-
-    unmatched_pred = [idx for idx in range(len(pred_boxes)) if idx not in matched_preds]
-    unmatched_gt = [idx for idx in range(len(gt_boxes)) if idx not in matched_gts]
-
-    return {
-        "matches": matches,
-        "unmatched_pred": unmatched_pred,
-        "unmatched_gt": unmatched_gt,
-    }
+        matched_preds[pred_idx] = True
+        matched_gts[gt_idx] = True
+        match_order.append(candidate)
+
+    selected = np.asarray(match_order, dtype=np.int64)
+    return MatchResult(
+        pred_index=pred_candidates[selected].astype(np.int32),
+        gt_index=gt_candidates[selected].astype(np.int32),
+        iou=candidate_iou[selected],
+        unmatched_pred=np.flatnonzero(~matched_preds).astype(np.int32),
+        unmatched_gt=np.flatnonzero(~matched_gts).astype(np.int32),
+    )
@@ -1,5 +1,5 @@
 """Metrics utilities"""
-from typing import Any, Dict, List
+from typing import Any, Dict, Sized
 
 
 def _safe_div(numerator: float, denominator: float) -> float:
@@ -9,7 +9,7 @@ def _safe_div(numerator: float, denominator: float) -> float:
 
 
 def build_stats(
-    matches: List[Dict[str, Any]],
+    matches: Sized,
     pred_count: int,
     gt_count: int,
     iou_threshold: float,
@@ -0,0 +1,39 @@
+"""Non-maximum suppression"""
+import numpy as np
+
+
+def nms(
+    boxes: np.ndarray,
+    scores: np.ndarray,
+    iou_threshold: float = 0.5,
+    class_ids: np.ndarray | None = None,
+) -> np.ndarray:
+    """Greedy NMS over xyxy boxes; returns kept indices sorted by score.
+
+    With class_ids given, boxes of different classes never suppress each other.
+    """
+    if boxes.shape[0] == 0:
+        return np.empty(0, dtype=np.int64)
+
+    boxes = boxes.astype(np.float64, copy=False)
+    if class_ids is not None:
+        # Shift each class into its own disjoint coordinate range.
+        span = float(boxes.max() - boxes.min()) + 1.0
+        boxes = boxes + (class_ids.astype(np.float64) * span)[:, None]
+
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    order = np.argsort(scores, kind="stable")[::-1]
+
+    keep: list[int] = []
+    while order.size:
+        best = order[0]
+        keep.append(int(best))
+        rest = order[1:]
+        inter_w = np.clip(np.minimum(x2[best], x2[rest]) - np.maximum(x1[best], x1[rest]), 0, None)
+        inter_h = np.clip(np.minimum(y2[best], y2[rest]) - np.maximum(y1[best], y1[rest]), 0, None)
+        inter = inter_w * inter_h
+        union = areas[best] + areas[rest] - inter
+        iou = np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
@@ -0,0 +1,202 @@
+"""Seeded image samples and confidence intervals for sampled dataset stats"""
+import math
+from statistics import NormalDist
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+
+import numpy as np
+
+from app.core.boxes import BoxSet
+from app.core.metrics import build_stats_from_counts
+from app.utils.exceptions import InvalidFormatError
+
+INTERVAL_METHODS = ("bootstrap", "wilson")
+INTERVAL_METRICS = ("precision", "recall", "f1")
+NO_CLASS_STRATUM = "none"
+# Fewer images give intervals too unstable to stop a sampled run on.
+MIN_STOP_SAMPLES = 30
+# Bootstrap resamples accepted; the cost of a snapshot grows linearly with them.
+MIN_RESAMPLES = 100
+MAX_RESAMPLES = 10_000
+# Bootstrap draws are generated in chunks of at most this many indices.
+_BOOTSTRAP_CHUNK = 2_000_000
+
+
+def sample_order(
+    image_ids: Iterable[str],
+    seed: int,
+    strata: Mapping[str, str] | None = None,
+) -> List[str]:
+    """All ids in a seeded random order: every prefix is a random sample
+
+    The order depends only on the set of ids and the seed. With `strata`
+    (image id -> stratum) each stratum is shuffled separately and the strata
+    are interleaved systematically, so any prefix holds every stratum in
+    proportion to its size.
+    """
+    ids = sorted(set(image_ids))
+    rng = np.random.default_rng(seed)
+    if strata is None:
+        return [ids[index] for index in rng.permutation(len(ids))]
+    groups: Dict[str, List[str]] = {}
+    for image_id in ids:
+        groups.setdefault(strata.get(image_id, NO_CLASS_STRATUM), []).append(image_id)
+    keyed: List[Tuple[float, str, str]] = []
+    for name in sorted(groups):
+        members = groups[name]
+        # The k-th draw of a stratum of size n lands at (k + u) / n.
+        offset = rng.random()
+        keyed.extend(
+            ((position + offset) / len(members), name, members[index])
+            for position, index in enumerate(rng.permutation(len(members)))
+        )
+    keyed.sort()
+    return [image_id for _, _, image_id in keyed]
+
+
+def dominant_class(boxes: BoxSet) -> str:
+    """Stratum of an image: its most frequent expert class"""
+    if len(boxes) == 0:
+        return NO_CLASS_STRATUM
+    return str(int(np.bincount(boxes.class_id).argmax()))
+
+
+def _z(confidence: float) -> float:
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def wilson_interval(successes: float, trials: float, confidence: float) -> Tuple[float, float]:
+    """Wilson score interval of a binomial proportion"""
+    if trials <= 0:
+        return 0.0, 1.0
+    z = _z(confidence)
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    centre = (p + z * z / (2 * trials)) / denominator
+    half_width = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, centre - half_width), min(1.0, centre + half_width)
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    return np.divide(numerator, denominator, out=np.zeros(len(numerator)), where=denominator > 0)
+
+
+class SampledStats:
+    """Per-image TP/prediction/expert counts of a sample and their intervals
+
+    The bootstrap resamples whole images within their strata, so boxes of
+    one image being correlated widens the interval as it should; its cost
+    grows with the sample size. Wilson intervals are constant-time but treat
+    boxes as independent trials (F1 = TP / (TP + (FP + FN) / 2)), which
+    is too narrow when images differ a lot.
+    Intervals are shrunk by the finite-population correction, so a sample
+    covering the whole dataset reports the exact value.
+    """
+
+    def __init__(self, population: int, iou_threshold: float, class_aware: bool) -> None:
+        self.population = population
+        self.iou_threshold = iou_threshold
+        self.class_aware = class_aware
+        self._counts: List[Tuple[int, int, int]] = []
+        self._strata: List[str] = []
+        self._totals = (0, 0, 0)
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def add(self, tp: int, pred_count: int, gt_count: int, stratum: str = NO_CLASS_STRATUM) -> None:
+        self._counts.append((tp, pred_count, gt_count))
+        self._strata.append(stratum)
+        total_tp, total_pred, total_gt = self._totals
+        self._totals = (total_tp + tp, total_pred + pred_count, total_gt + gt_count)
+
+    def _wilson(self, confidence: float) -> Dict[str, Tuple[float, float]]:
+        tp, pred, gt = self._totals
+        return {
+            "precision": wilson_interval(tp, pred, confidence),
+            "recall": wilson_interval(tp, gt, confidence),
+            "f1": wilson_interval(tp, (pred + gt) / 2, confidence),
+        }
+
+    def _bootstrap(self, confidence: float, resamples: int, seed: int) -> Dict[str, Tuple[float, float]]:
+        if not self._counts:
+            return {metric: (0.0, 1.0) for metric in INTERVAL_METRICS}
+        # One contiguous int32 column per counter: gathers are much cheaper.
+        columns = np.ascontiguousarray(np.asarray(self._counts, dtype=np.int32).T)
+        strata = np.asarray(self._strata)
+        # Seeded per snapshot: the same sample always gets the same interval.
+        rng = np.random.default_rng(seed)
+        totals = np.zeros((resamples, 3), dtype=np.int64)
+        for name in np.unique(strata):
+            members = np.flatnonzero(strata == name).astype(np.int32)
+            chunk = max(1, _BOOTSTRAP_CHUNK // len(members))
+            for start in range(0, resamples, chunk):
+                stop = min(resamples, start + chunk)
+                draws = members[rng.integers(0, len(members), size=(stop - start, len(members)), dtype=np.int32)]
+                for column, values in enumerate(columns):
+                    totals[start:stop, column] += np.take(values, draws).sum(axis=1, dtype=np.int64)
+        tp, pred, gt = totals[:, 0], totals[:, 1], totals[:, 2]
+        alpha = (1 - confidence) / 2
+        values = {
+            "precision": _ratio(tp, pred),
+            "recall": _ratio(tp, gt),
+            "f1": _ratio(2 * tp, pred + gt),
+        }
+        return {
+            metric: tuple(float(bound) for bound in np.quantile(samples, [alpha, 1 - alpha]))
+            for metric, samples in values.items()
+        }
+
+    def _population_correction(self) -> float:
+        if not self._counts:
+            return 1.0
+        if self.population <= 1:
+            return 0.0
+        remaining = max(0, self.population - len(self._counts))
+        return math.sqrt(remaining / (self.population - 1))
+
+    def summary(
+        self,
+        *,
+        confidence: float = 0.95,
+        method: str = "bootstrap",
+        resamples: int = 1000,
+        seed: int = 0,
+    ) -> Dict[str, Any]:
+        """Point estimates (stats over the sample so far) and their intervals"""
+        stats = build_stats_from_counts(
+            *self._totals,
+            iou_threshold=self.iou_threshold,
+            class_aware=self.class_aware,
+        )
+        if method == "bootstrap":
+            bounds = self._bootstrap(confidence, resamples, seed)
+        else:
+            bounds = self._wilson(confidence)
+        correction = self._population_correction()
+        intervals = {}
+        for metric in INTERVAL_METRICS:
+            estimate = stats[metric]
+            low, high = bounds[metric]
+            low = estimate - max(0.0, estimate - low) * correction
+            high = estimate + max(0.0, high - estimate) * correction
+            intervals[metric] = {"low": low, "high": high, "half_width": (high - low) / 2}
+        return {
+            "sample_count": len(self._counts),
+            "image_count": self.population,
+            "fraction": len(self._counts) / self.population if self.population else 0.0,
+            "stats": stats,
+            "confidence": confidence,
+            "method": method,
+            "intervals": intervals,
+            "max_half_width": max(interval["half_width"] for interval in intervals.values()),
+        }
+
+
+def validate_sampling(confidence: float, method: str, resamples: int) -> None:
+    """Reject sampling parameters the interval estimators cannot use"""
+    if not 0.0 < confidence < 1.0:
+        raise InvalidFormatError(f"confidence must be between 0 and 1, got {confidence}")
+    if method not in INTERVAL_METHODS:
+        raise InvalidFormatError(f"method must be one of {', '.join(INTERVAL_METHODS)}, got {method!r}")
+    if not MIN_RESAMPLES <= resamples <= MAX_RESAMPLES:
+        raise InvalidFormatError(f"resamples must be between {MIN_RESAMPLES} and {MAX_RESAMPLES}, got {resamples}")
@@ -0,0 +1,111 @@
+"""Dataset shards: split image ids across processes or machines"""
+from dataclasses import dataclass
+from itertools import islice, takewhile
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+from app.core.evaluation import DatasetEvaluation
+from app.utils.exceptions import InvalidFormatError
+
+
+@dataclass(frozen=True)
+class ShardSpec:
+    """Either `index/count` (every count-th id of the sorted listing) or an id range.
+
+    The id range is half-open, `start:end`, compared as strings; either side
+    may be empty. All shards of one run must see the same dataset listing.
+    """
+
+    index: int = 0
+    count: int = 1
+    start: str | None = None
+    end: str | None = None
+
+    @property
+    def is_range(self) -> bool:
+        return self.start is not None or self.end is not None
+
+    def select(self, image_ids: Sequence[str]) -> List[str]:
+        return list(self.iter_select(sorted(image_ids)))
+
+    def iter_select(self, sorted_ids: Iterable[str]) -> Iterator[str]:
+        """Lazy `select` over ids that are already sorted (e.g. an ordered provider scan)"""
+        if not self.is_range:
+            return islice(sorted_ids, self.index, None, self.count)
+        selected = (image_id for image_id in sorted_ids if self.start is None or image_id >= self.start)
+        if self.end is None:
+            return selected
+        return takewhile(lambda image_id: image_id < self.end, selected)
+
+    def __str__(self) -> str:
+        if self.is_range:
+            return f"{self.start or ''}:{self.end or ''}"
+        return f"{self.index}/{self.count}"
+
+
+def parse_shard(text: str) -> ShardSpec:
+    """Parse `index/count` (e.g. `2/8`) or `start:end` (e.g. `IMG-100:IMG-200`)"""
+    text = text.strip()
+    if "/" in text:
+        index_text, _, count_text = text.partition("/")
+        try:
+            index, count = int(index_text), int(count_text)
+        except ValueError as exc:
+            raise InvalidFormatError(f"Invalid shard spec: {text}") from exc
+        if count < 1 or not 0 <= index < count:
+            raise InvalidFormatError(f"Shard index must be in [0, {count}): {text}")
+        return ShardSpec(index=index, count=count)
+    if ":" in text:
+        start, _, end = text.partition(":")
+        if start and end and start >= end:
+            raise InvalidFormatError(f"Empty shard range: {text}")
+        return ShardSpec(start=start or None, end=end or None)
+    raise InvalidFormatError(f"Invalid shard spec (expected index/count or start:end): {text}")
+
+
+def check_complete(shards: Sequence[ShardSpec]) -> None:
+    """Ensure index/count shards cover every index exactly once.
+
+    Range shards must not overlap; gaps between them cannot be checked
+    without the listing and are accepted as given.
+    """
+    indexed = [shard for shard in shards if not shard.is_range]
+    if not indexed:
+        # An open start sorts first; an open end must be last.
+        ranges = sorted(shards, key=lambda shard: (shard.start is not None, shard.start or ""))
+        for previous, shard in zip(ranges, ranges[1:]):
+            if previous.end is None or shard.start is None or shard.start < previous.end:
+                raise InvalidFormatError(f"Shard ranges overlap: {previous} and {shard}")
+        return
+    counts = {shard.count for shard in indexed}
+    if len(counts) != 1 or len(indexed) != len(shards):
+        raise InvalidFormatError("Cannot mix shard layouts in one merge")
+    count = counts.pop()
+    indices = sorted(shard.index for shard in indexed)
+    if indices != list(range(count)):
+        raise InvalidFormatError(f"Shards do not cover 0..{count - 1} exactly once: {indices}")
+
+
+def build_partial(shard: ShardSpec, evaluation: DatasetEvaluation, fingerprint: str = "") -> Dict[str, Any]:
+    """Serialized partial result of one shard (JSON-safe)"""
+    return {"shard": str(shard), "model_fingerprint": fingerprint, "evaluation": evaluation.to_state()}
+
+
+def merge_partials(partials: Sequence[Dict[str, Any]]) -> DatasetEvaluation:
+    """Merge shard partials; equal to a single run over the union of the shards"""
+    if not partials:
+        raise InvalidFormatError("No partial results to merge")
+    try:
+        fingerprints = {partial.get("model_fingerprint", "") for partial in partials}
+        shards = [parse_shard(partial["shard"]) for partial in partials]
+    except (AttributeError, KeyError, TypeError) as exc:
+        raise InvalidFormatError(f"Invalid partial result: {exc!r}") from exc
+    if len(fingerprints) > 1:
+        raise InvalidFormatError(f"Partials come from different models: {sorted(fingerprints)}")
+    check_complete(shards)
+    try:
+        merged = DatasetEvaluation.from_state(partials[0]["evaluation"])
+        for partial in partials[1:]:
+            merged.merge(DatasetEvaluation.from_state(partial["evaluation"]))
+    except (KeyError, TypeError, ValueError) as exc:
+        raise InvalidFormatError(f"Invalid partial result: {exc}") from exc
+    return merged
@@ -0,0 +1,327 @@
+"""Mergeable fixed-memory distribution sketches: quantiles and histograms"""
+import math
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from app.core.boxes import BoxSet
+from app.core.matcher import MatchResult
+
+DEFAULT_K = 200
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+# Unit-interval values (IoU, scores) in 0.05 bins; normalized box areas
+# (w * h) in log bins, four per decade from 1e-6 to the full image.
+UNIT_EDGES = tuple(float(edge) for edge in np.linspace(0.0, 1.0, 21).round(2))
+AREA_EDGES = tuple(float(edge) for edge in np.logspace(-6, 0, 25))
+# Distribution name -> histogram edges.
+DISTRIBUTIONS = {
+    "iou": UNIT_EDGES,
+    "tp_score": UNIT_EDGES,
+    "fp_score": UNIT_EDGES,
+    "expert_area": AREA_EDGES,
+    "model_area": AREA_EDGES,
+}
+_CAPACITY_DECAY = 2 / 3
+_MIN_CAPACITY = 8
+_MASK64 = (1 << 64) - 1
+
+
+def _coin(counter: int) -> int:
+    """Pseudo-random bit of a counter (splitmix64 finalizer): reproducible, stateless"""
+    value = (counter * 0x9E3779B97F4A7C15) & _MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return (value ^ (value >> 31)) & 1
+
+
+class QuantileSketch:
+    """KLL-style quantile sketch holding about 3 * k values whatever the count
+
+    Values enter level 0; a level over its capacity is sorted and every
+    other value moves up one level with twice the weight. Capacities shrink
+    by 2/3 per level below the top; at k=200 quantiles are within about 1%
+    of the count in rank. Which half moves up is decided by a hash of the
+    compaction counter rather than a random generator, so results are
+    reproducible; below k values the sketch is exact.
+    """
+
+    def __init__(self, k: int = DEFAULT_K) -> None:
+        self.k = k
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._levels: List[np.ndarray] = [np.empty(0)]
+        self._capacities = [k]
+        # Compactions so far; each one keeps the odd or even half by a
+        # pseudo-random coin of this counter.
+        self._compactions = 0
+
+    def _add_level(self) -> None:
+        self._levels.append(np.empty(0))
+        self._update_capacities()
+
+    def _update_capacities(self) -> None:
+        top = len(self._levels) - 1
+        self._capacities = [
+            max(_MIN_CAPACITY, math.ceil(self.k * _CAPACITY_DECAY ** (top - level))) for level in range(top + 1)
+        ]
+
+    def _compact(self) -> None:
+        level = 0
+        while level < len(self._levels):
+            if len(self._levels[level]) <= self._capacities[level]:
+                level += 1
+                continue
+            grew = level + 1 == len(self._levels)
+            if grew:
+                self._add_level()
+            values = np.sort(self._levels[level])
+            # An odd value out stays behind at this level.
+            keep, values = values[: len(values) % 2], values[len(values) % 2 :]
+            promoted = values[_coin(self._compactions) :: 2]
+            self._levels[level + 1] = np.concatenate([self._levels[level + 1], promoted])
+            self._levels[level] = keep
+            self._compactions += 1
+            # A new top level lowers every capacity below it: rescan.
+            level = 0 if grew else level + 1
+
+    def add(self, values: np.ndarray | Sequence[float]) -> None:
+        values = np.asarray(values, dtype=np.float64).reshape(-1)
+        if values.size == 0:
+            return
+        self.count += int(values.size)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._levels[0] = np.concatenate([self._levels[0], values])
+        # Only level 0 grew, so only its overflow can start a compaction.
+        if len(self._levels[0]) > self._capacities[0]:
+            self._compact()
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        if other.k != self.k:
+            raise ValueError("Cannot merge sketches with different k")
+        if other.count == 0:
+            return self
+        while len(self._levels) < len(other._levels):
+            self._add_level()
+        for level, values in enumerate(other._levels):
+            self._levels[level] = np.concatenate([self._levels[level], values])
+        self.count += other.count
+        self._compactions += other._compactions
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compact()
+        return self
+
+    def quantiles(self, qs: Sequence[float]) -> List[float | None]:
+        """Nearest-rank quantiles: the smallest value whose rank reaches q * count"""
+        if self.count == 0:
+            return [None for _ in qs]
+        values = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(len(items), 2**level) for level, items in enumerate(self._levels)])
+        order = np.argsort(values, kind="stable")
+        values, ranks = values[order], np.cumsum(weights[order])
+        total = ranks[-1]
+        positions = np.searchsorted(ranks, [q * total for q in qs], side="left")
+        return [float(values[min(position, len(values) - 1)]) for position in positions]
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "k": self.k,
+            "count": self.count,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "compactions": self._compactions,
+            "levels": [sorted(level.tolist()) for level in self._levels],
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "QuantileSketch":
+        sketch = cls(int(state["k"]))
+        sketch.count = int(state["count"])
+        if sketch.count:
+            sketch.min = float(state["min"])
+            sketch.max = float(state["max"])
+        sketch._levels = [np.asarray(level, dtype=np.float64) for level in state["levels"]] or [np.empty(0)]
+        sketch._update_capacities()
+        sketch._compactions = int(state["compactions"])
+        return sketch
+
+
+class Histogram:
+    """Counts over fixed bin edges; values outside fall into the end bins"""
+
+    def __init__(self, edges: Sequence[float]) -> None:
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+
+    def add(self, values: np.ndarray | Sequence[float]) -> None:
+        values = np.asarray(values, dtype=np.float64).reshape(-1)
+        bins = np.clip(np.searchsorted(self.edges, values, side="right") - 1, 0, len(self.counts) - 1)
+        self.counts += np.bincount(bins, minlength=len(self.counts))
+
+    def merge(self, other: "Histogram") -> "Histogram":
+        if not np.array_equal(other.edges, self.edges):
+            raise ValueError("Cannot merge histograms with different edges")
+        self.counts += other.counts
+        return self
+
+
+class Distribution:
+    """Quantile sketch plus histogram of one value stream"""
+
+    def __init__(self, edges: Sequence[float], k: int = DEFAULT_K) -> None:
+        self.sketch = QuantileSketch(k)
+        self.histogram = Histogram(edges)
+
+    def add(self, values: np.ndarray) -> None:
+        self.sketch.add(values)
+        self.histogram.add(values)
+
+    def merge(self, other: "Distribution") -> "Distribution":
+        self.sketch.merge(other.sketch)
+        self.histogram.merge(other.histogram)
+        return self
+
+    def to_state(self) -> Dict[str, Any]:
+        """Sketch state plus the histogram as sparse [bin, count] pairs"""
+        counts = self.histogram.counts
+        return {
+            "sketch": self.sketch.to_state(),
+            "histogram": [[int(index), int(counts[index])] for index in np.flatnonzero(counts)],
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any], edges: Sequence[float]) -> "Distribution":
+        distribution = cls(edges)
+        distribution.sketch = QuantileSketch.from_state(state["sketch"])
+        for index, count in state["histogram"]:
+            distribution.histogram.counts[int(index)] = int(count)
+        return distribution
+
+    def summary(self, qs: Sequence[float] = QUANTILES) -> Dict[str, Any]:
+        count = self.sketch.count
+        return {
+            "count": count,
+            "min": self.sketch.min if count else None,
+            "max": self.sketch.max if count else None,
+            "quantiles": {f"p{round(q * 100):02d}": value for q, value in zip(qs, self.sketch.quantiles(qs))},
+            "histogram": self.histogram.counts.tolist(),
+        }
+
+
+class DistributionSketches:
+    """Per-class and overall distributions of matched IoU, TP/FP scores and box areas
+
+    IoU and TP scores come from matched pairs, FP scores from unmatched
+    predictions (labelled by the predicted class); expert and model areas
+    are the normalized w * h of every box. Memory is fixed per class and
+    distribution, and merging partial results gives the same counts and
+    histograms as one run, with quantiles within the sketch error.
+    """
+
+    def __init__(self, k: int = DEFAULT_K) -> None:
+        self.k = k
+        self.overall = _distributions(k)
+        # class id -> distribution name -> Distribution
+        self.per_class: Dict[int, Dict[str, Distribution]] = {}
+
+    def _add(self, name: str, values: np.ndarray, class_ids: np.ndarray) -> None:
+        if values.size == 0:
+            return
+        self.overall[name].add(values)
+        for class_id in np.unique(class_ids).tolist():
+            distributions = self.per_class.get(class_id)
+            if distributions is None:
+                distributions = self.per_class[class_id] = _distributions(self.k)
+            distributions[name].add(values[class_ids == class_id])
+
+    def add(self, pred_boxes: BoxSet, gt_boxes: BoxSet, matches: MatchResult) -> None:
+        for name, values, class_ids in _image_values(pred_boxes, gt_boxes, matches):
+            self._add(name, values, class_ids)
+
+    @staticmethod
+    def image_values(pred_boxes: BoxSet, gt_boxes: BoxSet, matches: MatchResult) -> Dict[str, List[List[float]]]:
+        """Raw values of one image as name -> [class ids, values], far smaller than a state
+
+        `add_values` of the result changes the sketches exactly as `add`.
+        """
+        return {
+            name: [class_ids.tolist(), np.asarray(values, dtype=np.float64).tolist()]
+            for name, values, class_ids in _image_values(pred_boxes, gt_boxes, matches)
+            if values.size
+        }
+
+    def add_values(self, values: Dict[str, List[List[float]]]) -> None:
+        for name, (class_ids, items) in values.items():
+            self._add(name, np.asarray(items, dtype=np.float64), np.asarray(class_ids, dtype=np.int64))
+
+    def merge(self, other: "DistributionSketches") -> "DistributionSketches":
+        for name, distribution in other.overall.items():
+            self.overall[name].merge(distribution)
+        for class_id, distributions in other.per_class.items():
+            mine = self.per_class.setdefault(class_id, _distributions(self.k))
+            for name, distribution in distributions.items():
+                mine[name].merge(distribution)
+        return self
+
+    def to_state(self) -> Dict[str, Any]:
+        """JSON-serializable state; empty distributions are left out"""
+
+        def state(distributions: Dict[str, Distribution]) -> Dict[str, Any]:
+            return {name: item.to_state() for name, item in distributions.items() if item.sketch.count}
+
+        return {
+            "k": self.k,
+            "overall": state(self.overall),
+            "per_class": [[class_id, state(self.per_class[class_id])] for class_id in sorted(self.per_class)],
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "DistributionSketches":
+        sketches = cls(int(state["k"]))
+
+        def restore(items: Dict[str, Any]) -> Dict[str, Distribution]:
+            distributions = _distributions(sketches.k)
+            for name, item in items.items():
+                distributions[name] = Distribution.from_state(item, DISTRIBUTIONS[name])
+            return distributions
+
+        sketches.overall = restore(state["overall"])
+        sketches.per_class = {int(class_id): restore(items) for class_id, items in state["per_class"]}
+        return sketches
+
+    def to_dict(self, qs: Sequence[float] = QUANTILES) -> Dict[str, Any]:
+        return {
+            name: {
+                "histogram_edges": list(edges),
+                "all": self.overall[name].summary(qs),
+                "per_class": [
+                    {"class_id": class_id, **self.per_class[class_id][name].summary(qs)}
+                    for class_id in sorted(self.per_class)
+                ],
+            }
+            for name, edges in DISTRIBUTIONS.items()
+        }
+
+
+def _distributions(k: int) -> Dict[str, Distribution]:
+    return {name: Distribution(edges, k) for name, edges in DISTRIBUTIONS.items()}
+
+
+def _image_values(
+    pred_boxes: BoxSet, gt_boxes: BoxSet, matches: MatchResult
+) -> Iterator[Tuple[str, np.ndarray, np.ndarray]]:
+    """(distribution name, values, class ids) of one image"""
+    pred_classes = pred_boxes.class_id.astype(np.int64)
+    matched_classes = pred_classes[matches.pred_index]
+    yield "iou", np.asarray(matches.iou, dtype=np.float64), matched_classes
+    if pred_boxes.score is not None:
+        yield "tp_score", pred_boxes.score[matches.pred_index], matched_classes
+        yield "fp_score", pred_boxes.score[matches.unmatched_pred], pred_classes[matches.unmatched_pred]
+    yield "expert_area", _areas(gt_boxes), gt_boxes.class_id.astype(np.int64)
+    yield "model_area", _areas(pred_boxes), pred_classes
+
+
+def _areas(boxes: BoxSet) -> np.ndarray:
+    return (boxes.xywh[:, 2].astype(np.float64) * boxes.xywh[:, 3]).reshape(-1)
@@ -0,0 +1,107 @@
+"""Size-bounded on-disk cache with LRU eviction"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from app.utils.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+
+class DiskCache:
+    """Stores opaque blobs as files; evicts least recently used above max_bytes
+
+    The size total is kept per process and rescanned from the directory at
+    most `rescan_s` seconds apart, so several workers sharing a root overshoot
+    max_bytes by at most what the others wrote since the last scan.
+    """
+
+    def __init__(self, root: str | Path, max_bytes: int, name: str = "disk", rescan_s: float = 10.0) -> None:
+        self.root = Path(root)
+        self.name = name
+        self.max_bytes = max_bytes
+        self.rescan_s = rescan_s
+        self._lock = threading.Lock()
+        self._total_bytes: int | None = None
+        self._scanned_at = 0.0
+
+    def path_for(self, key: str, suffix: str = "") -> Path:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return self.root / digest[:2] / f"{digest}{suffix}"
+
+    def get(self, key: str, suffix: str = "") -> Path | None:
+        path = self.path_for(key, suffix)
+        try:
+            # Bump mtime so eviction treats the entry as recently used.
+            os.utime(path)
+        except FileNotFoundError:
+            record_cache(self.name, hit=False)
+            return None
+        record_cache(self.name, hit=True)
+        return path
+
+    def put(self, key: str, data: bytes, suffix: str = "") -> Path:
+        path = self.path_for(key, suffix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            previous = path.stat().st_size if path.exists() else 0
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        with self._lock:
+            if self._total_bytes is None or time.monotonic() - self._scanned_at >= self.rescan_s:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += len(data) - previous
+            if self._total_bytes > self.max_bytes:
+                self._evict(keep=path)
+        return path
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            return self._total_bytes
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        if not self.root.exists():
+            return entries
+        for path in self.root.glob("*/*"):
+            if path.name.startswith(".tmp-"):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _scan_size(self) -> int:
+        self._scanned_at = time.monotonic()
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self, keep: Path) -> None:
+        entries = sorted(self._entries(), key=lambda entry: entry[0])
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        self._total_bytes = total
+        self._scanned_at = time.monotonic()
+        logger.info("Disk cache eviction: root=%s removed=%d size=%d", self.root, removed, total)
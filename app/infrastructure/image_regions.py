@@ -0,0 +1,163 @@
+"""Region reads for large images with lazy decoding where the format allows"""
+from io import BytesIO
+from typing import Iterator, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+from app.utils.exceptions import InvalidFormatError
+
+Box = Tuple[int, int, int, int]
+
+# What Pillow raises for unknown, corrupt or truncated image data.
+DECODE_ERRORS = (OSError, SyntaxError, ValueError, Image.DecompressionBombError)
+
+# Bytes per pixel for raw layouts we can slice row-wise without decoding.
+_RAW_BYTES_PER_PIXEL = {
+    "L": 1,
+    "P": 1,
+    "RGB": 3,
+    "RGBA": 4,
+    "RGBX": 4,
+    "CMYK": 4,
+    "I;16": 2,
+    "I;16L": 2,
+    "I;16B": 2,
+    "I;16N": 2,
+}
+
+
+def tile_starts(length: int, tile_size: int, overlap: int) -> List[int]:
+    """Tile origins covering [0, length) with overlap; last tile is flush with the edge"""
+    if length <= tile_size:
+        return [0]
+    step = max(1, tile_size - max(0, overlap))
+    starts = list(range(0, length - tile_size, step))
+    starts.append(length - tile_size)
+    return starts
+
+
+def tile_boxes(width: int, height: int, tile_size: int, overlap: int) -> Iterator[Box]:
+    for y0 in tile_starts(height, tile_size, overlap):
+        for x0 in tile_starts(width, tile_size, overlap):
+            yield x0, y0, min(width, x0 + tile_size), min(height, y0 + tile_size)
+
+
+def _intersects(a: Box, b: Box) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def decode_image(image_bytes: bytes) -> Image.Image:
+    """Fully decoded RGB image; undecodable data raises InvalidFormatError"""
+    try:
+        return Image.open(BytesIO(image_bytes)).convert("RGB")
+    except DECODE_ERRORS as exc:
+        raise InvalidFormatError(f"Cannot decode image: {exc}") from exc
+
+
+def _to_rgb(image: Image.Image) -> Image.Image:
+    if image.mode == "RGB":
+        return image
+    if image.mode.startswith("I;16"):
+        # Pillow clips 16-bit samples to 255; keep the high byte instead.
+        high = (np.asarray(image).astype(np.uint16) >> 8).astype(np.uint8)
+        return Image.fromarray(high, "L").convert("RGB")
+    return image.convert("RGB")
+
+
+class ImageRegionReader:
+    """Reads RGB regions of an encoded image.
+
+    Formats stored as independent raw/packed tiles or strips (e.g. uncompressed
+    or tiled TIFF) are decoded per region. Other formats (JPEG, PNG, libtiff
+    compressed) are decoded once on first read and cropped from memory, which
+    holds width * height * 3 bytes; with `max_decoded_pixels` set, larger
+    images of those formats are refused instead (0 = no limit). 16-bit
+    grayscale is reduced to its high byte.
+    """
+
+    def __init__(self, image_bytes: bytes, max_decoded_pixels: int = 0) -> None:
+        self._data = memoryview(image_bytes)
+        self.max_decoded_pixels = max_decoded_pixels
+        try:
+            image = Image.open(BytesIO(image_bytes))
+        except DECODE_ERRORS as exc:
+            raise InvalidFormatError(f"Cannot decode image: {exc}") from exc
+        self.width, self.height = image.size
+        self._mode = image.mode
+        self._tiles = list(image.tile)
+        self._decoded: Image.Image | None = None
+
+    @property
+    def lazy(self) -> bool:
+        if self._mode == "P":
+            return False
+        if len(self._tiles) > 1:
+            return True
+        return len(self._tiles) == 1 and self._raw_row_bytes(self._tiles[0]) is not None
+
+    def read(self, box: Box) -> Image.Image:
+        try:
+            return self._read(box)
+        except DECODE_ERRORS as exc:
+            raise InvalidFormatError(f"Cannot decode image region {box}: {exc}") from exc
+
+    def _read(self, box: Box) -> Image.Image:
+        if not self.lazy:
+            if self._decoded is None:
+                pixels = self.width * self.height
+                if 0 < self.max_decoded_pixels < pixels:
+                    raise InvalidFormatError(
+                        f"Image too large to decode: {self.width}x{self.height} "
+                        f"exceeds {self.max_decoded_pixels} pixels"
+                    )
+                self._decoded = _to_rgb(Image.open(BytesIO(self._data)))
+            return self._decoded.crop(box)
+
+        x0, y0, x1, y1 = box
+        canvas = Image.new(self._mode, (x1 - x0, y1 - y0))
+        for decoder, extents, offset, args in self._tiles:
+            if not _intersects(extents, box):
+                continue
+            tile, tile_origin = self._decode_tile(decoder, extents, offset, args, box)
+            canvas.paste(tile, (tile_origin[0] - x0, tile_origin[1] - y0))
+        return _to_rgb(canvas)
+
+    def _raw_row_bytes(self, tile: tuple) -> int | None:
+        decoder, extents, _, args = tile
+        if decoder != "raw" or not isinstance(args, tuple) or len(args) < 3:
+            return None
+        rawmode, stride, orientation = args[:3]
+        if orientation != 1:
+            return None
+        if stride:
+            return stride
+        bytes_per_pixel = _RAW_BYTES_PER_PIXEL.get(rawmode)
+        if bytes_per_pixel is None:
+            return None
+        return (extents[2] - extents[0]) * bytes_per_pixel
+
+    def _decode_tile(
+        self,
+        decoder: str,
+        extents: Box,
+        offset: int,
+        args: tuple,
+        box: Box,
+    ) -> Tuple[Image.Image, Tuple[int, int]]:
+        tx0, ty0, tx1, ty1 = extents
+        if not isinstance(args, tuple):
+            args = (args,)
+        row_bytes = self._raw_row_bytes((decoder, extents, offset, args))
+        if row_bytes is not None:
+            # Raw top-down rows: read only the rows that overlap the region.
+            first_row = max(ty0, box[1])
+            last_row = min(ty1, box[3])
+            start = offset + (first_row - ty0) * row_bytes
+            data = self._data[start : start + (last_row - first_row) * row_bytes]
+            tile = Image.frombuffer(
+                self._mode, (tx1 - tx0, last_row - first_row), data, decoder, *args
+            )
+            return tile, (tx0, first_row)
+        tile = Image.frombytes(self._mode, (tx1 - tx0, ty1 - ty0), self._data[offset:], decoder, *args)
+        return tile, (tx0, ty0)
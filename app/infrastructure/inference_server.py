@@ -0,0 +1,401 @@
+"""Shared inference server: one process owns the ONNX session for all API workers
+
+API workers decode and preprocess images themselves and hand the float32
+input tensors over through a per-worker shared-memory ring of fixed-size
+slots; only small control messages and the detections travel over the local
+socket (multiprocessing.connection). The server batches requests from all
+workers into one session.run when the model has a dynamic batch dimension.
+"""
+import itertools
+import logging
+import mmap
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import connection, shared_memory
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from app.core.boxes import BoxSet
+from app.infrastructure.image_regions import decode_image
+from app.infrastructure.model_runner import IModelRunner, OnnxModelRunner, image_to_blob
+from app.utils.exceptions import InvalidFormatError, ModelNotFoundError
+from app.utils.metrics import stage_timer, track_queue
+
+logger = logging.getLogger(__name__)
+
+_FLOAT_BYTES = np.dtype(np.float32).itemsize
+# How long close() waits for the server to end the connection.
+_CLOSE_TIMEOUT_S = 5.0
+
+
+def _address_family(address: str) -> str:
+    # "host:port" means TCP on localhost; anything else is a Unix socket path.
+    return "AF_INET" if ":" in address and not address.startswith("/") else "AF_UNIX"
+
+
+def _parse_address(address: str) -> str | Tuple[str, int]:
+    if _address_family(address) == "AF_INET":
+        host, _, port = address.rpartition(":")
+        return host or "127.0.0.1", int(port)
+    return address
+
+
+def _attach_shared_memory(name: str) -> "shared_memory.SharedMemory | _AttachedSegment":
+    """Attach to a client-owned segment without registering it for cleanup.
+
+    Registration would make this process's resource tracker unlink the
+    segment on exit (bpo-39959); the creating API worker owns its lifetime.
+    Before Python 3.13 SharedMemory always registers, so POSIX segments are
+    mapped directly instead.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13 has no `track`
+        pass
+    if os.name == "nt":  # Windows segments are not tracked
+        return shared_memory.SharedMemory(name=name)
+    return _AttachedSegment(name)
+
+
+class _AttachedSegment:
+    """Untracked mapping of an existing POSIX segment (SharedMemory before `track`)"""
+
+    def __init__(self, name: str) -> None:
+        import _posixshmem
+
+        fd = _posixshmem.shm_open(name if name.startswith("/") else f"/{name}", os.O_RDWR, mode=0o600)
+        try:
+            self._mmap = mmap.mmap(fd, os.fstat(fd).st_size)
+        finally:
+            os.close(fd)
+        self.name = name
+        self.buf = memoryview(self._mmap)
+
+    def close(self) -> None:
+        self.buf.release()
+        self._mmap.close()
+
+
+def _boxes_message(request_id: int, boxes: BoxSet) -> tuple:
+    return ("result", request_id, boxes.class_id, boxes.xywh, boxes.score)
+
+
+class _ClientSession:
+    """Server-side view of one connected API worker"""
+
+    def __init__(self, conn: connection.Connection, shm_name: str, slots: int, slot_bytes: int) -> None:
+        self.conn = conn
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.shm = _attach_shared_memory(shm_name)
+        self.send_lock = threading.Lock()
+
+    def tensor(self, slot: int, shape: Sequence[int]) -> np.ndarray:
+        return np.ndarray(tuple(shape), dtype=np.float32, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def send(self, message: tuple) -> None:
+        with self.send_lock:
+            try:
+                self.conn.send(message)
+            except (OSError, EOFError):
+                logger.warning("Inference client disconnected before reply")
+
+    def close(self) -> None:
+        try:
+            self.shm.close()
+        except BufferError:
+            logger.debug("Shared memory still referenced on close")
+        self.conn.close()
+
+
+class InferenceServer:
+    """Serve predictions from one OnnxModelRunner to local API workers"""
+
+    def __init__(
+        self,
+        runner: OnnxModelRunner,
+        address: str,
+        authkey: bytes,
+        max_batch: int = 8,
+        max_wait_ms: float = 2.0,
+    ) -> None:
+        self.runner = runner
+        self.address = address
+        self.authkey = authkey
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000.0
+        self._requests: "queue.Queue[tuple[_ClientSession, tuple]]" = queue.Queue()
+        self._stopped = threading.Event()
+        self._listener: connection.Listener | None = None
+
+    def serve_forever(self) -> None:
+        family = _address_family(self.address)
+        if family == "AF_UNIX":
+            Path(self.address).parent.mkdir(parents=True, exist_ok=True)
+            Path(self.address).unlink(missing_ok=True)
+        self._listener = connection.Listener(_parse_address(self.address), family=family, authkey=self.authkey)
+        logger.info(
+            "Inference server listening: address=%s fingerprint=%s max_batch=%d",
+            self.address,
+            self.runner.fingerprint,
+            self.max_batch,
+        )
+        threading.Thread(target=self._batch_loop, name="inference-batcher", daemon=True).start()
+        try:
+            while not self._stopped.is_set():
+                try:
+                    conn = self._listener.accept()
+                except (OSError, EOFError, connection.AuthenticationError):
+                    if self._stopped.is_set():
+                        break
+                    logger.warning("Rejected inference client connection")
+                    continue
+                threading.Thread(target=self._serve_client, args=(conn,), daemon=True).start()
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+            if _address_family(self.address) == "AF_UNIX":
+                Path(self.address).unlink(missing_ok=True)
+
+    def _serve_client(self, conn: connection.Connection) -> None:
+        try:
+            hello = conn.recv()
+            _, shm_name, slots, slot_bytes = hello
+            session = _ClientSession(conn, shm_name, slots, slot_bytes)
+        except Exception:
+            logger.exception("Invalid inference client handshake")
+            conn.close()
+            return
+        session.send(
+            (
+                "welcome",
+                {
+                    "img_size": self.runner.img_size,
+                    "letterbox": self.runner.letterbox,
+                    "tile_size": self.runner.tile_size,
+                    "fingerprint": self.runner.fingerprint,
+                },
+            )
+        )
+        logger.info("Inference client connected: shm=%s slots=%d", shm_name, slots)
+        try:
+            while True:
+                message = conn.recv()
+                if message[0] == "bye":
+                    break
+                self._requests.put((session, message))
+        except (EOFError, OSError):
+            logger.info("Inference client disconnected: shm=%s", shm_name)
+        finally:
+            session.close()
+
+    def _next_batch(self) -> List[tuple[_ClientSession, tuple]]:
+        batch = [self._requests.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _batch_loop(self) -> None:
+        while not self._stopped.is_set():
+            batch = self._next_batch()
+            tensors = []
+            for session, message in batch:
+                if message[0] == "infer":
+                    tensors.append((session, message))
+                else:
+                    self._handle_bytes(session, message)
+            if tensors:
+                self._handle_tensors(tensors)
+
+    def _handle_bytes(self, session: _ClientSession, message: tuple) -> None:
+        _, request_id, image_bytes = message
+        try:
+            session.send(_boxes_message(request_id, self.runner.predict(image_bytes)))
+        except Exception as exc:
+            logger.exception("Inference failed for request %s", request_id)
+            session.send(("error", request_id, type(exc).__name__, str(exc)))
+
+    def _handle_tensors(self, tensors: List[tuple[_ClientSession, tuple]]) -> None:
+        items = []
+        for session, (_, _, slot, shape, width, height, scale, pad) in tensors:
+            items.append((session.tensor(slot, shape), width, height, scale, pad))
+        try:
+            results = self.runner.predict_blobs(items)
+        except Exception as exc:
+            logger.exception("Batched inference failed: size=%d", len(tensors))
+            for session, message in tensors:
+                session.send(("error", message[1], type(exc).__name__, str(exc)))
+            return
+        finally:
+            del items
+        for (session, message), boxes in zip(tensors, results):
+            session.send(_boxes_message(message[1], boxes))
+
+
+class RemoteModelRunner(IModelRunner):
+    """IModelRunner backed by an InferenceServer; preprocessing stays in-process"""
+
+    def __init__(
+        self,
+        address: str,
+        authkey: bytes,
+        slots: int = 4,
+        img_size: int = 640,
+        connect_timeout: float = 30.0,
+    ) -> None:
+        self.address = address
+        self._conn = self._connect(address, authkey, connect_timeout)
+        self._closed = False
+        self._receiver: threading.Thread | None = None
+        self._send_lock = threading.Lock()
+        self.slots = max(1, slots)
+        # Slot size is fixed by img_size; the server's value wins after the
+        # handshake, so size for the larger of the two.
+        self._slot_bytes = 3 * img_size * img_size * _FLOAT_BYTES
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slots * self._slot_bytes)
+        self._conn.send(("hello", self._shm.name, self.slots, self._slot_bytes))
+        kind, info = self._conn.recv()
+        if kind != "welcome":
+            raise InvalidFormatError(f"Unexpected inference server reply: {kind}")
+        self.img_size = int(info["img_size"])
+        self.letterbox = bool(info["letterbox"])
+        self.tile_size = int(info["tile_size"])
+        self._fingerprint = str(info["fingerprint"])
+        if 3 * self.img_size * self.img_size * _FLOAT_BYTES > self._slot_bytes:
+            self.close()
+            raise InvalidFormatError(
+                f"Server img_size={self.img_size} exceeds client slot size; set MODEL_IMG_SIZE accordingly"
+            )
+
+        self._free_slots: "queue.Queue[int]" = queue.Queue()
+        for slot in range(self.slots):
+            self._free_slots.put(slot)
+        self._request_ids = itertools.count()
+        self._pending: Dict[int, Future] = {}
+        self._pending_lock = threading.Lock()
+        self._receiver = threading.Thread(target=self._receive_loop, name="inference-client", daemon=True)
+        self._receiver.start()
+        logger.info(
+            "Connected to inference server: address=%s fingerprint=%s slots=%d",
+            address,
+            self._fingerprint,
+            self.slots,
+        )
+
+    @staticmethod
+    def _connect(address: str, authkey: bytes, timeout: float) -> connection.Connection:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return connection.Client(_parse_address(address), family=_address_family(address), authkey=authkey)
+            except (FileNotFoundError, ConnectionRefusedError) as exc:
+                if time.monotonic() >= deadline:
+                    raise ModelNotFoundError(f"Inference server not reachable at {address}") from exc
+                time.sleep(0.2)
+
+    @property
+    def fingerprint(self) -> str:
+        return self._fingerprint
+
+    def _receive_loop(self) -> None:
+        try:
+            while True:
+                message = self._conn.recv()
+                with self._pending_lock:
+                    future = self._pending.pop(message[1], None)
+                if future is None:
+                    continue
+                if message[0] == "result":
+                    _, _, class_id, xywh, score = message
+                    future.set_result(BoxSet(class_id, xywh, score))
+                else:
+                    _, _, error_type, detail = message
+                    future.set_exception(InvalidFormatError(f"Inference server error ({error_type}): {detail}"))
+        except (EOFError, OSError):
+            if not self._closed:
+                logger.error("Inference server connection lost: address=%s", self.address)
+        finally:
+            with self._pending_lock:
+                pending, self._pending = self._pending, {}
+            for future in pending.values():
+                future.set_exception(InvalidFormatError("Inference server connection lost"))
+
+    def _request(self, message: tuple) -> BoxSet:
+        if self._closed:
+            raise InvalidFormatError("Inference client is closed")
+        future: Future = Future()
+        with self._pending_lock:
+            self._pending[message[1]] = future
+        with self._send_lock:
+            self._conn.send(message)
+        return future.result()
+
+    def predict(self, image_bytes: bytes) -> BoxSet:
+        with stage_timer("decode"):
+            image = decode_image(image_bytes)
+        width, height = image.size
+        if width == 0 or height == 0:
+            raise InvalidFormatError("Invalid image size")
+        if self.tile_size > 0 and max(width, height) > self.tile_size:
+            # Tiled inference reads regions lazily on the server side.
+            with stage_timer("inference"):
+                return self._request(("infer_bytes", next(self._request_ids), image_bytes))
+
+        with stage_timer("preprocess"):
+            blob, scale, pad = image_to_blob(image, self.img_size, self.letterbox)
+        with track_queue("shm_slots"):
+            slot = self._free_slots.get()
+        try:
+            view = np.ndarray(blob.shape, dtype=np.float32, buffer=self._shm.buf, offset=slot * self._slot_bytes)
+            view[...] = blob
+            del view
+            with stage_timer("inference"):
+                return self._request(
+                    ("infer", next(self._request_ids), slot, blob.shape, width, height, scale, pad)
+                )
+        finally:
+            self._free_slots.put(slot)
+
+    def close(self) -> None:
+        """Say goodbye, stop the receiver thread, disconnect and free the slot ring"""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if self._receiver is not None:
+                try:
+                    with self._send_lock:
+                        self._conn.send(("bye",))
+                except (OSError, EOFError, ValueError):
+                    pass
+                # The server closes its end on "bye", which ends the receiver.
+                if self._receiver is not threading.current_thread():
+                    self._receiver.join(_CLOSE_TIMEOUT_S)
+            self._conn.close()
+        finally:
+            self._shm.close()
+            self._shm.unlink()
+
+    def __del__(self) -> None:  # pragma: no cover - best-effort cleanup
+        if not getattr(self, "_closed", True):
+            try:
+                self.close()
+            except Exception:
+                pass
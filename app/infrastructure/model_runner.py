@@ -1,33 +1,121 @@
 """Model runner interface and implementations"""
 from abc import ABC, abstractmethod
-from io import BytesIO
+import hashlib
+from itertools import islice
+import json
 import logging
 from pathlib import Path
+import threading
+import time
 from typing import Any, Dict, List, Sequence
 
 import numpy as np
 from PIL import Image
 
-try:
-    import onnxruntime as ort
-    _ORT_IMPORT_ERROR = None
-except Exception as exc:  # pragma: no cover - depends on runtime env
-    ort = None
-    _ORT_IMPORT_ERROR = exc
-
+from app.core.boxes import BoxSet
+from app.core.nms import nms
+from app.infrastructure.image_regions import ImageRegionReader, decode_image, tile_boxes
 from app.utils.exceptions import InvalidFormatError, ModelNotFoundError
+from app.utils.metrics import StageTotals, stage_timer
 
 logger = logging.getLogger(__name__)
 
+_ORT_DTYPES = {
+    "tensor(float)": np.float32,
+    "tensor(double)": np.float64,
+    "tensor(int64)": np.int64,
+    "tensor(int32)": np.int32,
+}
+
+
+def _import_onnxruntime() -> Any:
+    """onnxruntime on first session; it is not needed for stub/remote runners"""
+    try:
+        import onnxruntime
+    except Exception as exc:  # pragma: no cover - depends on runtime env
+        raise InvalidFormatError(f"onnxruntime import failed: {exc}") from exc
+    return onnxruntime
+
+
+def letterbox_image(image: np.ndarray, new_size: int) -> tuple[np.ndarray, float, tuple[float, float]]:
+    height, width = image.shape[:2]
+    scale = min(new_size / width, new_size / height)
+    new_w = int(round(width * scale))
+    new_h = int(round(height * scale))
+
+    resized = np.array(Image.fromarray(image).resize((new_w, new_h), Image.BILINEAR))
+    canvas = np.full((new_size, new_size, 3), 114, dtype=np.uint8)
+    pad_x = (new_size - new_w) / 2
+    pad_y = (new_size - new_h) / 2
+    x0 = int(round(pad_x))
+    y0 = int(round(pad_y))
+    canvas[y0 : y0 + new_h, x0 : x0 + new_w] = resized
+    return canvas, scale, (pad_x, pad_y)
+
+
+def image_to_blob(
+    image: Image.Image,
+    img_size: int,
+    letterbox: bool,
+    out: np.ndarray | None = None,
+) -> tuple[np.ndarray, float | tuple[float, float], tuple[float, float]]:
+    """RGB image to (1, 3, img_size, img_size) float32 blob plus scale and padding
+
+    With `out` (a preallocated float32 blob) the result is written in place.
+    """
+    orig_width, orig_height = image.size
+    if letterbox:
+        input_img, scale, pad = letterbox_image(np.array(image), img_size)
+    else:
+        input_img = np.array(image.resize((img_size, img_size), Image.BILINEAR))
+        scale = (img_size / orig_width, img_size / orig_height)
+        pad = (0.0, 0.0)
+    if out is not None:
+        np.multiply(np.transpose(input_img, (2, 0, 1)), np.float32(1.0 / 255.0), out=out[0], casting="unsafe")
+        return out, scale, pad
+    blob = input_img.astype(np.float32) / 255.0
+    blob = np.transpose(blob, (2, 0, 1))[None, ...]
+    return blob, scale, pad
+
+
+class _BoundBuffers:
+    """One thread's IOBinding with its preallocated input and output arrays"""
+
+    def __init__(self, session: Any, input_name: str, input_shape: tuple, outputs: Sequence[tuple]) -> None:
+        self.binding = session.io_binding()
+        self.input = np.zeros(input_shape, dtype=np.float32)
+        self.binding.bind_cpu_input(input_name, self.input)
+        self.outputs: List[np.ndarray] = []
+        for name, shape, dtype in outputs:
+            array = np.empty(shape, dtype=dtype)
+            self.binding.bind_output(name, "cpu", 0, dtype, shape, array.ctypes.data)
+            self.outputs.append(array)
+
 
 class IModelRunner(ABC):
     """Interface for model inference"""
 
     @abstractmethod
-    def predict(self, image_bytes: bytes) -> List[Dict[str, Any]]:
+    def predict(self, image_bytes: bytes) -> BoxSet:
         """Return model prediction boxes for image bytes"""
         raise NotImplementedError
 
+    def predict_batch(self, images: Sequence[bytes]) -> List[BoxSet]:
+        """Predictions for several images; runners with batched inference override this"""
+        return [self.predict(image_bytes) for image_bytes in images]
+
+    def warmup(self, runs: int = 1) -> List[float]:
+        """Run dummy inferences and return per-run latencies in seconds"""
+        return []
+
+    def close(self) -> None:
+        """Release what garbage collection does not (connections, shared memory)"""
+
+    @property
+    def fingerprint(self) -> str:
+        """Stable identifier of model weights and inference settings"""
+        return type(self).__name__
+
 
 class StubModelRunner(IModelRunner):
     """Stub model runner for development"""
@@ -51,9 +139,93 @@ class StubModelRunner(IModelRunner):
                 "score": 0.84,
             },
         ]
+        self._box_set = BoxSet.from_dicts(self._boxes)
+
+    def predict(self, image_bytes: bytes) -> BoxSet:
+        return self._box_set
+
+    @property
+    def fingerprint(self) -> str:
+        payload = json.dumps(self._boxes, sort_keys=True).encode("utf-8")
+        return f"stub-{hashlib.sha1(payload).hexdigest()[:16]}"
+
 
-    def predict(self, image_bytes: bytes) -> List[Dict[str, Any]]:
-        return [dict(box) for box in self._boxes]
+class SyntheticModelRunner(IModelRunner):
+    """Model-free runner for load tests: random boxes plus simulated latency
+
+    Boxes are seeded from the image bytes, so repeated requests for the same
+    image return the same predictions.
+    """
+
+    def __init__(
+        self,
+        box_count: int = 20,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        num_classes: int = 3,
+        seed: int = 0,
+    ) -> None:
+        self.box_count = box_count
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.num_classes = num_classes
+        self.seed = seed
+        self._jitter_rng = np.random.default_rng(seed)
+        # Generators are not thread-safe; requests share the runner.
+        self._jitter_lock = threading.Lock()
+
+    def _simulate_latency(self) -> None:
+        delay_ms = self.latency_ms
+        if self.jitter_ms > 0:
+            with self._jitter_lock:
+                delay_ms += float(self._jitter_rng.uniform(-self.jitter_ms, self.jitter_ms))
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000.0)
+
+    def predict(self, image_bytes: bytes) -> BoxSet:
+        boxes = self._boxes_for(image_bytes)
+        self._simulate_latency()
+        return boxes
+
+    def predict_batch(self, images: Sequence[bytes]) -> List[BoxSet]:
+        # One simulated latency per batch, like a batched session.run.
+        boxes = [self._boxes_for(image_bytes) for image_bytes in images]
+        if images:
+            self._simulate_latency()
+        return boxes
+
+    def _boxes_for(self, image_bytes: bytes) -> BoxSet:
+        digest = hashlib.blake2b(image_bytes, digest_size=8).digest()
+        rng = np.random.default_rng([self.seed, int.from_bytes(digest, "little")])
+        count = self.box_count
+        xywh = np.column_stack(
+            [
+                rng.uniform(0.05, 0.95, count),
+                rng.uniform(0.05, 0.95, count),
+                rng.uniform(0.02, 0.2, count),
+                rng.uniform(0.02, 0.2, count),
+            ]
+        )
+        return BoxSet(
+            rng.integers(0, self.num_classes, count),
+            xywh,
+            rng.uniform(0.25, 1.0, count),
+        )
+
+    def warmup(self, runs: int = 1) -> List[float]:
+        latencies = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            self._simulate_latency()
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    @property
+    def fingerprint(self) -> str:
+        return (
+            f"synthetic-{self.box_count}-{self.num_classes}-{self.seed}"
+            f"-{self.latency_ms:g}ms"
+        )
 
 
 class OnnxModelRunner(IModelRunner):
@@ -67,9 +239,15 @@ class OnnxModelRunner(IModelRunner):
         max_det: int = 100,
         letterbox: bool = True,
         providers: Sequence[str] | None = None,
+        tile_size: int = 0,
+        tile_overlap: int = 64,
+        tile_batch_size: int = 4,
+        tile_nms_iou: float = 0.5,
+        max_decoded_pixels: int = 0,
+        batch_size: int = 8,
+        io_binding: bool = True,
     ) -> None:
-        if ort is None:
-            raise InvalidFormatError(f"onnxruntime import failed: {_ORT_IMPORT_ERROR}")
+        ort = _import_onnxruntime()
 
         self.model_path = Path(model_path)
         if not self.model_path.is_file():
@@ -79,6 +257,11 @@ class OnnxModelRunner(IModelRunner):
         self.conf_threshold = conf_threshold
         self.max_det = max_det
         self.letterbox = letterbox
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.tile_nms_iou = tile_nms_iou
+        self.max_decoded_pixels = max_decoded_pixels
+        self.batch_size = max(1, batch_size)
         self._providers = list(providers) if providers else ["CPUExecutionProvider"]
         logger.info("Loading ONNX model: %s", self.model_path)
         try:
@@ -89,7 +272,85 @@ class OnnxModelRunner(IModelRunner):
         input_meta = self._session.get_inputs()[0]
         self._input_name = input_meta.name
         self._sync_img_size_from_model(input_meta.shape)
-        logger.info("ONNX model loaded. input=%s providers=%s", self._input_name, self._providers)
+        batch_dim = input_meta.shape[0] if input_meta.shape else 1
+        # Fixed-batch exports (usually batch=1) cannot take stacked inputs.
+        self._dynamic_batch = not isinstance(batch_dim, int)
+        self._tile_batch_size = max(1, tile_batch_size) if self._dynamic_batch else 1
+        self._bound_outputs = self._fixed_output_specs(input_meta) if io_binding else None
+        self._bound = threading.local()
+        self._fingerprint = self._compute_fingerprint()
+        logger.info(
+            "ONNX model loaded. input=%s providers=%s fingerprint=%s io_binding=%s",
+            self._input_name,
+            self._providers,
+            self._fingerprint,
+            self._bound_outputs is not None,
+        )
+
+    @property
+    def input_name(self) -> str:
+        return self._input_name
+
+    @property
+    def uses_io_binding(self) -> bool:
+        return self._bound_outputs is not None
+
+    def _fixed_output_specs(self, input_meta: Any) -> List[tuple] | None:
+        """(name, shape, dtype) of every output when all shapes are known for batch 1.
+
+        A symbolic leading batch dimension is resolved to 1; any other
+        symbolic dimension (e.g. detection count after in-graph NMS) means the
+        output size depends on the input, so single-image runs keep using
+        session.run.
+        """
+        if input_meta.type != "tensor(float)" or len(input_meta.shape or ()) != 4:
+            return None
+        specs = []
+        for output in self._session.get_outputs():
+            dtype = _ORT_DTYPES.get(output.type)
+            shape = list(output.shape or ())
+            if dtype is None or not shape:
+                return None
+            if not isinstance(shape[0], int):
+                shape[0] = 1
+            if not all(isinstance(dim, int) and dim > 0 for dim in shape) or shape[0] != 1:
+                return None
+            specs.append((output.name, tuple(shape), dtype))
+        return specs
+
+    def _bound_buffers(self) -> _BoundBuffers:
+        # IOBinding objects are not thread-safe; each thread binds its own buffers.
+        buffers = getattr(self._bound, "buffers", None)
+        if buffers is None:
+            buffers = _BoundBuffers(
+                self._session,
+                self._input_name,
+                (1, 3, self.img_size, self.img_size),
+                self._bound_outputs,
+            )
+            self._bound.buffers = buffers
+        return buffers
+
+    @property
+    def fingerprint(self) -> str:
+        return self._fingerprint
+
+    def _compute_fingerprint(self) -> str:
+        hasher = hashlib.sha256()
+        with self.model_path.open("rb") as handle:
+            for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+                hasher.update(chunk)
+        params = (
+            self.img_size,
+            self.conf_threshold,
+            self.max_det,
+            self.letterbox,
+            self.tile_size,
+            self.tile_overlap,
+            self.tile_nms_iou,
+        )
+        hasher.update(repr(params).encode("utf-8"))
+        return f"onnx-{hasher.hexdigest()[:16]}"
 
     def _sync_img_size_from_model(self, input_shape: Sequence[Any]) -> None:
         if not input_shape or len(input_shape) < 4:
@@ -116,52 +377,220 @@ class OnnxModelRunner(IModelRunner):
             )
             self.img_size = height
 
-    def predict(self, image_bytes: bytes) -> List[Dict[str, Any]]:
-        image = Image.open(BytesIO(image_bytes)).convert("RGB")
+    def warmup(self, runs: int = 1) -> List[float]:
+        """Run dummy inferences at img_size to trigger ORT lazy initialization"""
+        blob = np.zeros((1, 3, self.img_size, self.img_size), dtype=np.float32)
+        latencies: List[float] = []
+        for _ in range(max(0, runs)):
+            started = time.perf_counter()
+            self._session.run(None, {self._input_name: blob})
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    def preprocess(
+        self,
+        image_bytes: bytes,
+    ) -> tuple[np.ndarray, int, int, float | tuple[float, float], tuple[float, float]]:
+        """Decode image bytes into NCHW float blob plus geometry for postprocessing"""
+        with stage_timer("decode"):
+            image = decode_image(image_bytes)
         orig_width, orig_height = image.size
         if orig_width == 0 or orig_height == 0:
             raise InvalidFormatError("Invalid image size")
+        with stage_timer("preprocess"):
+            blob, scale, pad = self._to_blob(image)
+        return blob, orig_width, orig_height, scale, pad
 
-        if self.letterbox:
-            input_img, scale, pad = self._letterbox(np.array(image), self.img_size)
-        else:
-            input_img = np.array(
-                image.resize((self.img_size, self.img_size), Image.BILINEAR)
-            )
-            scale = (self.img_size / orig_width, self.img_size / orig_height)
-            pad = (0.0, 0.0)
-        blob = input_img.astype(np.float32) / 255.0
-        blob = np.transpose(blob, (2, 0, 1))[None, ...]
-
-        outputs = self._session.run(None, {self._input_name: blob})
+    def _to_blob(
+        self,
+        image: Image.Image,
+    ) -> tuple[np.ndarray, float | tuple[float, float], tuple[float, float]]:
+        return image_to_blob(image, self.img_size, self.letterbox)
+
+    def _tiled_reader(self, image_bytes: bytes) -> ImageRegionReader | None:
+        if self.tile_size <= 0:
+            return None
+        reader = ImageRegionReader(image_bytes, self.max_decoded_pixels)
+        return reader if max(reader.width, reader.height) > self.tile_size else None
+
+    def predict(self, image_bytes: bytes) -> BoxSet:
+        reader = self._tiled_reader(image_bytes)
+        if reader is not None:
+            return self.predict_tiled(reader)
+        if self._bound_outputs is not None:
+            return self._predict_bound(image_bytes)
+
+        blob, orig_width, orig_height, scale, pad = self.preprocess(image_bytes)
+
+        with stage_timer("inference"):
+            outputs = self._session.run(None, {self._input_name: blob})
         logger.debug(
             "ONNX outputs shapes: %s",
             [np.asarray(output).shape for output in outputs],
         )
-        return self._parse_outputs(
-            outputs,
-            orig_width,
-            orig_height,
-            scale,
-            pad,
-            self.img_size,
-        )
+        with stage_timer("postprocess"):
+            return self._parse_outputs(
+                outputs,
+                orig_width,
+                orig_height,
+                scale,
+                pad,
+                self.img_size,
+            )
 
-    @staticmethod
-    def _letterbox(image: np.ndarray, new_size: int) -> tuple[np.ndarray, float, tuple[float, float]]:
-        height, width = image.shape[:2]
-        scale = min(new_size / width, new_size / height)
-        new_w = int(round(width * scale))
-        new_h = int(round(height * scale))
-
-        resized = np.array(Image.fromarray(image).resize((new_w, new_h), Image.BILINEAR))
-        canvas = np.full((new_size, new_size, 3), 114, dtype=np.uint8)
-        pad_x = (new_size - new_w) / 2
-        pad_y = (new_size - new_h) / 2
-        x0 = int(round(pad_x))
-        y0 = int(round(pad_y))
-        canvas[y0 : y0 + new_h, x0 : x0 + new_w] = resized
-        return canvas, scale, (pad_x, pad_y)
+    def _predict_bound(self, image_bytes: bytes) -> BoxSet:
+        """predict() through IOBinding: the blob and outputs reuse this thread's buffers.
+
+        _parse_outputs copies what it keeps, so the buffers can be
+        overwritten by the next call.
+        """
+        buffers = self._bound_buffers()
+        with stage_timer("decode"):
+            image = decode_image(image_bytes)
+        orig_width, orig_height = image.size
+        if orig_width == 0 or orig_height == 0:
+            raise InvalidFormatError("Invalid image size")
+        with stage_timer("preprocess"):
+            _, scale, pad = image_to_blob(image, self.img_size, self.letterbox, out=buffers.input)
+        with stage_timer("inference"):
+            self._session.run_with_iobinding(buffers.binding)
+        with stage_timer("postprocess"):
+            return self._parse_outputs(buffers.outputs, orig_width, orig_height, scale, pad, self.img_size)
+
+    def predict_batch(self, images: Sequence[bytes]) -> List[BoxSet]:
+        """Stack up to `batch_size` images per session.run on dynamic-batch models.
+
+        Images that need tiling go through predict_tiled individually.
+        """
+        if not self._dynamic_batch or len(images) < 2:
+            return super().predict_batch(images)
+
+        results: List[BoxSet | None] = [None] * len(images)
+        pending_index = []
+        pending = []
+        for index, image_bytes in enumerate(images):
+            reader = self._tiled_reader(image_bytes)
+            if reader is not None:
+                results[index] = self.predict_tiled(reader)
+            else:
+                pending_index.append(index)
+                pending.append(self.preprocess(image_bytes))
+
+        for index, boxes in zip(pending_index, self.predict_blobs(pending)):
+            results[index] = boxes
+        return results
+
+    def predict_blobs(
+        self,
+        items: Sequence[tuple[np.ndarray, int, int, float | tuple[float, float], tuple[float, float]]],
+    ) -> List[BoxSet]:
+        """Run preprocessed (blob, width, height, scale, pad) items, batched when possible"""
+        step = self.batch_size if self._dynamic_batch else 1
+        results: List[BoxSet] = []
+        for start in range(0, len(items), step):
+            chunk = items[start : start + step]
+            blob = chunk[0][0] if len(chunk) == 1 else np.concatenate([item[0] for item in chunk])
+            with stage_timer("inference"):
+                outputs = self._session.run(None, {self._input_name: blob})
+            with stage_timer("postprocess"):
+                for offset, (_, orig_width, orig_height, scale, pad) in enumerate(chunk):
+                    results.append(
+                        self._parse_outputs(
+                            [output[offset : offset + 1] for output in outputs],
+                            orig_width,
+                            orig_height,
+                            scale,
+                            pad,
+                            self.img_size,
+                        )
+                    )
+        return results
+
+    def predict_tiled(self, reader: ImageRegionReader) -> BoxSet:
+        """Run inference over overlapping tiles and merge boxes with NMS.
+
+        Only `tile_batch_size` tiles are decoded and held as tensors at a time,
+        so peak memory depends on tile size, not on image size. `max_det`
+        applies per tile. Stage timings are summed over tiles and recorded
+        once per image.
+        """
+        stages = StageTotals()
+        try:
+            return self._predict_tiled(reader, stages)
+        finally:
+            stages.observe()
+
+    def _predict_tiled(self, reader: ImageRegionReader, stages: StageTotals) -> BoxSet:
+        width, height = reader.width, reader.height
+        if width == 0 or height == 0:
+            raise InvalidFormatError("Invalid image size")
+
+        xyxy: List[np.ndarray] = []
+        scores: List[np.ndarray] = []
+        class_ids: List[np.ndarray] = []
+        tiles = tile_boxes(width, height, self.tile_size, self.tile_overlap)
+        while True:
+            batch = list(islice(tiles, self._tile_batch_size))
+            if not batch:
+                break
+            blobs = []
+            geometry = []
+            for box in batch:
+                with stages.timer("decode"):
+                    tile_image = reader.read(box)
+                with stages.timer("preprocess"):
+                    blob, scale, pad = self._to_blob(tile_image)
+                blobs.append(blob)
+                geometry.append((box, scale, pad))
+            with stages.timer("inference"):
+                if self._tile_batch_size > 1:
+                    batch_outputs = self._session.run(None, {self._input_name: np.concatenate(blobs)})
+                    per_tile = [
+                        [output[index : index + 1] for output in batch_outputs]
+                        for index in range(len(blobs))
+                    ]
+                else:
+                    per_tile = [self._session.run(None, {self._input_name: blobs[0]})]
+
+            with stages.timer("postprocess"):
+                for outputs, (box, scale, pad) in zip(per_tile, geometry):
+                    x0, y0, x1, y1 = box
+                    tile_w, tile_h = x1 - x0, y1 - y0
+                    detections = self._parse_outputs(outputs, tile_w, tile_h, scale, pad, self.img_size)
+                    if len(detections) == 0:
+                        continue
+                    xywh = detections.xywh.astype(np.float64)
+                    centers_x = x0 + xywh[:, 0] * tile_w
+                    centers_y = y0 + xywh[:, 1] * tile_h
+                    half_w = xywh[:, 2] * tile_w / 2
+                    half_h = xywh[:, 3] * tile_h / 2
+                    xyxy.append(
+                        np.column_stack(
+                            [centers_x - half_w, centers_y - half_h, centers_x + half_w, centers_y + half_h]
+                        )
+                    )
+                    scores.append(detections.score)
+                    class_ids.append(detections.class_id)
+
+        if not xyxy:
+            return BoxSet.empty(scored=True)
+        all_xyxy = np.concatenate(xyxy)
+        all_scores = np.concatenate(scores)
+        all_classes = np.concatenate(class_ids)
+        with stages.timer("postprocess"):
+            keep = nms(all_xyxy, all_scores, self.tile_nms_iou, class_ids=all_classes)
+        logger.debug("Tiled inference: candidates=%d kept=%d", all_scores.shape[0], keep.shape[0])
+
+        kept = all_xyxy[keep]
+        xywh = np.column_stack(
+            [
+                (kept[:, 0] + kept[:, 2]) / 2 / width,
+                (kept[:, 1] + kept[:, 3]) / 2 / height,
+                (kept[:, 2] - kept[:, 0]) / width,
+                (kept[:, 3] - kept[:, 1]) / height,
+            ]
+        )
+        return BoxSet(all_classes[keep], xywh, all_scores[keep])
 
     def _parse_outputs(
         self,
@@ -171,9 +600,9 @@ class OnnxModelRunner(IModelRunner):
         scale: float | tuple[float, float],
         pad: tuple[float, float],
         input_size: int,
-    ) -> List[Dict[str, Any]]:
+    ) -> BoxSet:
         if not outputs:
-            return []
+            return BoxSet.empty(scored=True)
 
         arrays = [np.squeeze(output) for output in outputs]
 
@@ -212,7 +641,7 @@ class OnnxModelRunner(IModelRunner):
         confidences = confidences[mask]
 
         if boxes.shape[0] == 0:
-            return []
+            return BoxSet.empty(scored=True)
 
         if boxes.shape[0] > self.max_det:
             order = np.argsort(confidences)[::-1][: self.max_det]
@@ -251,70 +680,47 @@ class OnnxModelRunner(IModelRunner):
         detections: np.ndarray,
         orig_width: int,
         orig_height: int,
-        scale: float,
+        scale: float | tuple[float, float],
         pad: tuple[float, float],
         input_size: int,
         *,
         xyxy: bool,
-    ) -> List[Dict[str, Any]]:
+    ) -> BoxSet:
+        detections = np.asarray(detections, dtype=np.float64)
+        if detections.ndim != 2 or detections.shape[0] == 0 or detections.shape[1] < 6:
+            return BoxSet.empty(scored=True)
         pad_x, pad_y = pad
         if isinstance(scale, tuple):
             scale_x, scale_y = scale
         else:
             scale_x = scale
             scale_y = scale
-        results: List[Dict[str, Any]] = []
-        for det in detections:
-            if det.shape[0] < 6:
-                continue
-            x1, y1, x2, y2, score, class_id = det[:6]
-            if score < self.conf_threshold:
-                continue
-
-            if xyxy:
-                if max(x1, y1, x2, y2) <= 1.5:
-                    x1 *= input_size
-                    x2 *= input_size
-                    y1 *= input_size
-                    y2 *= input_size
-            else:
-                x_center, y_center, width, height = x1, y1, x2, y2
-                if max(x_center, y_center, width, height) <= 1.5:
-                    x_center *= input_size
-                    y_center *= input_size
-                    width *= input_size
-                    height *= input_size
-                x1 = x_center - width / 2
-                y1 = y_center - height / 2
-                x2 = x_center + width / 2
-                y2 = y_center + height / 2
-
-            x1 = (x1 - pad_x) / scale_x
-            y1 = (y1 - pad_y) / scale_y
-            x2 = (x2 - pad_x) / scale_x
-            y2 = (y2 - pad_y) / scale_y
-
-            x1 = float(np.clip(x1, 0, orig_width))
-            y1 = float(np.clip(y1, 0, orig_height))
-            x2 = float(np.clip(x2, 0, orig_width))
-            y2 = float(np.clip(y2, 0, orig_height))
-
-            if x2 <= x1 or y2 <= y1:
-                continue
 
-            x_center = ((x1 + x2) / 2) / orig_width
-            y_center = ((y1 + y2) / 2) / orig_height
-            width = (x2 - x1) / orig_width
-            height = (y2 - y1) / orig_height
-
-            results.append(
-                {
-                    "class_id": int(class_id),
-                    "x_center": x_center,
-                    "y_center": y_center,
-                    "width": width,
-                    "height": height,
-                    "score": float(score),
-                }
-            )
-        return results
+        detections = detections[detections[:, 4] >= self.conf_threshold]
+        coords = detections[:, :4].copy()
+        scores = detections[:, 4]
+        class_ids = detections[:, 5].astype(np.int64)
+
+        # Rows with all values <= 1.5 are normalized to the model input.
+        normalized = coords.max(axis=1) <= 1.5
+        coords[normalized] *= input_size
+        if not xyxy:
+            centers = coords[:, :2].copy()
+            half = coords[:, 2:] / 2
+            coords[:, :2] = centers - half
+            coords[:, 2:] = centers + half
+
+        coords[:, 0::2] = np.clip((coords[:, 0::2] - pad_x) / scale_x, 0, orig_width)
+        coords[:, 1::2] = np.clip((coords[:, 1::2] - pad_y) / scale_y, 0, orig_height)
+        x1, y1, x2, y2 = coords[:, 0], coords[:, 1], coords[:, 2], coords[:, 3]
+        valid = (x2 > x1) & (y2 > y1)
+
+        xywh = np.column_stack(
+            [
+                (x1 + x2) / 2 / orig_width,
+                (y1 + y2) / 2 / orig_height,
+                (x2 - x1) / orig_width,
+                (y2 - y1) / orig_height,
+            ]
+        )
+        return BoxSet(class_ids[valid], xywh[valid], scores[valid])
@@ -1,28 +1,70 @@
 """FastAPI application entry point"""
+import hmac
 import logging
-import csv
+import os
+import shutil
+import tempfile
+from collections import deque
 from datetime import datetime, timezone
-from io import BytesIO, StringIO
+from functools import partial
+from io import BytesIO
 from pathlib import Path
+from typing import Any, Callable, Dict, Literal
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, StreamingResponse
-from openpyxl import Workbook
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 from app.config import settings
-from app.infrastructure.model_runner import OnnxModelRunner, StubModelRunner
+from app.core.sampling import validate_sampling
+from app.core.sharding import merge_partials, parse_shard
+from app.infrastructure.model_runner import IModelRunner
 from app.providers.local_fs import LocalFSAnnotationProvider, LocalFSImageProvider
+from app.services.model_factory import build_model_runner, resolve_model_path, uses_inference_server
+from app.services.model_loader import ModelFileWatcher, ModelLoader
+from app.services.columnar_export import COLUMNAR_FORMATS, bundle_zip, columnar_available, write_columnar_export
 from app.services.model_worker import ModelWorker
-from app.services.report_export import build_report_table
+from app.services.payloads import (
+    BatchAnalysisRequest,
+    MergePartialsRequest,
+    ModelReloadRequest,
+    parse_fields,
+    parse_thresholds,
+    shape_analysis_payload,
+)
+from app.services.renditions import MEDIA_TYPES, build_rendition_service
+from app.services.report_export import (
+    build_evaluation_tables,
+    build_report_table,
+    render_csv,
+    render_xlsx,
+)
+from app.utils.compression import CompressionMiddleware
 from app.utils.exceptions import (
     AnnotationNotFoundError,
     ImageNotFoundError,
     InvalidFormatError,
-    ModelNotFoundError,
+    ValidationMicroserviceError,
 )
+from app.utils.http_cache import (
+    DirectoryVersionCache,
+    FileDigestCache,
+    cache_headers,
+    file_version,
+    is_not_modified,
+    make_etag,
+    not_modified,
+    query_items,
+)
+from app.utils.metrics import MetricsMiddleware, render_metrics
+from app.utils.profiling import StageTimingMiddleware, current_timings, profile_call, sampled
+from app.utils.responses import NDJSON_MEDIA_TYPE, ORJSONResponse, json_line
+from app.utils.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 ERROR_PREFIX = "ERR"
+MODEL_FINGERPRINT_HEADER = "X-Model-Fingerprint"
 
 
 def configure_logging() -> None:
@@ -46,6 +88,7 @@ def create_app() -> FastAPI:
         description="Microservice for Comparative Analysis of Deep Learning Models and Expert Annotations in Biomedical Images",
         docs_url="/docs",
         redoc_url="/redoc",
+        default_response_class=ORJSONResponse,
     )
     
     # CORS middleware for frontend
@@ -56,26 +99,139 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.RESPONSE_COMPRESSION_MIN_SIZE,
+        gzip_level=settings.RESPONSE_GZIP_LEVEL,
+        brotli_quality=settings.RESPONSE_BROTLI_QUALITY,
+    )
+    if settings.PROFILING_ENABLED or settings.SLOW_REQUEST_THRESHOLD_MS > 0:
+        app.add_middleware(StageTimingMiddleware, slow_threshold_ms=settings.SLOW_REQUEST_THRESHOLD_MS)
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
     
     image_provider = LocalFSImageProvider()
     annotation_provider = LocalFSAnnotationProvider()
-    model_path = Path(settings.MODELS_PATH) / settings.MODEL_FILE
-    try:
-        model_runner = OnnxModelRunner(
-            model_path=model_path,
-            img_size=settings.MODEL_IMG_SIZE,
-            conf_threshold=settings.MODEL_CONF_THRESHOLD,
-            max_det=settings.MODEL_MAX_DET,
-            letterbox=settings.MODEL_LETTERBOX,
+    rendition_service = build_rendition_service(image_provider)
+    model_loader = ModelLoader(
+        build_model_runner,
+        warmup_runs=settings.MODEL_WARMUP_RUNS,
+        reload_factory=partial(build_model_runner, fallback=False),
+    )
+    model_loader.start()
+    app.state.model_loader = model_loader
+    app.state.model_watcher = None
+    if settings.MODEL_WATCH_INTERVAL > 0 and settings.INFERENCE_MODE == "local":
+        # Watch the file behind the serving runner (the configured one while
+        # the stub fallback serves), so switching models moves the watch too.
+        model_watcher = ModelFileWatcher(
+            lambda: getattr(model_loader.runner, "model_path", None) or resolve_model_path(),
+            model_loader.reload,
+            interval_s=settings.MODEL_WATCH_INTERVAL,
         )
-        logger.info("Using ONNX model: %s", model_path)
-    except ModelNotFoundError:
-        logger.warning("Model file not found. Using stub runner. path=%s", model_path)
-        model_runner = StubModelRunner()
-    except Exception:
-        logger.exception("Failed to initialize ONNX model. Using stub runner. path=%s", model_path)
-        model_runner = StubModelRunner()
-    model_worker = ModelWorker(image_provider, annotation_provider, model_runner)
+        model_watcher.start()
+        app.state.model_watcher = model_watcher
+
+    digest_cache = FileDigestCache()
+    directory_versions = DirectoryVersionCache(settings.DATASET_VERSION_TTL_S)
+    file_cache_control = f"public, max-age={settings.HTTP_CACHE_MAX_AGE}"
+    # Analysis results are cheap to revalidate and must follow model/label changes.
+    analysis_cache_control = "public, no-cache"
+
+    def annotation_version(image_id: str) -> str:
+        try:
+            return file_version(annotation_provider.get_annotation_path(image_id))
+        except (AnnotationNotFoundError, InvalidFormatError):
+            return "missing"
+
+    def dataset_version() -> str:
+        return make_etag(
+            directory_versions.version(image_provider.images_path),
+            directory_versions.version(annotation_provider.labels_path),
+        )
+
+    def build_model_worker(model_runner: IModelRunner) -> ModelWorker:
+        return ModelWorker(
+            image_provider,
+            annotation_provider,
+            model_runner,
+            read_ahead=settings.DATASET_READ_AHEAD,
+            read_ahead_bytes=settings.DATASET_READ_AHEAD_BYTES,
+        )
+
+    async def get_model_worker() -> ModelWorker:
+        # The worker keeps its runner open across a reload until the request
+        # (including a streamed response) lets go of it.
+        model_worker = await run_in_threadpool(
+            model_loader.acquire, build_model_worker, settings.MODEL_READY_TIMEOUT
+        )
+        if model_worker is None:
+            logger.warning("%s Model is not ready: state=%s", ERROR_PREFIX, model_loader.status()["state"])
+            raise HTTPException(status_code=503, detail="Model is not ready")
+        return model_worker
+
+    def model_headers(headers: Dict[str, str], model_worker: ModelWorker) -> Dict[str, str]:
+        """Tag a model-derived response with the fingerprint of the model that produced it"""
+        return {**headers, MODEL_FINGERPRINT_HEADER: model_worker.model_fingerprint}
+
+    def check_admin(request: Request) -> None:
+        if not settings.ADMIN_TOKEN:
+            logger.warning("%s Admin endpoint called but ADMIN_TOKEN is not set", ERROR_PREFIX)
+            raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+        token = request.headers.get("X-Admin-Token", "")
+        if not hmac.compare_digest(token.encode("utf-8"), settings.ADMIN_TOKEN.encode("utf-8")):
+            logger.warning("%s Invalid admin token", ERROR_PREFIX)
+            raise HTTPException(status_code=401, detail="Invalid admin token")
+
+    def check_profiling(profile: bool, profile_dump: bool) -> bool:
+        if not (profile or profile_dump):
+            return False
+        if not settings.PROFILING_ENABLED:
+            logger.warning("%s Profiling requested but PROFILING_ENABLED is off", ERROR_PREFIX)
+            raise HTTPException(status_code=403, detail="Profiling is disabled")
+        return True
+
+    def run_profiled(func: Callable[[], Any], profile_dump: bool, name: str) -> tuple[Any, Dict | None]:
+        # cProfile slows the request several-fold; only a share of opted-in
+        # requests run it, the rest still get stage timings.
+        if not (profile_dump and sampled(settings.PROFILE_SAMPLE_RATE)):
+            return func(), None
+        return profile_call(
+            func,
+            top_n=settings.PROFILE_TOP_N,
+            dump_dir=settings.PROFILE_DUMP_PATH or None,
+            dump_name=name,
+        )
+
+    analysis_flight = SingleFlight("analysis")
+    dataset_flight = SingleFlight("dataset")
+
+    async def compute(
+        flight: SingleFlight,
+        key: tuple,
+        func: Callable[[], Any],
+        profiled: bool,
+        profile_dump: bool,
+        name: str,
+    ) -> tuple[Any, Dict | None]:
+        """Run func off the event loop; unprofiled identical calls share one run"""
+        if profiled or not settings.ANALYSIS_SINGLE_FLIGHT:
+            return await run_in_threadpool(run_profiled, func, profile_dump, name)
+        return await flight.run(key, func), None
+
+    def profiling_headers(headers: Dict[str, str]) -> Dict[str, str]:
+        timings = current_timings()
+        headers = {**headers, "Cache-Control": "no-store"}
+        if timings is not None:
+            headers["Server-Timing"] = timings.server_timing()
+        return headers
+
+    def attach_profile(payload: Dict[str, Any], cprofile_report: Dict | None) -> Dict[str, Any]:
+        timings = current_timings()
+        payload = {**payload, "timings": timings.to_dict() if timings is not None else None}
+        if cprofile_report is not None:
+            payload["cprofile"] = cprofile_report
+        return payload
 
     # Health check endpoint
     @app.get("/health", tags=["Health"])
@@ -87,7 +243,57 @@ def create_app() -> FastAPI:
             "version": settings.APP_VERSION,
             "environment": settings.ENV_MODE,
         }
+
+    # Readiness endpoint (model loaded and warmed up)
+    @app.get("/ready", tags=["Health"])
+    async def readiness_check():
+        """Readiness check endpoint"""
+        status = model_loader.status()
+        if not status["ready"]:
+            return ORJSONResponse(status_code=503, content={"status": "not_ready", **status})
+        return {"status": "ready", **status}
+
+    @app.post("/api/v1/admin/model/reload", tags=["Admin"], status_code=202)
+    async def reload_model(request: Request, body: ModelReloadRequest | None = None):
+        """Build and warm a new model runner in the background, then swap it in
+
+        Needs the `X-Admin-Token` header (ADMIN_TOKEN). `model_file` switches
+        to another file in MODELS_PATH; without it the serving model is
+        reloaded from disk. The current model serves until the new one is
+        warm; /ready reports `reload_state`, `fingerprint` and `generation`.
+        With INFERENCE_MODE=server the inference server owns the model, so
+        `model_file` is rejected and a reload only reconnects to it.
+        """
+        check_admin(request)
+        model_file = body.model_file if body is not None else None
+        factory = None
+        if model_file:
+            if uses_inference_server():
+                logger.warning("%s Model file switch requested in server mode: %s", ERROR_PREFIX, model_file)
+                raise HTTPException(
+                    status_code=409,
+                    detail="model_file cannot be switched in INFERENCE_MODE=server; restart the inference server",
+                )
+            if Path(model_file).name != model_file:
+                logger.warning("%s Invalid model file name: %s", ERROR_PREFIX, model_file)
+                raise HTTPException(status_code=400, detail="model_file must be a file name in MODELS_PATH")
+            if not resolve_model_path(model_file=model_file).is_file():
+                logger.warning("%s Model file not found for reload: %s", ERROR_PREFIX, model_file)
+                raise HTTPException(status_code=404, detail=f"Model file not found: {model_file}")
+            factory = partial(build_model_runner, model_file=model_file, fallback=False)
+        if not model_loader.reload(factory):
+            logger.warning("%s Model reload requested while loading", ERROR_PREFIX)
+            raise HTTPException(status_code=409, detail="Model is already loading")
+        logger.info("Model reload started: model_file=%s", model_file or "(current)")
+        return ORJSONResponse(status_code=202, content={"status": "reloading", **model_loader.status()})
     
+    if settings.METRICS_ENABLED:
+        @app.get("/metrics", tags=["Health"], include_in_schema=False)
+        async def metrics():
+            """Prometheus metrics (aggregated across workers in multiprocess mode)"""
+            payload, content_type = await run_in_threadpool(render_metrics)
+            return Response(content=payload, media_type=content_type)
+
     # Info endpoint
     @app.get("/api/v1/info", tags=["Info"])
     async def get_info():
@@ -100,7 +306,7 @@ def create_app() -> FastAPI:
         }
 
     @app.get("/api/v1/images/{image_id}/file", tags=["Images"])
-    async def get_image_file(image_id: str):
+    async def get_image_file(image_id: str, request: Request):
         """Return raw image file by id"""
         try:
             image_path = image_provider.get_image_path(image_id)
@@ -110,7 +316,87 @@ def create_app() -> FastAPI:
         except InvalidFormatError as exc:
             logger.warning("%s Invalid image id: image_id=%s", ERROR_PREFIX, image_id)
             raise HTTPException(status_code=400, detail=str(exc)) from exc
-        return FileResponse(image_path)
+        last_modified = image_path.stat().st_mtime
+        etag = make_etag("image", image_id, file_version(image_path))
+        headers = cache_headers(etag, file_cache_control, last_modified)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified(headers)
+        return FileResponse(image_path, headers=headers)
+
+    @app.get("/api/v1/images/{image_id}/rendition", tags=["Images"])
+    async def get_image_rendition(
+        request: Request,
+        image_id: str,
+        level: int | None = None,
+        size: int | None = None,
+        format: str = settings.RENDITION_FORMAT,
+        quality: int = settings.RENDITION_QUALITY,
+    ):
+        """Return downscaled image by pyramid level or max side size"""
+        try:
+            source_path = image_provider.get_image_path(image_id)
+            last_modified = source_path.stat().st_mtime
+            etag = make_etag("rendition", image_id, file_version(source_path), query_items(request))
+            headers = cache_headers(etag, file_cache_control, last_modified)
+            if is_not_modified(request, etag, last_modified):
+                return not_modified(headers)
+            path = await run_in_threadpool(
+                rendition_service.get_rendition,
+                image_id,
+                level=level,
+                size=size,
+                image_format=format,
+                quality=quality,
+            )
+        except ImageNotFoundError as exc:
+            logger.warning("%s Image not found: image_id=%s", ERROR_PREFIX, image_id)
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+        except InvalidFormatError as exc:
+            logger.warning("%s Invalid rendition request: image_id=%s", ERROR_PREFIX, image_id)
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        return FileResponse(path, media_type=MEDIA_TYPES[path.suffix.lstrip(".")], headers=headers)
+
+    @app.get("/api/v1/images/{image_id}/tiles/{level}/{col}/{row}", tags=["Images"])
+    async def get_image_tile(
+        request: Request,
+        image_id: str,
+        level: int,
+        col: int,
+        row: int,
+        format: str = settings.RENDITION_FORMAT,
+        quality: int = settings.RENDITION_QUALITY,
+    ):
+        """Return pyramid tile of image"""
+        try:
+            source_path = image_provider.get_image_path(image_id)
+            last_modified = source_path.stat().st_mtime
+            etag = make_etag(
+                "tile",
+                image_id,
+                file_version(source_path),
+                rendition_service.tile_size,
+                (level, col, row),
+                query_items(request),
+            )
+            headers = cache_headers(etag, file_cache_control, last_modified)
+            if is_not_modified(request, etag, last_modified):
+                return not_modified(headers)
+            path = await run_in_threadpool(
+                rendition_service.get_tile,
+                image_id,
+                level,
+                col,
+                row,
+                image_format=format,
+                quality=quality,
+            )
+        except ImageNotFoundError as exc:
+            logger.warning("%s Image not found: image_id=%s", ERROR_PREFIX, image_id)
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+        except InvalidFormatError as exc:
+            logger.warning("%s Invalid tile request: image_id=%s", ERROR_PREFIX, image_id)
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        return FileResponse(path, media_type=MEDIA_TYPES[path.suffix.lstrip(".")], headers=headers)
 
     @app.get("/api/v1/images", tags=["Images"])
     async def list_images():
@@ -130,23 +416,29 @@ def create_app() -> FastAPI:
         }
 
     @app.get("/api/v1/images/{image_id}/annotations", tags=["Images"])
-    async def get_image_annotations(image_id: str):
+    async def get_image_annotations(image_id: str, request: Request):
         """Return annotations for image id"""
         try:
-            boxes = annotation_provider.get_annotations(image_id)
+            labels_path = annotation_provider.get_annotation_path(image_id)
+            last_modified = labels_path.stat().st_mtime
+            etag = make_etag("annotations", image_id, file_version(labels_path))
+            headers = cache_headers(etag, analysis_cache_control, last_modified)
+            if is_not_modified(request, etag, last_modified):
+                return not_modified(headers)
+            boxes = await annotation_provider.get_annotations_async(image_id)
         except AnnotationNotFoundError as exc:
             logger.warning("%s Annotation not found: image_id=%s", ERROR_PREFIX, image_id)
             raise HTTPException(status_code=404, detail=str(exc)) from exc
         except InvalidFormatError as exc:
             logger.warning("%s Invalid annotation format: image_id=%s", ERROR_PREFIX, image_id)
             raise HTTPException(status_code=400, detail=str(exc)) from exc
-        return {"image_id": image_id, "boxes": boxes}
+        return ORJSONResponse({"image_id": image_id, "boxes": boxes.to_dicts()}, headers=headers)
 
     @app.get("/api/v1/viewer/{image_id}", tags=["Viewer"])
-    async def get_viewer_payload(image_id: str):
+    async def get_viewer_payload(image_id: str, request: Request):
         """Return viewer payload (image url + annotations)"""
         try:
-            image_provider.get_image_path(image_id)
+            image_path = image_provider.get_image_path(image_id)
         except ImageNotFoundError as exc:
             logger.warning("%s Image not found: image_id=%s", ERROR_PREFIX, image_id)
             raise HTTPException(status_code=404, detail=str(exc)) from exc
@@ -154,8 +446,19 @@ def create_app() -> FastAPI:
             logger.warning("%s Invalid image id: image_id=%s", ERROR_PREFIX, image_id)
             raise HTTPException(status_code=400, detail=str(exc)) from exc
 
+        etag = make_etag(
+            "viewer",
+            image_id,
+            file_version(image_path),
+            annotation_version(image_id),
+            rendition_service.tile_size,
+        )
+        headers = cache_headers(etag, analysis_cache_control)
+        if is_not_modified(request, etag):
+            return not_modified(headers)
+
         try:
-            boxes = annotation_provider.get_annotations(image_id)
+            boxes = await annotation_provider.get_annotations_async(image_id)
         except AnnotationNotFoundError as exc:
             logger.warning("%s Annotation not found: image_id=%s", ERROR_PREFIX, image_id)
             raise HTTPException(status_code=404, detail=str(exc)) from exc
@@ -163,27 +466,79 @@ def create_app() -> FastAPI:
             logger.warning("%s Invalid annotation format: image_id=%s", ERROR_PREFIX, image_id)
             raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-        return {
+        try:
+            levels = rendition_service.levels(image_id)
+        except Exception:
+            logger.exception("%s Failed to read image levels: image_id=%s", ERROR_PREFIX, image_id)
+            levels = []
+
+        payload = {
             "image_id": image_id,
             "image_url": f"/api/v1/images/{image_id}/file",
-            "boxes": boxes,
+            "boxes": boxes.to_dicts(),
+            "levels": [
+                {
+                    **level,
+                    "url": f"/api/v1/images/{image_id}/rendition?level={level['level']}",
+                }
+                for level in levels
+            ],
+            "tile_size": rendition_service.tile_size,
+            "tile_url_template": f"/api/v1/images/{image_id}/tiles/{{level}}/{{col}}/{{row}}",
         }
+        return ORJSONResponse(payload, headers=headers)
 
     @app.get("/api/v1/analysis/dataset", tags=["Analysis"])
     async def analyze_dataset(
+        request: Request,
         iou_threshold: float = 0.5,
         class_aware: bool = True,
+        distributions: bool = False,
+        profile: bool = False,
+        profile_dump: bool = False,
     ):
-        """Return aggregated stats for full dataset"""
+        """Return aggregated stats for full dataset
+
+        `distributions=true` adds per-class quantiles and histograms of matched
+        IoU, TP/FP scores and box areas. With PROFILING_ENABLED, `profile=true` adds a `timings` block and
+        `profile_dump=true` also attaches a cProfile report.
+        """
         logger.info(
             "Dataset analysis request: iou_threshold=%.2f class_aware=%s",
             iou_threshold,
             class_aware,
         )
+        profiled = check_profiling(profile, profile_dump)
+        model_worker = await get_model_worker()
+        etag_dataset_version = dataset_version()
+        etag = make_etag(
+            "dataset",
+            etag_dataset_version,
+            model_worker.model_fingerprint,
+            query_items(request),
+        )
+        headers = model_headers(cache_headers(etag, analysis_cache_control), model_worker)
+        if not profiled and is_not_modified(request, etag):
+            return not_modified(headers)
         try:
-            result = model_worker.analyze_dataset(
-                iou_threshold=iou_threshold,
-                class_aware=class_aware,
+            result, cprofile_report = await compute(
+                dataset_flight,
+                (
+                    "dataset",
+                    etag_dataset_version,
+                    model_worker.model_fingerprint,
+                    iou_threshold,
+                    class_aware,
+                    distributions,
+                ),
+                lambda: model_worker.analyze_dataset(
+                    iou_threshold=iou_threshold,
+                    class_aware=class_aware,
+                    distributions=distributions,
+                ),
+                profiled,
+                profile_dump,
+                "dataset",
             )
         except ImageNotFoundError as exc:
             logger.warning("%s Images directory not found during dataset analysis", ERROR_PREFIX)
@@ -197,31 +552,315 @@ def create_app() -> FastAPI:
         except Exception:
             logger.exception("%s Dataset analysis failed", ERROR_PREFIX)
             raise HTTPException(status_code=500, detail="Dataset analysis failed")
-        return result
+        if profiled:
+            return ORJSONResponse(attach_profile(result, cprofile_report), headers=profiling_headers(headers))
+        return ORJSONResponse(result, headers=headers)
+
+    @app.get("/api/v1/analysis/dataset/sample", tags=["Analysis"])
+    async def sample_dataset(
+        request: Request,
+        size: int | None = None,
+        seed: int = 0,
+        stratify: bool = False,
+        iou_threshold: float = 0.5,
+        class_aware: bool = True,
+        confidence: float = 0.95,
+        method: Literal["bootstrap", "wilson"] = "bootstrap",
+        resamples: int = 1000,
+        target_half_width: float | None = None,
+        report_every: int = 100,
+        stream: bool = False,
+    ):
+        """Dataset stats over a seeded random sample with confidence intervals
+
+        Images are processed in a seeded random order (`stratify=true`:
+        proportional per dominant expert class) until `size` images are done
+        or every interval's half-width is within `target_half_width`.
+        `stream=true` returns NDJSON snapshots as the intervals narrow (a
+        failure mid-stream ends it with an `error` line); otherwise only the
+        final snapshot is returned.
+        """
+        logger.info(
+            "Dataset sample request: size=%s seed=%d stratify=%s method=%s target=%s stream=%s",
+            size,
+            seed,
+            stratify,
+            method,
+            target_half_width,
+            stream,
+        )
+        try:
+            validate_sampling(confidence, method, resamples)
+        except InvalidFormatError as exc:
+            logger.warning("%s Invalid dataset sample parameters: %s", ERROR_PREFIX, exc)
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        model_worker = await get_model_worker()
+
+        def snapshots():
+            return model_worker.sample_dataset(
+                sample_size=size,
+                seed=seed,
+                stratify=stratify,
+                iou_threshold=iou_threshold,
+                class_aware=class_aware,
+                confidence=confidence,
+                method=method,
+                resamples=resamples,
+                target_half_width=target_half_width,
+                report_every=report_every,
+            )
+
+        try:
+            if stream:
+                # The first snapshot lists (and stratifies) the dataset, so
+                # a missing directory still gets a proper status code.
+                running = snapshots()
+                first = await run_in_threadpool(next, running)
+            else:
+                etag_dataset_version = dataset_version()
+                etag = make_etag(
+                    "dataset-sample",
+                    etag_dataset_version,
+                    model_worker.model_fingerprint,
+                    query_items(request),
+                )
+                headers = model_headers(cache_headers(etag, analysis_cache_control), model_worker)
+                if is_not_modified(request, etag):
+                    return not_modified(headers)
+                result, _ = await compute(
+                    dataset_flight,
+                    ("dataset-sample", etag_dataset_version, model_worker.model_fingerprint, query_items(request)),
+                    lambda: deque(snapshots(), maxlen=1)[0],
+                    False,
+                    False,
+                    "dataset-sample",
+                )
+        except ImageNotFoundError as exc:
+            logger.warning("%s Images directory not found during dataset sampling", ERROR_PREFIX)
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+        except AnnotationNotFoundError as exc:
+            logger.warning("%s Annotation missing during dataset sampling", ERROR_PREFIX)
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+        except InvalidFormatError as exc:
+            logger.warning("%s Invalid annotation format during dataset sampling", ERROR_PREFIX)
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        except Exception:
+            logger.exception("%s Dataset sampling failed", ERROR_PREFIX)
+            raise HTTPException(status_code=500, detail="Dataset sampling failed")
+        if not stream:
+            return ORJSONResponse(result, headers=headers)
+
+        def lines():
+            yield json_line(first)
+            try:
+                for snapshot in running:
+                    yield json_line(snapshot)
+            except ValidationMicroserviceError as exc:
+                logger.warning("%s Dataset sampling stopped: %s", ERROR_PREFIX, exc)
+                status_code = 404 if isinstance(exc, (ImageNotFoundError, AnnotationNotFoundError)) else 400
+                yield json_line({"error": {"status": status_code, "detail": str(exc)}})
+            finally:
+                running.close()
+
+        return StreamingResponse(
+            lines(),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers=model_headers({"Cache-Control": "no-store"}, model_worker),
+        )
+
+    @app.get("/api/v1/analysis/dataset/evaluation", tags=["Analysis"])
+    async def evaluate_dataset(
+        request: Request,
+        iou_threshold: float = 0.5,
+        thresholds: str | None = None,
+        shard: str | None = None,
+        partial: bool = False,
+        profile: bool = False,
+        profile_dump: bool = False,
+    ):
+        """Class-aware and class-agnostic stats, per-class metrics and confusion matrix
+
+        One pass over the dataset: the IoU matrix is computed once per image.
+        Confusion matrix rows are expert classes, columns model classes, with
+        a trailing background row (FP) and column (FN). `thresholds` adds TP
+        counts at further IoU thresholds. `shard` (`index/count` or
+        `start:end`) limits the run to a slice; with `partial=true` the raw
+        counters are returned for POST .../evaluation/merge.
+        """
+        logger.info(
+            "Dataset evaluation request: iou_threshold=%.2f shard=%s partial=%s",
+            iou_threshold,
+            shard,
+            partial,
+        )
+        profiled = check_profiling(profile, profile_dump)
+        try:
+            shard_spec = parse_shard(shard) if shard else None
+            sweep = parse_thresholds(thresholds)
+        except (InvalidFormatError, ValueError) as exc:
+            logger.warning("%s Invalid dataset evaluation parameters: %s", ERROR_PREFIX, exc)
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        if partial and shard_spec is None:
+            raise HTTPException(status_code=400, detail="partial=true requires a shard")
+        model_worker = await get_model_worker()
+        etag_dataset_version = dataset_version()
+        etag = make_etag(
+            "dataset-evaluation",
+            etag_dataset_version,
+            model_worker.model_fingerprint,
+            query_items(request),
+        )
+        headers = model_headers(cache_headers(etag, analysis_cache_control), model_worker)
+        if not profiled and is_not_modified(request, etag):
+            return not_modified(headers)
+        try:
+            result, cprofile_report = await compute(
+                dataset_flight,
+                (
+                    "dataset-evaluation",
+                    etag_dataset_version,
+                    model_worker.model_fingerprint,
+                    iou_threshold,
+                    tuple(sweep),
+                    str(shard_spec),
+                    partial,
+                ),
+                lambda: (
+                    model_worker.evaluate_partial(shard_spec, iou_threshold=iou_threshold, thresholds=sweep)
+                    if partial
+                    else model_worker.evaluate_dataset(
+                        iou_threshold=iou_threshold, shard=shard_spec, thresholds=sweep
+                    )
+                ),
+                profiled,
+                profile_dump,
+                "dataset-evaluation",
+            )
+        except ImageNotFoundError as exc:
+            logger.warning("%s Images directory not found during dataset evaluation", ERROR_PREFIX)
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+        except AnnotationNotFoundError as exc:
+            logger.warning("%s Annotation missing during dataset evaluation", ERROR_PREFIX)
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+        except InvalidFormatError as exc:
+            logger.warning("%s Invalid annotation format during dataset evaluation", ERROR_PREFIX)
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        except Exception:
+            logger.exception("%s Dataset evaluation failed", ERROR_PREFIX)
+            raise HTTPException(status_code=500, detail="Dataset evaluation failed")
+        if profiled:
+            return ORJSONResponse(attach_profile(result, cprofile_report), headers=profiling_headers(headers))
+        return ORJSONResponse(result, headers=headers)
+
+    @app.post("/api/v1/analysis/dataset/evaluation/merge", tags=["Analysis"])
+    async def merge_dataset_evaluation(body: MergePartialsRequest):
+        """Combine shard partials into the same result as a single full run"""
+        logger.info("Evaluation merge request: partials=%d", len(body.partials))
+        try:
+            merged = merge_partials(body.partials)
+        except InvalidFormatError as exc:
+            logger.warning("%s Invalid evaluation partials: %s", ERROR_PREFIX, exc)
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        return ORJSONResponse(
+            {"image_count": merged.image_count, "processed_count": merged.image_count, **merged.to_dict()}
+        )
 
     @app.get("/api/v1/analysis/dataset/export", tags=["Analysis"])
     async def export_dataset_report(
+        request: Request,
         iou_threshold: float = 0.5,
         class_aware: bool = True,
         format: str = "xlsx",
+        evaluation: bool = False,
+        profile: bool = False,
+        profile_dump: bool = False,
     ):
-        """Export per-image stats as Excel report"""
+        """Export per-image stats as Excel report
+
+        `evaluation=true` adds summary (class-aware and class-agnostic),
+        per-class and confusion matrix tables: extra sheets in xlsx, extra
+        sections after a blank line in csv. `format=parquet|arrow` returns a
+        zip with images, boxes and matches tables (every box, score, match
+        pair and IoU), written in batches as images complete. Profiled exports
+        report stage timings in the Server-Timing header and, with
+        `profile_dump=true`, write a .prof file to PROFILE_DUMP_PATH.
+        """
         logger.info(
             "Dataset export request: iou_threshold=%.2f class_aware=%s",
             iou_threshold,
             class_aware,
         )
-        try:
-            image_ids = image_provider.list_image_ids()
-            rows = [
-                model_worker.analyze(
-                    image_id,
+        profiled = check_profiling(profile, profile_dump)
+        normalized_format = format.lower().strip()
+        if normalized_format not in {"xlsx", "csv", *COLUMNAR_FORMATS}:
+            raise HTTPException(status_code=400, detail="Unsupported export format")
+        if normalized_format in COLUMNAR_FORMATS and not columnar_available():
+            logger.warning("%s Columnar export requested but pyarrow is not installed", ERROR_PREFIX)
+            raise HTTPException(status_code=501, detail="Parquet/Arrow export requires pyarrow")
+        model_worker = await get_model_worker()
+        etag_dataset_version = dataset_version()
+        etag = make_etag(
+            "dataset-export",
+            etag_dataset_version,
+            model_worker.model_fingerprint,
+            query_items(request),
+        )
+        validator_headers = model_headers(cache_headers(etag, analysis_cache_control), model_worker)
+        if not profiled and is_not_modified(request, etag):
+            return not_modified(validator_headers)
+        if normalized_format in COLUMNAR_FORMATS:
+            return await export_columnar(
+                model_worker,
+                (
+                    "dataset-export",
+                    etag_dataset_version,
+                    model_worker.model_fingerprint,
+                    iou_threshold,
+                    class_aware,
+                    normalized_format,
+                ),
+                normalized_format,
+                iou_threshold,
+                class_aware,
+                profiled,
+                profile_dump,
+                profiling_headers(validator_headers) if profiled else validator_headers,
+            )
+
+        def collect_rows() -> tuple[list, Dict[str, Any] | None]:
+            if evaluation:
+                result = model_worker.evaluate_dataset(
                     iou_threshold=iou_threshold,
                     class_aware=class_aware,
+                    include_images=True,
                     allow_missing_annotations=True,
                 )
-                for image_id in image_ids
-            ]
+                return result.pop("images"), result
+            results = model_worker.iter_analyze(
+                image_provider.iter_image_ids(ordered=True),
+                iou_threshold=iou_threshold,
+                class_aware=class_aware,
+                allow_missing_annotations=True,
+            )
+            return list(results), None
+
+        try:
+            # The flight key leaves out `format`: csv and xlsx share the rows.
+            (rows, evaluation_result), cprofile_report = await compute(
+                dataset_flight,
+                (
+                    "dataset-export",
+                    etag_dataset_version,
+                    model_worker.model_fingerprint,
+                    iou_threshold,
+                    class_aware,
+                    evaluation,
+                ),
+                collect_rows,
+                profiled,
+                profile_dump,
+                "dataset-export",
+            )
         except ImageNotFoundError as exc:
             logger.warning("%s Images directory not found during export", ERROR_PREFIX)
             raise HTTPException(status_code=404, detail=str(exc)) from exc
@@ -235,64 +874,214 @@ def create_app() -> FastAPI:
             logger.exception("%s Dataset export failed", ERROR_PREFIX)
             raise HTTPException(status_code=500, detail="Dataset export failed")
 
-        normalized_format = format.lower().strip()
-        if normalized_format not in {"xlsx", "csv"}:
-            raise HTTPException(status_code=400, detail="Unsupported export format")
-
+        if profiled:
+            validator_headers = profiling_headers(validator_headers)
+            if cprofile_report is not None and "dump_file" in cprofile_report:
+                validator_headers["X-Profile-Dump"] = cprofile_report["dump_file"]
         headers, data = build_report_table(rows)
+        extra_tables = build_evaluation_tables(evaluation_result) if evaluation_result is not None else []
         timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
 
         if normalized_format == "csv":
-            text_stream = StringIO()
-            csv_writer = csv.writer(text_stream)
-            csv_writer.writerow(headers)
-            csv_writer.writerows(data)
-            content = text_stream.getvalue().encode("utf-8")
-            output = BytesIO(content)
-            output.seek(0)
+            output = BytesIO(render_csv(headers, data, extra_tables))
             filename = f"dataset_report_{timestamp}.csv"
             return StreamingResponse(
                 output,
                 media_type="text/csv; charset=utf-8",
-                headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+                headers={**validator_headers, "Content-Disposition": f'attachment; filename="{filename}"'},
             )
 
-        workbook = Workbook()
-        sheet = workbook.active
-        sheet.title = "Dataset report"
-        sheet.append(headers)
-        for row in data:
-            sheet.append(row)
-
-        output = BytesIO()
-        workbook.save(output)
-        output.seek(0)
+        output = BytesIO(render_xlsx(headers, data, extra_tables))
         filename = f"dataset_report_{timestamp}.xlsx"
         return StreamingResponse(
             output,
             media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+            headers={**validator_headers, "Content-Disposition": f'attachment; filename="{filename}"'},
         )
 
+    def remove_export(archive: Path) -> None:
+        shutil.rmtree(archive.parent, ignore_errors=True)
+
+    def link_export(archive: Path) -> Path:
+        """This response's own name for a shared archive; each response removes its copy"""
+        link = Path(tempfile.mkdtemp(prefix="export-", dir=settings.EXPORT_TMP_PATH or None)) / archive.name
+        try:
+            os.link(archive, link)
+        except OSError:
+            shutil.copyfile(archive, link)
+        return link
+
+    async def export_columnar(
+        model_worker: ModelWorker,
+        key: tuple,
+        columnar_format: str,
+        iou_threshold: float,
+        class_aware: bool,
+        profiled: bool,
+        profile_dump: bool,
+        headers: Dict[str, str],
+    ) -> FileResponse:
+        def write_export() -> Path:
+            workdir = Path(tempfile.mkdtemp(prefix="export-", dir=settings.EXPORT_TMP_PATH or None))
+            try:
+                results = model_worker.iter_analyze(
+                    image_provider.iter_image_ids(ordered=True),
+                    iou_threshold=iou_threshold,
+                    class_aware=class_aware,
+                    allow_missing_annotations=True,
+                )
+                paths = write_columnar_export(
+                    results,
+                    workdir / "tables",
+                    columnar_format,
+                    batch_rows=settings.EXPORT_BATCH_ROWS,
+                )
+                return bundle_zip(paths, workdir / "export.zip")
+            except BaseException:
+                shutil.rmtree(workdir, ignore_errors=True)
+                raise
+
+        cprofile_report = None
+        try:
+            if profiled or not settings.ANALYSIS_SINGLE_FLIGHT:
+                archive, cprofile_report = await run_in_threadpool(
+                    run_profiled, write_export, profile_dump, "dataset-export"
+                )
+            else:
+                # Identical exports share one file; each response serves a
+                # link to it, and the shared copy goes once all have one.
+                async with dataset_flight.shared(key, write_export, remove_export) as shared_archive:
+                    archive = await run_in_threadpool(link_export, shared_archive)
+        except ImageNotFoundError as exc:
+            logger.warning("%s Images directory not found during export", ERROR_PREFIX)
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+        except InvalidFormatError as exc:
+            logger.warning("%s Invalid annotation format during export", ERROR_PREFIX)
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        except Exception:
+            logger.exception("%s Dataset export failed", ERROR_PREFIX)
+            raise HTTPException(status_code=500, detail="Dataset export failed")
+        if cprofile_report is not None and "dump_file" in cprofile_report:
+            headers = {**headers, "X-Profile-Dump": cprofile_report["dump_file"]}
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+        return FileResponse(
+            archive,
+            media_type="application/zip",
+            filename=f"dataset_{columnar_format}_{timestamp}.zip",
+            headers=headers,
+            background=BackgroundTask(remove_export, archive),
+        )
+
+    @app.post("/api/v1/analysis/batch", tags=["Analysis"])
+    async def analyze_batch(body: BatchAnalysisRequest):
+        """Analyze many images in one request
+
+        Files are read concurrently and inference runs in batches of
+        MODEL_BATCH_SIZE. Missing or invalid images are reported per item
+        (`error` with status and detail); `aggregate` covers the rest.
+        """
+        logger.info(
+            "Batch analysis request: images=%d iou_threshold=%.2f class_aware=%s",
+            len(body.image_ids),
+            body.iou_threshold,
+            body.class_aware,
+        )
+        if len(body.image_ids) > settings.ANALYSIS_BATCH_MAX_IMAGES:
+            logger.warning("%s Batch too large: images=%d", ERROR_PREFIX, len(body.image_ids))
+            raise HTTPException(
+                status_code=413,
+                detail=f"At most {settings.ANALYSIS_BATCH_MAX_IMAGES} images per batch",
+            )
+        model_worker = await get_model_worker()
+        try:
+            result = await run_in_threadpool(
+                model_worker.analyze_batch,
+                body.image_ids,
+                iou_threshold=body.iou_threshold,
+                class_aware=body.class_aware,
+                batch_size=settings.MODEL_BATCH_SIZE,
+                read_workers=settings.ANALYSIS_BATCH_READ_WORKERS,
+            )
+        except Exception:
+            logger.exception("%s Batch analysis failed", ERROR_PREFIX)
+            raise HTTPException(status_code=500, detail="Batch analysis failed")
+        fields = parse_fields(body.fields)
+        result["items"] = [
+            item
+            if "error" in item
+            else shape_analysis_payload(
+                {**item, "image_url": f"/api/v1/images/{item['image_id']}/file"},
+                fields=fields,
+                include_boxes=body.include_boxes,
+                layout=body.layout,
+            )
+            for item in result["items"]
+        ]
+        return ORJSONResponse(result, headers=model_headers({}, model_worker))
+
     @app.get("/api/v1/analysis/{image_id}", tags=["Analysis"])
     async def analyze_image(
+        request: Request,
         image_id: str,
         iou_threshold: float = 0.5,
         class_aware: bool = True,
+        include_boxes: bool = True,
+        fields: str | None = None,
+        layout: Literal["rows", "columnar"] = "rows",
+        profile: bool = False,
+        profile_dump: bool = False,
     ):
-        """Return combined payload (image + expert + model + stats)"""
+        """Return combined payload (image + expert + model + stats)
+
+        `fields` keeps only listed top-level keys, `include_boxes=false` drops
+        box lists and matches, `layout=columnar` encodes boxes as parallel arrays.
+        With PROFILING_ENABLED, `profile=true` adds a `timings` block with
+        per-stage durations and `profile_dump=true` a cProfile report.
+        """
         logger.info(
             "Image analysis request: image_id=%s iou_threshold=%.2f class_aware=%s",
             image_id,
             iou_threshold,
             class_aware,
         )
+        profiled = check_profiling(profile, profile_dump)
+        model_worker = await get_model_worker()
         try:
-            result = model_worker.analyze(
-                image_id,
-                iou_threshold=iou_threshold,
-                class_aware=class_aware,
-                allow_missing_annotations=True,
+            image_digest = await run_in_threadpool(
+                digest_cache.digest,
+                image_provider.get_image_path(image_id),
+            )
+        except ImageNotFoundError as exc:
+            logger.warning("%s Image not found: image_id=%s", ERROR_PREFIX, image_id)
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+        except InvalidFormatError as exc:
+            logger.warning("%s Invalid image id: image_id=%s", ERROR_PREFIX, image_id)
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        labels_version = annotation_version(image_id)
+        etag = make_etag(
+            "analysis",
+            image_id,
+            image_digest,
+            labels_version,
+            model_worker.model_fingerprint,
+            query_items(request),
+        )
+        headers = model_headers(cache_headers(etag, analysis_cache_control), model_worker)
+        if not profiled and is_not_modified(request, etag):
+            return not_modified(headers)
+        try:
+            result, cprofile_report = await compute(
+                analysis_flight,
+                (image_id, image_digest, labels_version, model_worker.model_fingerprint, iou_threshold, class_aware),
+                lambda: model_worker.analyze(
+                    image_id,
+                    iou_threshold=iou_threshold,
+                    class_aware=class_aware,
+                    allow_missing_annotations=True,
+                ),
+                profiled,
+                profile_dump,
+                f"analysis-{image_id}",
             )
         except ImageNotFoundError as exc:
             logger.warning("%s Image not found: image_id=%s", ERROR_PREFIX, image_id)
@@ -306,10 +1095,15 @@ def create_app() -> FastAPI:
         except Exception:
             logger.exception("%s Analysis failed for image_id=%s", ERROR_PREFIX, image_id)
             raise HTTPException(status_code=500, detail="Analysis failed")
-        return {
-            **result,
-            "image_url": f"/api/v1/images/{image_id}/file",
-        }
+        payload = shape_analysis_payload(
+            {**result, "image_url": f"/api/v1/images/{image_id}/file"},
+            fields=parse_fields(fields),
+            include_boxes=include_boxes,
+            layout=layout,
+        )
+        if profiled:
+            return ORJSONResponse(attach_profile(payload, cprofile_report), headers=profiling_headers(headers))
+        return ORJSONResponse(payload, headers=headers)
 
     return app
 
@@ -1,6 +1,9 @@
 """Provider interfaces"""
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List
+from typing import Iterator, List
+
+from app.core.boxes import BoxSet
 
 
 class IImageProvider(ABC):
@@ -11,16 +14,29 @@ class IImageProvider(ABC):
         """Return raw image bytes by image id"""
         raise NotImplementedError
 
+    async def get_image_async(self, image_id: str) -> bytes:
+        """get_image without blocking the event loop (default: a worker thread)"""
+        return await asyncio.to_thread(self.get_image, image_id)
+
     @abstractmethod
     def list_image_ids(self) -> List[str]:
         """Return list of available image ids"""
         raise NotImplementedError
 
+    def iter_image_ids(self, ordered: bool = False) -> Iterator[str]:
+        """Stream image ids; `ordered=True` yields them sorted (stable across calls)"""
+        image_ids = self.list_image_ids()
+        yield from sorted(image_ids) if ordered else image_ids
+
 
 class IAnnotationProvider(ABC):
     """Interface for annotation data access"""
 
     @abstractmethod
-    def get_annotations(self, image_id: str) -> List[Dict[str, Any]]:
+    def get_annotations(self, image_id: str) -> BoxSet:
         """Return list of annotation boxes for image id"""
         raise NotImplementedError
+
+    async def get_annotations_async(self, image_id: str) -> BoxSet:
+        """get_annotations without blocking the event loop (default: a worker thread)"""
+        return await asyncio.to_thread(self.get_annotations, image_id)
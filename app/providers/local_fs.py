@@ -1,9 +1,18 @@
 """Local filesystem providers"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
 from pathlib import Path
-from typing import Any, Dict, List
+import threading
+from typing import Iterator, List
+
+import numpy as np
 
 from app.config import settings
+from app.core.boxes import BoxSet
 from app.providers.interfaces import IAnnotationProvider, IImageProvider
+from app.providers.manifest import ImageIdManifest
 from app.utils.exceptions import (
     AnnotationNotFoundError,
     ImageNotFoundError,
@@ -11,13 +20,59 @@ from app.utils.exceptions import (
 )
 
 
+def _is_numeric_row(parts: List[str]) -> bool:
+    try:
+        int(parts[0])
+        for value in parts[1:]:
+            float(value)
+    except ValueError:
+        return False
+    return True
+
+
+_io_pool: ThreadPoolExecutor | None = None
+_io_pool_lock = threading.Lock()
+
+
+def io_pool() -> ThreadPoolExecutor:
+    """Thread pool for async provider reads (PROVIDER_IO_WORKERS threads, created on first use)
+
+    Kept apart from the request threadpool so slow storage cannot starve
+    request handling.
+    """
+    global _io_pool
+    with _io_pool_lock:
+        if _io_pool is None:
+            _io_pool = ThreadPoolExecutor(
+                max_workers=max(1, settings.PROVIDER_IO_WORKERS),
+                thread_name_prefix="provider-io",
+            )
+        return _io_pool
+
+
+async def _run_io(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(io_pool(), func, *args)
+
+
+def _image_id(file_name: str) -> str:
+    """Path(file_name).stem without building a Path per directory entry"""
+    dot = file_name.rfind(".")
+    return file_name[:dot] if 0 < dot < len(file_name) - 1 else file_name
+
+
 class LocalFSImageProvider(IImageProvider):
     """Load images from local filesystem"""
 
-    def __init__(self, data_path: str | Path | None = None, images_dir: str | None = None) -> None:
+    def __init__(
+        self,
+        data_path: str | Path | None = None,
+        images_dir: str | None = None,
+        manifest_path: str | Path | None = None,
+    ) -> None:
         base_path = Path(data_path or settings.DATA_PATH)
         images_folder = images_dir or settings.IMAGES_DIR
         self.images_path = base_path / images_folder
+        self._manifest_dir = Path(manifest_path or settings.IMAGE_MANIFEST_PATH)
 
     def get_image_path(self, image_id: str) -> Path:
         """Resolve image path by id"""
@@ -36,21 +91,46 @@ class LocalFSImageProvider(IImageProvider):
     def get_image(self, image_id: str) -> bytes:
         return self.get_image_path(image_id).read_bytes()
 
-    def list_image_ids(self) -> List[str]:
-        if not self.images_path.exists():
-            raise ImageNotFoundError(f"Images directory not found: {self.images_path}")
+    async def get_image_async(self, image_id: str) -> bytes:
+        return await _run_io(self.get_image, image_id)
 
-        image_ids: List[str] = []
+    def list_image_ids(self) -> List[str]:
+        return sorted(set(self._scan_image_ids()))
+
+    def iter_image_ids(self, ordered: bool = False) -> Iterator[str]:
+        """Stream image ids straight from the directory listing.
+
+        Unordered ids come in directory order as they are read (only a set
+        of seen ids is kept, for images stored in several formats).
+        `ordered=True` streams them sorted from an on-disk manifest under
+        IMAGE_MANIFEST_PATH, rebuilt when the directory listing changes.
+        """
+        if ordered:
+            if not self.images_path.is_dir():
+                raise ImageNotFoundError(f"Images directory not found: {self.images_path}")
+            yield from self._manifest().iter_ids(self.images_path, self._scan_image_ids)
+            return
         seen: set[str] = set()
-        for image_path in sorted(self.images_path.iterdir()):
-            if not image_path.is_file():
-                continue
-            image_id = image_path.stem
-            if image_id in seen:
-                continue
-            seen.add(image_id)
-            image_ids.append(image_id)
-        return image_ids
+        for image_id in self._scan_image_ids():
+            if image_id not in seen:
+                seen.add(image_id)
+                yield image_id
+
+    def _scan_image_ids(self) -> Iterator[str]:
+        try:
+            entries = os.scandir(self.images_path)
+        except FileNotFoundError as exc:
+            raise ImageNotFoundError(f"Images directory not found: {self.images_path}") from exc
+        with entries:
+            for entry in entries:
+                # DirEntry.is_file() answers from the cached d_type; only
+                # symlinks and filesystems without d_type need a stat call.
+                if entry.is_file():
+                    yield _image_id(entry.name)
+
+    def _manifest(self) -> ImageIdManifest:
+        key = hashlib.sha1(str(self.images_path.resolve()).encode("utf-8")).hexdigest()[:16]
+        return ImageIdManifest(self._manifest_dir / f"{key}.ids")
 
 
 class LocalFSAnnotationProvider(IAnnotationProvider):
@@ -61,38 +141,33 @@ class LocalFSAnnotationProvider(IAnnotationProvider):
         labels_folder = labels_dir or settings.LABELS_DIR
         self.labels_path = base_path / labels_folder
 
-    def get_annotations(self, image_id: str) -> List[Dict[str, Any]]:
+    def get_annotation_path(self, image_id: str) -> Path:
+        """Resolve labels file path by id"""
         if not image_id:
             raise InvalidFormatError("image_id is required")
 
         labels_file = self.labels_path / f"{image_id}.txt"
         if not labels_file.is_file():
             raise AnnotationNotFoundError(f"Annotation '{image_id}' not found")
+        return labels_file
+
+    async def get_annotations_async(self, image_id: str) -> BoxSet:
+        return await _run_io(self.get_annotations, image_id)
 
-        lines = labels_file.read_text().splitlines()
-        boxes: List[Dict[str, Any]] = []
-        for line in lines:
-            stripped = line.strip()
-            if not stripped:
-                continue
-            parts = stripped.split()
+    def get_annotations(self, image_id: str) -> BoxSet:
+        labels_file = self.get_annotation_path(image_id)
+
+        lines = [line for line in labels_file.read_text().splitlines() if line.strip()]
+        if not lines:
+            return BoxSet.empty()
+        rows = [line.split() for line in lines]
+        for line, parts in zip(lines, rows):
             if len(parts) != 5:
                 raise InvalidFormatError(f"Invalid annotation format: '{line}'")
-            try:
-                class_id = int(parts[0])
-                x_center = float(parts[1])
-                y_center = float(parts[2])
-                width = float(parts[3])
-                height = float(parts[4])
-            except ValueError as exc:
-                raise InvalidFormatError(f"Invalid numeric values in annotation: '{line}'") from exc
-            boxes.append(
-                {
-                    "class_id": class_id,
-                    "x_center": x_center,
-                    "y_center": y_center,
-                    "width": width,
-                    "height": height,
-                }
-            )
-        return boxes
+        try:
+            class_ids = np.array([int(parts[0]) for parts in rows], dtype=np.int16)
+            coords = np.array([parts[1:] for parts in rows], dtype=np.float32)
+        except ValueError as exc:
+            line = next(line for line, parts in zip(lines, rows) if not _is_numeric_row(parts))
+            raise InvalidFormatError(f"Invalid numeric values in annotation: '{line}'") from exc
+        return BoxSet(class_ids, coords)
@@ -0,0 +1,109 @@
+"""Sorted on-disk manifest of a directory's image ids for stable-order streaming"""
+import heapq
+import json
+import os
+import tempfile
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+MANIFEST_VERSION = 1
+DEFAULT_RUN_SIZE = 200_000
+# Directory mtimes are only as fine as the kernel clock tick: a listing
+# modified this close to the scan may change again without a new mtime.
+RACY_WINDOW_NS = 2_000_000_000
+
+
+def directory_signature(directory: Path) -> Dict[str, Any]:
+    """Identity of a directory listing: adding, removing or renaming entries bumps its mtime"""
+    stat = os.stat(directory)
+    return {
+        "version": MANIFEST_VERSION,
+        "directory": str(directory.resolve()),
+        "device": stat.st_dev,
+        "inode": stat.st_ino,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+
+def _unique(sorted_ids: Iterable[str]) -> Iterator[str]:
+    previous = None
+    for image_id in sorted_ids:
+        if image_id != previous:
+            yield image_id
+            previous = image_id
+
+
+def _read_ids(path: Path) -> Iterator[str]:
+    with path.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            yield line.rstrip("\n")
+
+
+class ImageIdManifest:
+    """Sorted, de-duplicated image ids of one directory, cached in a text file
+
+    The first line is a JSON header with the directory signature; a stale
+    manifest is rebuilt on the next read, and so is one whose directory was
+    modified within RACY_WINDOW_NS of the scan. Building is an external merge
+    sort: ids are sorted in runs of `run_size`, spilled to temporary files
+    and merged with heapq.merge, so memory stays bounded by one run however
+    many files the directory holds. Readers stream the file line by line.
+    """
+
+    def __init__(self, path: str | Path, run_size: int = DEFAULT_RUN_SIZE) -> None:
+        self.path = Path(path)
+        self.run_size = max(1, run_size)
+
+    def iter_ids(self, directory: Path, scan: Callable[[], Iterable[str]]) -> Iterator[str]:
+        """Stream ids in sorted order, rebuilding from `scan` if the directory changed"""
+        # Signature before the scan: entries added during it bump the mtime
+        # again and trigger another rebuild next time.
+        signature = directory_signature(directory)
+        handle = self._open_current(signature)
+        if handle is None:
+            self._build(signature, scan)
+            handle = self._open_current(signature, racy_ok=True)
+        if handle is None:  # pragma: no cover - rebuilt by a concurrent writer
+            yield from _unique(sorted(scan()))
+            return
+        with handle:
+            for line in handle:
+                yield line.rstrip("\n")
+
+    def _open_current(self, signature: Dict[str, Any], racy_ok: bool = False):
+        try:
+            handle = self.path.open("r", encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        try:
+            header = json.loads(handle.readline() or "null")
+        except ValueError:
+            header = None
+        scanned_ns = header.pop("scanned_ns", 0) if isinstance(header, dict) else 0
+        racy = signature["mtime_ns"] >= scanned_ns - RACY_WINDOW_NS
+        if header != signature or (racy and not racy_ok):
+            handle.close()
+            return None
+        return handle
+
+    def _build(self, signature: Dict[str, Any], scan: Callable[[], Iterable[str]]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(prefix="manifest-", dir=self.path.parent) as workdir:
+            runs: List[Path] = []
+            scanned_ns = time.time_ns()
+            ids = iter(scan())
+            while True:
+                chunk = sorted(islice(ids, self.run_size))
+                if not chunk:
+                    break
+                run_path = Path(workdir) / f"run-{len(runs):05d}"
+                run_path.write_text("".join(f"{image_id}\n" for image_id in chunk), encoding="utf-8")
+                runs.append(run_path)
+            target = Path(workdir) / "manifest"
+            with target.open("w", encoding="utf-8") as handle:
+                handle.write(json.dumps({**signature, "scanned_ns": scanned_ns}) + "\n")
+                for image_id in _unique(heapq.merge(*(_read_ids(run) for run in runs))):
+                    handle.write(f"{image_id}\n")
+            os.replace(target, self.path)
@@ -0,0 +1,198 @@
+"""Headless dataset evaluation with a per-image checkpoint (python -m app.cli evaluate)
+
+Each finished image is appended to a JSON-lines checkpoint as its report row,
+its mergeable evaluation counters and its raw distribution values. A rerun with the same checkpoint
+skips those images and merges their counters, so an interrupted run resumes
+where it stopped and still gives the single-run aggregate.
+"""
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Sequence, TextIO
+
+from app.core.evaluation import DatasetEvaluation
+from app.utils.exceptions import InvalidFormatError, ValidationMicroserviceError
+
+logger = logging.getLogger(__name__)
+
+
+class EvaluationCheckpoint:
+    """Append-only JSON-lines file: a config header, then one line per image"""
+
+    def __init__(self, path: str | Path, config: Dict[str, Any], restart: bool = False) -> None:
+        self.path = Path(path)
+        self.config = config
+        self.completed: Dict[str, Dict[str, Any]] = {}
+        if restart:
+            self.path.unlink(missing_ok=True)
+        if self.path.exists():
+            self._load()
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps({"config": config}) + "\n", encoding="utf-8")
+        self._handle = self.path.open("a", encoding="utf-8")
+
+    def _load(self) -> None:
+        data = self.path.read_bytes()
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            # A crash left the last line half-written: cut it off so the next
+            # append starts on a line of its own; that image is redone.
+            logger.warning("Dropping half-written last line of checkpoint %s", self.path)
+            os.truncate(self.path, complete)
+        lines = data[:complete].decode("utf-8").splitlines()
+        header = json.loads(lines[0]) if lines else {}
+        if header.get("config") != self.config:
+            raise InvalidFormatError(
+                f"Checkpoint {self.path} was written with different settings: "
+                f"{header.get('config')}; use --restart to discard it"
+            )
+        for number, line in enumerate(lines[1:], start=2):
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning("Skipping unreadable checkpoint line %d in %s", number, self.path)
+                continue
+            if "error" not in row:
+                self.completed[row["image_id"]] = row
+        logger.info("Resuming from checkpoint: path=%s completed=%d", self.path, len(self.completed))
+
+    def append(self, row: Dict[str, Any]) -> None:
+        self._handle.write(json.dumps(row) + "\n")
+        self._handle.flush()
+        if "error" not in row:
+            self.completed[row["image_id"]] = row
+
+    def close(self) -> None:
+        self._handle.close()
+
+
+class ProgressReporter:
+    """Prints done/total, throughput and ETA at most every `interval_s` seconds"""
+
+    def __init__(self, total: int, done: int = 0, interval_s: float = 2.0, stream: TextIO | None = None) -> None:
+        self.total = total
+        self.done = done
+        self.failed = 0
+        self.session_done = 0
+        self.interval_s = interval_s
+        self.stream = stream if stream is not None else sys.stderr
+        self.started = time.perf_counter()
+        self._last_report = 0.0
+
+    @property
+    def throughput(self) -> float:
+        elapsed = time.perf_counter() - self.started
+        return self.session_done / elapsed if elapsed > 0 else 0.0
+
+    def update(self, failed: bool = False) -> None:
+        self.done += 1
+        self.session_done += 1
+        self.failed += int(failed)
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval_s or self.done == self.total:
+            self._last_report = now
+            self.report()
+
+    def report(self) -> None:
+        throughput = self.throughput
+        remaining = self.total - self.done
+        eta = f"{remaining / throughput:.0f}s" if throughput > 0 else "?"
+        percent = 100.0 * self.done / self.total if self.total else 100.0
+        print(
+            f"evaluate: {self.done}/{self.total} ({percent:.1f}%) {throughput:.1f} img/s "
+            f"eta {eta} failed={self.failed}",
+            file=self.stream,
+            flush=True,
+        )
+
+
+def _bounded_map(
+    pool: ThreadPoolExecutor,
+    func: Callable[[str], Dict[str, Any]],
+    items: Sequence[str],
+    window: int,
+) -> Iterator[Dict[str, Any]]:
+    """Yield results in completion order with at most `window` tasks in flight"""
+    pending: set[Future] = set()
+    iterator = iter(items)
+    try:
+        while True:
+            while len(pending) < window:
+                item = next(iterator, None)
+                if item is None:
+                    break
+                pending.add(pool.submit(func, item))
+            if not pending:
+                return
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            # Hand out finished results before re-raising a failure (e.g. Ctrl-C)
+            # so they still reach the checkpoint.
+            for future in sorted(finished, key=lambda future: future.exception() is not None):
+                yield future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def run_evaluation(
+    evaluate_item: Callable[[str], Dict[str, Any]],
+    image_ids: Sequence[str],
+    checkpoint: EvaluationCheckpoint,
+    *,
+    workers: int = 1,
+    progress: ProgressReporter | None = None,
+) -> Dict[str, Any]:
+    """Evaluate images not yet in the checkpoint and aggregate all of them.
+
+    `evaluate_item` is ModelWorker.evaluate_item with options bound. Failed
+    images (any exception, e.g. an undecodable file) are logged to the
+    checkpoint and retried on the next run; only interrupts stop the run.
+    """
+    config = checkpoint.config
+    pending = [image_id for image_id in image_ids if image_id not in checkpoint.completed]
+    failed: List[Dict[str, Any]] = []
+
+    def evaluate(image_id: str) -> Dict[str, Any]:
+        try:
+            return evaluate_item(image_id)
+        except ValidationMicroserviceError as exc:
+            return {"image_id": image_id, "error": f"{type(exc).__name__}: {exc}"}
+        except Exception as exc:
+            logger.exception("Unexpected evaluation error: image_id=%s", image_id)
+            return {"image_id": image_id, "error": f"{type(exc).__name__}: {exc}"}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for row in _bounded_map(pool, evaluate, pending, window=2 * max(1, workers)):
+            checkpoint.append(row)
+            if "error" in row:
+                logger.warning("Evaluation failed: image_id=%s %s", row["image_id"], row["error"])
+                failed.append(row)
+            if progress is not None:
+                progress.update(failed="error" in row)
+    elapsed = time.perf_counter() - started
+
+    evaluation = DatasetEvaluation(config["iou_threshold"], config["thresholds"])
+    rows = []
+    for image_id in image_ids:
+        row = checkpoint.completed.get(image_id)
+        if row is not None:
+            evaluation.merge(DatasetEvaluation.from_state(row["evaluation"]))
+            evaluation.distributions.add_values(row["distributions"])
+            rows.append({"image_id": image_id, "stats": row["stats"]})
+    return {
+        "image_count": len(image_ids),
+        "processed_count": evaluation.image_count,
+        "failed_count": len(failed),
+        "failed": failed,
+        "resumed_count": len(image_ids) - len(pending),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_ips": round(len(pending) / elapsed, 2) if elapsed > 0 else 0.0,
+        **evaluation.to_dict(),
+        "images": rows,
+    }
@@ -0,0 +1,241 @@
+"""Columnar per-box export: images, boxes and matches tables as Parquet or Arrow IPC
+
+Rows are buffered per table and flushed as record batches (Parquet row
+groups / IPC batches) every `batch_rows` rows, so memory stays flat however
+large the dataset is. Parquet and Arrow files are zstd-compressed. pyarrow is imported when the first writer is created.
+"""
+import importlib.util
+import zipfile
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Literal
+
+import numpy as np
+
+from app.core.boxes import BoxSet
+from app.core.matcher import MatchResult
+
+pa: Any = None
+ipc: Any = None
+pq: Any = None
+
+ColumnarFormat = Literal["parquet", "arrow"]
+
+COLUMNAR_FORMATS = ("parquet", "arrow")
+DEFAULT_BATCH_ROWS = 65536
+IMAGE_STAT_FIELDS = (
+    "expert_count",
+    "model_count",
+    "tp",
+    "fp",
+    "fn",
+    "precision",
+    "recall",
+    "f1",
+    "iou_threshold",
+    "class_aware",
+)
+
+
+def columnar_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _import_pyarrow() -> None:
+    global pa, ipc, pq
+    if pa is not None:
+        return
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as exc:  # pragma: no cover - optional dependency
+        raise RuntimeError("pyarrow is required for Parquet/Arrow export") from exc
+    pa, ipc, pq = pyarrow, pyarrow.ipc, pyarrow.parquet
+
+
+def _schemas() -> Dict[str, "pa.Schema"]:
+    return {
+        "images": pa.schema(
+            [
+                ("image_id", pa.string()),
+                ("expert_count", pa.int32()),
+                ("model_count", pa.int32()),
+                ("tp", pa.int32()),
+                ("fp", pa.int32()),
+                ("fn", pa.int32()),
+                ("precision", pa.float64()),
+                ("recall", pa.float64()),
+                ("f1", pa.float64()),
+                ("iou_threshold", pa.float32()),
+                ("class_aware", pa.bool_()),
+            ]
+        ),
+        "boxes": pa.schema(
+            [
+                ("image_id", pa.string()),
+                ("source", pa.dictionary(pa.int8(), pa.string())),
+                ("box_index", pa.int32()),
+                ("class_id", pa.int16()),
+                ("x_center", pa.float32()),
+                ("y_center", pa.float32()),
+                ("width", pa.float32()),
+                ("height", pa.float32()),
+                ("score", pa.float32()),
+            ]
+        ),
+        "matches": pa.schema(
+            [
+                ("image_id", pa.string()),
+                ("pred_index", pa.int32()),
+                ("gt_index", pa.int32()),
+                ("iou", pa.float32()),
+            ]
+        ),
+    }
+
+
+class _TableBuffer:
+    """Column chunks for one table until the next flush"""
+
+    def __init__(self, schema: "pa.Schema", write: Callable[["pa.RecordBatch"], None], batch_rows: int) -> None:
+        self.schema = schema
+        self.write = write
+        self.batch_rows = batch_rows
+        self.chunks: Dict[str, List[Any]] = {name: [] for name in schema.names}
+        self.rows = 0
+
+    def add(self, columns: Dict[str, Any], rows: int) -> None:
+        if rows == 0:
+            return
+        for name, values in columns.items():
+            self.chunks[name].append(values)
+        self.rows += rows
+        if self.rows >= self.batch_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.rows == 0:
+            return
+        arrays = []
+        for field in self.schema:
+            chunks = self.chunks[field.name]
+            if pa.types.is_dictionary(field.type):
+                values = pa.array([value for chunk in chunks for value in chunk], type=pa.string())
+                arrays.append(values.dictionary_encode().cast(field.type))
+            elif isinstance(chunks[0], np.ndarray):
+                # Expert boxes carry NaN scores; store them as nulls.
+                arrays.append(pa.array(np.concatenate(chunks), type=field.type, from_pandas=field.name == "score"))
+            else:
+                arrays.append(pa.array([value for chunk in chunks for value in chunk], type=field.type))
+        self.write(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        self.chunks = {name: [] for name in self.schema.names}
+        self.rows = 0
+
+
+class ColumnarExportWriter:
+    """Write analysis results into `<directory>/{images,boxes,matches}.<ext>`"""
+
+    def __init__(
+        self,
+        directory: str | Path,
+        format: ColumnarFormat = "parquet",
+        batch_rows: int = DEFAULT_BATCH_ROWS,
+        compression: str = "zstd",
+    ) -> None:
+        _import_pyarrow()
+        if format not in COLUMNAR_FORMATS:
+            raise ValueError(f"Unsupported columnar format: {format}")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.format = format
+        self.paths: Dict[str, Path] = {}
+        self._writers: Dict[str, Any] = {}
+        self._buffers: Dict[str, _TableBuffer] = {}
+        for name, schema in _schemas().items():
+            path = self.directory / f"{name}.{format}"
+            if format == "parquet":
+                writer = pq.ParquetWriter(path, schema, compression=compression)
+                write = writer.write_batch
+            else:
+                writer = ipc.new_file(path, schema, options=ipc.IpcWriteOptions(compression=compression))
+                write = writer.write_batch
+            self.paths[name] = path
+            self._writers[name] = writer
+            self._buffers[name] = _TableBuffer(schema, write, batch_rows)
+
+    def add(self, result: Dict[str, Any]) -> None:
+        """Append one ModelWorker.analyze result"""
+        image_id = result["image_id"]
+        stats = result["stats"]
+        self._buffers["images"].add(
+            {"image_id": [image_id], **{name: [stats.get(name)] for name in IMAGE_STAT_FIELDS}},
+            1,
+        )
+        for source in ("expert", "model"):
+            self._add_boxes(image_id, source, result[f"{source}_boxes"])
+        self._add_matches(image_id, result["matches"])
+
+    def _add_boxes(self, image_id: str, source: str, boxes: BoxSet) -> None:
+        count = len(boxes)
+        xywh = boxes.xywh
+        score = boxes.score if boxes.score is not None else np.full(count, np.nan, dtype=np.float32)
+        self._buffers["boxes"].add(
+            {
+                "image_id": [image_id] * count,
+                "source": [source] * count,
+                "box_index": np.arange(count, dtype=np.int32),
+                "class_id": boxes.class_id,
+                "x_center": xywh[:, 0],
+                "y_center": xywh[:, 1],
+                "width": xywh[:, 2],
+                "height": xywh[:, 3],
+                "score": score,
+            },
+            count,
+        )
+
+    def _add_matches(self, image_id: str, matches: MatchResult) -> None:
+        count = len(matches)
+        self._buffers["matches"].add(
+            {
+                "image_id": [image_id] * count,
+                "pred_index": np.asarray(matches.pred_index, dtype=np.int32),
+                "gt_index": np.asarray(matches.gt_index, dtype=np.int32),
+                "iou": np.asarray(matches.iou, dtype=np.float32),
+            },
+            count,
+        )
+
+    def close(self) -> Dict[str, Path]:
+        for name, buffer in self._buffers.items():
+            buffer.flush()
+            self._writers[name].close()
+        return self.paths
+
+    def __enter__(self) -> "ColumnarExportWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def write_columnar_export(
+    results: Iterable[Dict[str, Any]],
+    directory: str | Path,
+    format: ColumnarFormat = "parquet",
+    batch_rows: int = DEFAULT_BATCH_ROWS,
+) -> Dict[str, Path]:
+    """Consume analysis results one by one (e.g. a generator) into the three tables"""
+    with ColumnarExportWriter(directory, format, batch_rows) as writer:
+        for result in results:
+            writer.add(result)
+    return writer.paths
+
+
+def bundle_zip(paths: Dict[str, Path], target: str | Path) -> Path:
+    """One zip with all tables; members are stored as-is since they are already compressed"""
+    target = Path(target)
+    with zipfile.ZipFile(target, "w", compression=zipfile.ZIP_STORED) as archive:
+        for path in paths.values():
+            archive.write(path, arcname=path.name)
+    return target
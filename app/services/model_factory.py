@@ -0,0 +1,113 @@
+"""Model runner construction from settings"""
+import logging
+from pathlib import Path
+
+from app.config import settings
+from app.infrastructure.model_runner import (
+    IModelRunner,
+    OnnxModelRunner,
+    StubModelRunner,
+    SyntheticModelRunner,
+)
+from app.utils.exceptions import ModelNotFoundError
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_model_path(precision: str | None = None, model_file: str | None = None) -> Path:
+    """Return configured model path for requested precision (fp32/int8)
+
+    `model_file` replaces MODEL_FILE (and the MODEL_INT8_FILE override).
+    """
+    model_path = Path(settings.MODELS_PATH) / (model_file or settings.MODEL_FILE)
+    if (precision or settings.MODEL_PRECISION) == "int8":
+        if settings.MODEL_INT8_FILE and not model_file:
+            return Path(settings.MODELS_PATH) / settings.MODEL_INT8_FILE
+        return model_path.with_name(f"{model_path.stem}.int8.onnx")
+    return model_path
+
+
+def build_onnx_runner(model_path: str | Path) -> OnnxModelRunner:
+    return OnnxModelRunner(
+        model_path=model_path,
+        img_size=settings.MODEL_IMG_SIZE,
+        conf_threshold=settings.MODEL_CONF_THRESHOLD,
+        max_det=settings.MODEL_MAX_DET,
+        letterbox=settings.MODEL_LETTERBOX,
+        tile_size=settings.MODEL_TILE_SIZE,
+        tile_overlap=settings.MODEL_TILE_OVERLAP,
+        tile_batch_size=settings.MODEL_TILE_BATCH_SIZE,
+        tile_nms_iou=settings.MODEL_TILE_NMS_IOU,
+        max_decoded_pixels=settings.IMAGE_MAX_DECODED_PIXELS,
+        batch_size=settings.MODEL_BATCH_SIZE,
+        io_binding=settings.MODEL_IO_BINDING,
+    )
+
+
+def build_synthetic_runner() -> SyntheticModelRunner:
+    return SyntheticModelRunner(
+        box_count=settings.SYNTHETIC_BOX_COUNT,
+        latency_ms=settings.SYNTHETIC_LATENCY_MS,
+        jitter_ms=settings.SYNTHETIC_JITTER_MS,
+    )
+
+
+def build_remote_runner() -> IModelRunner:
+    from app.infrastructure.inference_server import RemoteModelRunner
+
+    return RemoteModelRunner(
+        settings.INFERENCE_SERVER_ADDRESS,
+        authkey=settings.SECRET_KEY.encode("utf-8"),
+        slots=settings.INFERENCE_SHM_SLOTS,
+        img_size=settings.MODEL_IMG_SIZE,
+        connect_timeout=settings.MODEL_READY_TIMEOUT,
+    )
+
+
+def uses_inference_server() -> bool:
+    """Whether ONNX inference runs in the shared inference server, which owns the model"""
+    return settings.INFERENCE_MODE == "server" and settings.MODEL_RUNNER == "onnx"
+
+
+def build_model_runner(model_file: str | None = None, fallback: bool = True) -> IModelRunner:
+    """Build runner from settings (ONNX by default, falling back to stub runner)
+
+    With `fallback=False` (hot reload) a missing or broken model raises
+    instead of being replaced by the stub runner. `model_file` cannot be
+    used with the inference server, which loads its own model.
+    """
+    if uses_inference_server():
+        if model_file:
+            raise ValueError("model_file cannot be switched in INFERENCE_MODE=server")
+        try:
+            model_runner = build_remote_runner()
+            logger.info("Using shared inference server: %s", settings.INFERENCE_SERVER_ADDRESS)
+            return model_runner
+        except Exception:
+            if not fallback:
+                raise
+            logger.exception(
+                "Failed to connect to inference server. Using stub runner. address=%s",
+                settings.INFERENCE_SERVER_ADDRESS,
+            )
+            return StubModelRunner()
+    if settings.MODEL_RUNNER == "synthetic":
+        logger.info("Using synthetic model runner (load testing)")
+        return build_synthetic_runner()
+    if settings.MODEL_RUNNER == "stub":
+        return StubModelRunner()
+    model_path = resolve_model_path(model_file=model_file)
+    try:
+        model_runner = build_onnx_runner(model_path)
+        logger.info("Using ONNX model: %s precision=%s", model_path, settings.MODEL_PRECISION)
+    except ModelNotFoundError:
+        if not fallback:
+            raise
+        logger.warning("Model file not found. Using stub runner. path=%s", model_path)
+        model_runner = StubModelRunner()
+    except Exception:
+        if not fallback:
+            raise
+        logger.exception("Failed to initialize ONNX model. Using stub runner. path=%s", model_path)
+        model_runner = StubModelRunner()
+    return model_runner
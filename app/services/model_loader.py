@@ -0,0 +1,305 @@
+"""Background model loading, warm-up and hot reload"""
+import logging
+import os
+import threading
+import time
+import weakref
+from pathlib import Path
+from typing import Any, Callable, Dict, TypeVar
+
+from app.infrastructure.model_runner import IModelRunner
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ModelLoader:
+    """Builds and warms the model runner outside of the request path
+
+    `reload()` builds and warms a replacement in the background while the
+    current runner keeps serving, then swaps it in with one assignment.
+    Requests get the runner through `acquire()` and keep the one they
+    started with, so in-flight work finishes on the old session; the old
+    runner is closed once the last of them is done.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], IModelRunner],
+        warmup_runs: int = 3,
+        reload_factory: Callable[[], IModelRunner] | None = None,
+    ) -> None:
+        self._factory = factory
+        self._reload_factory = reload_factory or factory
+        self._warmup_runs = warmup_runs
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._runner: IModelRunner | None = None
+        self._state = "pending"
+        self._error: str | None = None
+        self._load_duration_ms: float | None = None
+        self._warmup_duration_ms: float | None = None
+        self._first_inference_ms: float | None = None
+        self._generation = 0
+        self._reload_thread: threading.Thread | None = None
+        self._reload_done = threading.Event()
+        self._reload_done.set()
+        self._reload_state = "idle"
+        self._reload_error: str | None = None
+        # id(runner) -> live acquire() holders; replaced runners wait in
+        # _retired until theirs drops to zero.
+        self._holders: Dict[int, int] = {}
+        self._retired: Dict[int, IModelRunner] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self._runner is not None
+
+    @property
+    def runner(self) -> IModelRunner | None:
+        return self._runner
+
+    def start(self) -> None:
+        """Load and warm the model in a daemon thread"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self.load,
+                name="model-loader",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def load(self) -> IModelRunner | None:
+        """Load and warm the model in the calling thread"""
+        try:
+            runner, timings = self._build(self._factory, "_state")
+            self._swap(runner, timings)
+        except Exception as exc:
+            logger.exception("Model loading failed")
+            self._state = "failed"
+            self._error = str(exc)
+        finally:
+            self._done.set()
+        return self._runner
+
+    def reload(self, factory: Callable[[], IModelRunner] | None = None) -> bool:
+        """Build and warm a replacement runner in a daemon thread.
+
+        Without `factory` the reload factory that produced the serving runner
+        is reused. Returns False while the initial load or another reload is
+        still running. A failed
+        reload leaves the current runner in place.
+        """
+        with self._lock:
+            if not self._reload_done.is_set() or (self._thread is not None and not self._done.is_set()):
+                return False
+            self._reload_done.clear()
+            self._reload_state = "loading"
+            self._reload_error = None
+            self._reload_thread = threading.Thread(
+                target=self._reload,
+                args=(factory or self._reload_factory,),
+                name="model-reload",
+                daemon=True,
+            )
+            self._reload_thread.start()
+        return True
+
+    def _reload(self, factory: Callable[[], IModelRunner]) -> None:
+        try:
+            runner, timings = self._build(factory, "_reload_state")
+            previous = self._runner
+            self._swap(runner, timings)
+            if previous is not None and previous is not runner:
+                self._retire(previous)
+            self._reload_factory = factory
+            self._reload_state = "ready"
+            logger.info(
+                "Model reloaded: fingerprint %s -> %s generation=%d",
+                previous.fingerprint if previous is not None else None,
+                runner.fingerprint,
+                self._generation,
+            )
+        except Exception as exc:
+            logger.exception("Model reload failed; keeping the current model")
+            self._reload_state = "failed"
+            self._reload_error = str(exc)
+        finally:
+            self._reload_done.set()
+
+    def _build(self, factory: Callable[[], IModelRunner], state_attr: str) -> tuple[IModelRunner, tuple]:
+        setattr(self, state_attr, "loading")
+        started = time.perf_counter()
+        runner = factory()
+        load_duration_ms = (time.perf_counter() - started) * 1000
+
+        setattr(self, state_attr, "warming_up")
+        started = time.perf_counter()
+        latencies = runner.warmup(self._warmup_runs)
+        warmup_duration_ms = (time.perf_counter() - started) * 1000
+        first_inference_ms = latencies[0] * 1000 if latencies else None
+        return runner, (load_duration_ms, warmup_duration_ms, first_inference_ms)
+
+    def _swap(self, runner: IModelRunner, timings: tuple) -> None:
+        with self._lock:
+            self._load_duration_ms, self._warmup_duration_ms, self._first_inference_ms = timings
+            self._runner = runner
+            self._generation += 1
+            self._state = "ready"
+            self._error = None
+        self._done.set()
+        logger.info(
+            "Model ready: runner=%s load_ms=%.1f warmup_ms=%.1f first_inference_ms=%s",
+            type(runner).__name__,
+            self._load_duration_ms,
+            self._warmup_duration_ms,
+            f"{self._first_inference_ms:.1f}" if self._first_inference_ms is not None else "n/a",
+        )
+
+    def acquire(self, build: Callable[[IModelRunner], T], timeout: float | None = None) -> T | None:
+        """Wrap the serving runner in a per-request object (e.g. a ModelWorker)
+
+        The runner stays open while the returned object is alive. Returns
+        None if no runner is ready within `timeout`.
+        """
+        self._done.wait(timeout)
+        with self._lock:
+            runner = self._runner
+            if runner is None:
+                return None
+            self._holders[id(runner)] = self._holders.get(id(runner), 0) + 1
+        try:
+            holder = build(runner)
+        except BaseException:
+            self._release(runner)
+            raise
+        weakref.finalize(holder, self._release, runner)
+        return holder
+
+    def _release(self, runner: IModelRunner) -> None:
+        with self._lock:
+            key = id(runner)
+            self._holders[key] -= 1
+            if self._holders[key]:
+                return
+            del self._holders[key]
+            retired = self._retired.pop(key, None)
+        if retired is not None:
+            self._close(retired)
+
+    def _retire(self, runner: IModelRunner) -> None:
+        with self._lock:
+            if self._holders.get(id(runner)):
+                self._retired[id(runner)] = runner
+                return
+        self._close(runner)
+
+    @staticmethod
+    def _close(runner: IModelRunner) -> None:
+        try:
+            runner.close()
+        except Exception:
+            logger.exception("Closing replaced model runner failed")
+            return
+        logger.info("Replaced model runner closed: fingerprint=%s", runner.fingerprint)
+
+    def wait(self, timeout: float | None = None) -> IModelRunner | None:
+        """Block until loading finishes; return runner or None if not ready"""
+        self._done.wait(timeout)
+        return self._runner
+
+    def wait_reload(self, timeout: float | None = None) -> bool:
+        """Block until a running reload finishes; True if no reload is running"""
+        return self._reload_done.wait(timeout)
+
+    def status(self) -> Dict[str, Any]:
+        runner = self._runner
+        return {
+            "ready": runner is not None,
+            "state": self._state,
+            "runner": type(runner).__name__ if runner is not None else None,
+            "fingerprint": runner.fingerprint if runner is not None else None,
+            "generation": self._generation,
+            "reload_state": self._reload_state,
+            "reload_error": self._reload_error,
+            "load_duration_ms": self._load_duration_ms,
+            "warmup_runs": self._warmup_runs,
+            "warmup_duration_ms": self._warmup_duration_ms,
+            "first_inference_ms": self._first_inference_ms,
+            "error": self._error,
+        }
+
+
+class ModelFileWatcher:
+    """Poll a model file and call `on_change` once a modification has settled
+
+    A change (mtime or size) must look the same on two consecutive polls
+    before it counts, so a file that is still being copied is not loaded
+    half-written. When `path()` starts returning a different file (a reload
+    switched models) the watcher re-baselines without firing. If `on_change`
+    returns False (e.g. a reload is already running) it is retried on the
+    next poll.
+    """
+
+    def __init__(
+        self,
+        path: Callable[[], Path | None],
+        on_change: Callable[[], bool],
+        interval_s: float = 5.0,
+    ) -> None:
+        self._path = path
+        self._on_change = on_change
+        self._interval_s = interval_s
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._watched: Path | None = None
+        self._baseline: tuple | None = None
+        self._pending: tuple | None = None
+
+    def start(self) -> None:
+        self.poll()
+        self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval_s):
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Model file watcher poll failed")
+
+    def poll(self) -> bool:
+        """Check the file once; True if `on_change` fired and accepted the change"""
+        path = self._path()
+        signature = self._signature(path)
+        if path != self._watched:
+            self._watched, self._baseline, self._pending = path, signature, None
+            return False
+        if signature == self._baseline or signature is None:
+            self._pending = None
+            return False
+        if signature != self._pending:
+            self._pending = signature
+            return False
+        logger.info("Model file changed: %s", path)
+        if not self._on_change():
+            return False
+        self._baseline, self._pending = signature, None
+        return True
+
+    @staticmethod
+    def _signature(path: Path | None) -> tuple | None:
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
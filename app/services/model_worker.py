@@ -1,25 +1,118 @@
 """Model worker orchestrating providers and model runner"""
-from typing import Any, Dict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import copy_context
+from functools import partial
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
 
+from app.core.boxes import BoxSet
+from app.core.evaluation import DatasetEvaluation, evaluate_image
 from app.core.matcher import match_boxes
 from app.core.metrics import build_stats, build_stats_from_counts
+from app.core.sampling import (
+    MIN_STOP_SAMPLES,
+    NO_CLASS_STRATUM,
+    SampledStats,
+    dominant_class,
+    sample_order,
+    validate_sampling,
+)
+from app.core.sharding import ShardSpec, build_partial
+from app.core.sketches import DistributionSketches
 from app.infrastructure.model_runner import IModelRunner
 from app.providers.interfaces import IAnnotationProvider, IImageProvider
-from app.utils.exceptions import AnnotationNotFoundError
+from app.services.read_ahead import DEFAULT_MAX_BYTES, ReadAhead
+from app.utils.exceptions import (
+    AnnotationNotFoundError,
+    ImageNotFoundError,
+    InvalidFormatError,
+    ValidationMicroserviceError,
+)
+from app.utils.metrics import observe_boxes, stage_timer, track_queue
 
 
 class ModelWorker:
-    """Orchestrates inference and annotations for a single response"""
+    """Orchestrates inference and annotations for a single response
+
+    Boxes stay as BoxSet and matches as MatchResult; callers convert them to
+    dicts at the API boundary (see app.services.payloads).
+    """
 
     def __init__(
         self,
         image_provider: IImageProvider,
         annotation_provider: IAnnotationProvider,
         model_runner: IModelRunner,
+        *,
+        read_ahead: int = 0,
+        read_ahead_bytes: int = DEFAULT_MAX_BYTES,
     ) -> None:
         self._image_provider = image_provider
         self._annotation_provider = annotation_provider
         self._model_runner = model_runner
+        # Dataset runs keep up to `read_ahead` image+label reads in flight
+        # (0 reads one item at a time in the calling thread).
+        self._read_ahead = read_ahead
+        self._read_ahead_bytes = read_ahead_bytes
+
+    @property
+    def model_fingerprint(self) -> str:
+        return self._model_runner.fingerprint
+
+    def _read_image(self, image_id: str) -> bytes:
+        with stage_timer("read_image"):
+            return self._image_provider.get_image(image_id)
+
+    def _read_annotations(self, image_id: str) -> BoxSet:
+        with stage_timer("read_annotations"):
+            expert_boxes = self._annotation_provider.get_annotations(image_id)
+        observe_boxes("expert", len(expert_boxes))
+        return expert_boxes
+
+    def _predict(self, image_bytes: bytes) -> BoxSet:
+        with track_queue("inference"), stage_timer("predict"):
+            model_boxes = self._model_runner.predict(image_bytes)
+        observe_boxes("model", len(model_boxes))
+        return model_boxes
+
+    def _predict_batch(self, images: Sequence[bytes]) -> List[BoxSet]:
+        with track_queue("inference"), stage_timer("predict"):
+            batch_boxes = self._model_runner.predict_batch(images)
+        for model_boxes in batch_boxes:
+            observe_boxes("model", len(model_boxes))
+        return batch_boxes
+
+    def _compare(
+        self,
+        image_id: str,
+        model_boxes: BoxSet,
+        expert_boxes: BoxSet,
+        iou_threshold: float,
+        class_aware: bool,
+    ) -> Dict[str, Any]:
+        with stage_timer("matching"):
+            match_result = match_boxes(
+                model_boxes,
+                expert_boxes,
+                iou_threshold=iou_threshold,
+                class_aware=class_aware,
+            )
+        with stage_timer("stats"):
+            stats = build_stats(
+                match_result,
+                pred_count=len(model_boxes),
+                gt_count=len(expert_boxes),
+                iou_threshold=iou_threshold,
+                class_aware=class_aware,
+            )
+
+        return {
+            "image_id": image_id,
+            "expert_boxes": expert_boxes,
+            "model_boxes": model_boxes,
+            "stats": stats,
+            "matches": match_result,
+        }
 
     def analyze(
         self,
@@ -29,74 +122,407 @@ class ModelWorker:
         class_aware: bool = True,
         allow_missing_annotations: bool = False,
     ) -> Dict[str, Any]:
-        image_bytes = self._image_provider.get_image(image_id)
-        try:
-            expert_boxes = self._annotation_provider.get_annotations(image_id)
-        except AnnotationNotFoundError:
-            if not allow_missing_annotations:
-                raise
-            expert_boxes = []
-        model_boxes = self._model_runner.predict(image_bytes)
+        image_bytes, expert_boxes = self._read_item(image_id, allow_missing_annotations)
+        model_boxes = self._predict(image_bytes)
+        return self._compare(image_id, model_boxes, expert_boxes, iou_threshold, class_aware)
+
+    def iter_analyze(
+        self,
+        image_ids: Iterable[str],
+        *,
+        iou_threshold: float = 0.5,
+        class_aware: bool = True,
+        allow_missing_annotations: bool = False,
+    ) -> Iterator[Dict[str, Any]]:
+        """analyze() over a stream of ids, reading ahead of inference"""
+        with self._read_items(image_ids, allow_missing_annotations) as items:
+            for image_id, (image_bytes, expert_boxes) in items:
+                model_boxes = self._predict(image_bytes)
+                yield self._compare(image_id, model_boxes, expert_boxes, iou_threshold, class_aware)
+
+    def evaluate_dataset(
+        self,
+        *,
+        iou_threshold: float = 0.5,
+        class_aware: bool = True,
+        include_images: bool = False,
+        allow_missing_annotations: bool = False,
+        shard: ShardSpec | None = None,
+        thresholds: Sequence[float] = (),
+    ) -> Dict[str, Any]:
+        """Class-aware and class-agnostic stats, per-class metrics and confusion matrix in one pass.
 
-        match_result = match_boxes(
-            model_boxes,
-            expert_boxes,
-            iou_threshold=iou_threshold,
+        The IoU matrix is computed once per image and both matchings are
+        derived from it. With `include_images`, per-image rows (stats for the
+        requested `class_aware` variant) are returned for export. `shard`
+        restricts the run to one slice of the dataset. Image ids are streamed
+        from the provider (sorted when rows or a shard need a stable order).
+        """
+        image_ids = self._image_provider.iter_image_ids(ordered=include_images or shard is not None)
+        if shard is not None:
+            image_ids = shard.iter_select(image_ids)
+        evaluation = DatasetEvaluation(iou_threshold, thresholds)
+        images = self._evaluate_images(
+            image_ids,
+            evaluation,
             class_aware=class_aware,
+            include_images=include_images,
+            allow_missing_annotations=allow_missing_annotations,
         )
-        stats = build_stats(
-            match_result["matches"],
-            pred_count=len(model_boxes),
-            gt_count=len(expert_boxes),
-            iou_threshold=iou_threshold,
+
+        result: Dict[str, Any] = {
+            "image_count": evaluation.image_count,
+            "processed_count": evaluation.image_count,
+            **evaluation.to_dict(),
+        }
+        if include_images:
+            result["images"] = images
+        return result
+
+    def evaluate_partial(
+        self,
+        shard: ShardSpec,
+        *,
+        iou_threshold: float = 0.5,
+        thresholds: Sequence[float] = (),
+        allow_missing_annotations: bool = False,
+    ) -> Dict[str, Any]:
+        """Serialized counters for one shard; merge shards with `merge_partials`"""
+        image_ids = shard.iter_select(self._image_provider.iter_image_ids(ordered=True))
+        evaluation = DatasetEvaluation(iou_threshold, thresholds)
+        self._evaluate_images(image_ids, evaluation, allow_missing_annotations=allow_missing_annotations)
+        return build_partial(shard, evaluation, fingerprint=self._model_runner.fingerprint)
+
+    def evaluate_item(
+        self,
+        image_id: str,
+        *,
+        iou_threshold: float = 0.5,
+        class_aware: bool = True,
+        thresholds: Sequence[float] = (),
+        allow_missing_annotations: bool = False,
+    ) -> Dict[str, Any]:
+        """One image as a report row plus its mergeable evaluation counters
+
+        The row carries the image's raw distribution values rather than
+        sketch states; `DistributionSketches.add_values` rebuilds them.
+        """
+        evaluation = DatasetEvaluation(iou_threshold, thresholds, distributions=False)
+        (row,) = self._evaluate_images(
+            [image_id],
+            evaluation,
             class_aware=class_aware,
+            include_images=True,
+            distribution_values=True,
+            allow_missing_annotations=allow_missing_annotations,
         )
+        return {**row, "evaluation": evaluation.to_state()}
+
+    def _evaluate_images(
+        self,
+        image_ids: Iterable[str],
+        evaluation: DatasetEvaluation,
+        *,
+        class_aware: bool = True,
+        include_images: bool = False,
+        distribution_values: bool = False,
+        allow_missing_annotations: bool = False,
+    ) -> List[Dict[str, Any]]:
+        iou_threshold = evaluation.iou_threshold
+        images: List[Dict[str, Any]] = []
+        with self._read_items(image_ids, allow_missing_annotations) as items:
+            for image_id, (image_bytes, expert_boxes) in items:
+                model_boxes = self._predict(image_bytes)
+                with stage_timer("matching"):
+                    image_evaluation = evaluate_image(model_boxes, expert_boxes, iou_threshold)
+                with stage_timer("stats"):
+                    evaluation.add(model_boxes, expert_boxes, image_evaluation)
+                    if include_images:
+                        matches = image_evaluation.class_aware if class_aware else image_evaluation.class_agnostic
+                        image = {
+                            "image_id": image_id,
+                            "stats": build_stats(
+                                matches,
+                                pred_count=len(model_boxes),
+                                gt_count=len(expert_boxes),
+                                iou_threshold=iou_threshold,
+                                class_aware=class_aware,
+                            ),
+                        }
+                        if distribution_values:
+                            image["distributions"] = DistributionSketches.image_values(
+                                model_boxes, expert_boxes, image_evaluation.class_aware
+                            )
+                        images.append(image)
+        return images
+
+    @contextmanager
+    def _read_items(
+        self,
+        image_ids: Iterable[str],
+        allow_missing_annotations: bool,
+    ) -> Iterator[Iterator[Tuple[str, Tuple[bytes, BoxSet]]]]:
+        """(image_id, (image bytes, expert boxes)) in order; the first read error is raised
+
+        With read-ahead, later items are read on a thread pool while the
+        caller runs inference on earlier ones.
+        """
+        read = partial(self._read_item, allow_missing_annotations=allow_missing_annotations)
+        # One id (evaluate_item) has nothing to read ahead of: skip the pool.
+        if self._read_ahead <= 0 or (isinstance(image_ids, Sequence) and len(image_ids) <= 1):
+            yield ((image_id, read(image_id)) for image_id in image_ids)
+            return
+        with ThreadPoolExecutor(max_workers=self._read_ahead, thread_name_prefix="read-ahead") as pool:
+            reader = iter(ReadAhead(image_ids, read, pool, self._read_ahead, self._read_ahead_bytes))
+            try:
+                yield (_raise_errors(item) for item in reader)
+            finally:
+                # Cancel queued reads before the pool waits for its threads.
+                reader.close()
+
+    def _read_item(self, image_id: str, allow_missing_annotations: bool) -> tuple[bytes, BoxSet]:
+        image_bytes = self._read_image(image_id)
+        try:
+            expert_boxes = self._read_annotations(image_id)
+        except AnnotationNotFoundError:
+            if not allow_missing_annotations:
+                raise
+            expert_boxes = BoxSet.empty()
+        return image_bytes, expert_boxes
 
+    def analyze_batch(
+        self,
+        image_ids: Sequence[str],
+        *,
+        iou_threshold: float = 0.5,
+        class_aware: bool = True,
+        allow_missing_annotations: bool = True,
+        batch_size: int = 8,
+        read_workers: int = 4,
+    ) -> Dict[str, Any]:
+        """Analyze many images: concurrent reads, batched inference, per-item errors.
+
+        Items are returned in request order; failed items carry an `error`
+        (status + detail) instead of results. `aggregate` covers successful
+        items only. At most `batch_size` images are held in memory at once.
+        """
+        items: List[Dict[str, Any]] = []
+        total_tp = total_pred = total_gt = 0
+        batch_size = max(1, batch_size)
+
+        with ThreadPoolExecutor(max_workers=max(1, read_workers)) as pool:
+            for start in range(0, len(image_ids), batch_size):
+                chunk_ids = image_ids[start : start + batch_size]
+                # Each task runs in its own copy of the caller context so stage
+                # timings reach the per-request profile.
+                futures = [
+                    pool.submit(copy_context().run, self._read_item, image_id, allow_missing_annotations)
+                    for image_id in chunk_ids
+                ]
+                chunk_items: List[Dict[str, Any] | None] = [None] * len(chunk_ids)
+                loaded = []
+                for position, (image_id, future) in enumerate(zip(chunk_ids, futures)):
+                    try:
+                        loaded.append((position, image_id, *future.result()))
+                    except ValidationMicroserviceError as exc:
+                        chunk_items[position] = _error_item(image_id, exc)
+
+                for (position, image_id, _, expert_boxes), model_boxes in zip(
+                    loaded, self._predict_loaded(loaded)
+                ):
+                    if isinstance(model_boxes, ValidationMicroserviceError):
+                        chunk_items[position] = _error_item(image_id, model_boxes)
+                        continue
+                    result = self._compare(image_id, model_boxes, expert_boxes, iou_threshold, class_aware)
+                    chunk_items[position] = result
+                    total_tp += len(result["matches"])
+                    total_pred += len(model_boxes)
+                    total_gt += len(expert_boxes)
+                items.extend(chunk_items)
+
+        processed_count = sum(1 for item in items if "error" not in item)
         return {
-            "image_id": image_id,
-            "expert_boxes": expert_boxes,
-            "model_boxes": model_boxes,
-            "stats": stats,
-            "matches": match_result["matches"],
+            "image_count": len(image_ids),
+            "processed_count": processed_count,
+            "failed_count": len(image_ids) - processed_count,
+            "aggregate": build_stats_from_counts(
+                total_tp,
+                total_pred,
+                total_gt,
+                iou_threshold=iou_threshold,
+                class_aware=class_aware,
+            ),
+            "items": items,
         }
 
+    def _predict_loaded(self, loaded: Sequence[tuple]) -> List[BoxSet | ValidationMicroserviceError]:
+        if not loaded:
+            return []
+        try:
+            return list(self._predict_batch([item[2] for item in loaded]))
+        except InvalidFormatError:
+            # One undecodable image fails the whole batch; retry one by one
+            # to attribute the error to the right item.
+            results: List[BoxSet | ValidationMicroserviceError] = []
+            for item in loaded:
+                try:
+                    results.append(self._predict(item[2]))
+                except InvalidFormatError as exc:
+                    results.append(exc)
+            return results
+
     def analyze_dataset(
         self,
         *,
         iou_threshold: float = 0.5,
         class_aware: bool = True,
+        distributions: bool = False,
     ) -> Dict[str, Any]:
-        image_ids = self._image_provider.list_image_ids()
+        """TP/FP/FN totals plus, with `distributions`, sketches of IoU, scores and box areas"""
+        image_count = 0
         total_pred = 0
         total_gt = 0
         total_tp = 0
+        sketches = DistributionSketches() if distributions else None
 
-        for image_id in image_ids:
-            image_bytes = self._image_provider.get_image(image_id)
-            expert_boxes = self._annotation_provider.get_annotations(image_id)
-            model_boxes = self._model_runner.predict(image_bytes)
+        # Totals do not depend on order: stream ids as the directory yields them.
+        image_ids = self._image_provider.iter_image_ids()
+        with self._read_items(image_ids, allow_missing_annotations=False) as items:
+            for _, (image_bytes, expert_boxes) in items:
+                image_count += 1
+                model_boxes = self._predict(image_bytes)
 
-            match_result = match_boxes(
-                model_boxes,
-                expert_boxes,
+                with stage_timer("matching"):
+                    match_result = match_boxes(
+                        model_boxes,
+                        expert_boxes,
+                        iou_threshold=iou_threshold,
+                        class_aware=class_aware,
+                    )
+
+                total_tp += len(match_result)
+                total_pred += len(model_boxes)
+                total_gt += len(expert_boxes)
+                if sketches is not None:
+                    with stage_timer("distributions"):
+                        sketches.add(model_boxes, expert_boxes, match_result)
+
+        with stage_timer("stats"):
+            stats = build_stats_from_counts(
+                total_tp,
+                total_pred,
+                total_gt,
                 iou_threshold=iou_threshold,
                 class_aware=class_aware,
             )
 
-            total_tp += len(match_result["matches"])
-            total_pred += len(model_boxes)
-            total_gt += len(expert_boxes)
-
-        stats = build_stats_from_counts(
-            total_tp,
-            total_pred,
-            total_gt,
-            iou_threshold=iou_threshold,
-            class_aware=class_aware,
-        )
-
-        return {
-            "image_count": len(image_ids),
-            "processed_count": len(image_ids),
+        result = {
+            "image_count": image_count,
+            "processed_count": image_count,
             "stats": stats,
         }
+        if sketches is not None:
+            result["distributions"] = sketches.to_dict()
+        return result
+
+    def sample_dataset(
+        self,
+        *,
+        sample_size: int | None = None,
+        seed: int = 0,
+        stratify: bool = False,
+        iou_threshold: float = 0.5,
+        class_aware: bool = True,
+        confidence: float = 0.95,
+        method: str = "bootstrap",
+        resamples: int = 1000,
+        target_half_width: float | None = None,
+        report_every: int = 100,
+    ) -> Iterator[Dict[str, Any]]:
+        """analyze_dataset() over a seeded random sample, refined as images finish
+
+        Yields a SampledStats summary before the first image and after every
+        `report_every` images, then a final one with `done: true`: when all
+        intervals are within `target_half_width` (checked at report points
+        from MIN_STOP_SAMPLES images on) or when the sample is exhausted.
+        `stratify` samples each dominant expert class in proportion.
+        """
+        validate_sampling(confidence, method, resamples)
+        # analyze_dataset's policy: a full sample must reproduce its stats.
+        allow_missing_annotations = False
+        image_ids = list(self._image_provider.iter_image_ids())
+        strata = self._class_strata(image_ids, allow_missing_annotations) if stratify else None
+        order = sample_order(image_ids, seed, strata)
+        if sample_size is not None:
+            order = order[: max(0, sample_size)]
+        sampled = SampledStats(len(image_ids), iou_threshold=iou_threshold, class_aware=class_aware)
+
+        def snapshot(stop_reason: str | None = None) -> Dict[str, Any]:
+            with stage_timer("stats"):
+                summary = sampled.summary(confidence=confidence, method=method, resamples=resamples, seed=seed)
+            return {
+                **summary,
+                "sample_size": len(order),
+                "seed": seed,
+                "stratified": stratify,
+                "done": stop_reason is not None,
+                "stop_reason": stop_reason,
+            }
+
+        yield snapshot()
+        with self._read_items(order, allow_missing_annotations=allow_missing_annotations) as items:
+            for image_id, (image_bytes, expert_boxes) in items:
+                model_boxes = self._predict(image_bytes)
+                with stage_timer("matching"):
+                    match_result = match_boxes(
+                        model_boxes,
+                        expert_boxes,
+                        iou_threshold=iou_threshold,
+                        class_aware=class_aware,
+                    )
+                sampled.add(
+                    len(match_result),
+                    len(model_boxes),
+                    len(expert_boxes),
+                    strata[image_id] if strata is not None else NO_CLASS_STRATUM,
+                )
+                if len(sampled) % max(1, report_every) or len(sampled) == len(order):
+                    continue
+                summary = snapshot()
+                if (
+                    target_half_width is not None
+                    and len(sampled) >= MIN_STOP_SAMPLES
+                    and summary["max_half_width"] <= target_half_width
+                ):
+                    yield {**summary, "done": True, "stop_reason": "target_half_width"}
+                    return
+                yield summary
+        yield snapshot("sample_exhausted")
+
+    def _class_strata(self, image_ids: Sequence[str], allow_missing_annotations: bool) -> Dict[str, str]:
+        """Dominant expert class per image; images without boxes share one stratum"""
+
+        def stratum(image_id: str) -> str:
+            try:
+                return dominant_class(self._annotation_provider.get_annotations(image_id))
+            except AnnotationNotFoundError:
+                if not allow_missing_annotations:
+                    raise
+                return NO_CLASS_STRATUM
+
+        with ThreadPoolExecutor(max_workers=max(1, self._read_ahead), thread_name_prefix="strata") as pool:
+            return dict(zip(image_ids, pool.map(stratum, image_ids)))
+
+
+def _error_item(image_id: str, exc: ValidationMicroserviceError) -> Dict[str, Any]:
+    if isinstance(exc, (ImageNotFoundError, AnnotationNotFoundError)):
+        status_code = 404
+    else:
+        status_code = 400
+    return {"image_id": image_id, "error": {"status": status_code, "detail": str(exc)}}
+
+
+def _raise_errors(item: Tuple[str, Any]) -> Tuple[str, Any]:
+    if isinstance(item[1], ValidationMicroserviceError):
+        raise item[1]
+    return item
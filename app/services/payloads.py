@@ -0,0 +1,100 @@
+"""API payload shaping: field projection and columnar box encoding"""
+from typing import Any, Dict, Iterable, List, Literal, Sequence
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from app.core.boxes import BoxSet
+from app.core.matcher import MatchResult
+
+BoxLayout = Literal["rows", "columnar"]
+
+BOX_KEYS: Sequence[str] = ("class_id", "x_center", "y_center", "width", "height", "score")
+MATCH_KEYS: Sequence[str] = ("pred_index", "gt_index", "iou")
+BOX_PAYLOAD_KEYS = ("expert_boxes", "model_boxes", "matches")
+
+
+def parse_fields(fields: str | None) -> set[str] | None:
+    if not fields:
+        return None
+    return {field.strip() for field in fields.split(",") if field.strip()}
+
+
+def parse_thresholds(thresholds: str | None) -> List[float]:
+    """Comma-separated IoU thresholds, e.g. `0.5,0.75`"""
+    if not thresholds:
+        return []
+    values = [float(value) for value in thresholds.split(",") if value.strip()]
+    if any(not 0.0 < value <= 1.0 for value in values):
+        raise ValueError("IoU thresholds must be in (0, 1]")
+    return values
+
+
+def to_columnar(items: Iterable[Dict[str, Any]], keys: Sequence[str]) -> Dict[str, List[Any]]:
+    """Rows of dicts to parallel arrays; keys absent in every row are dropped"""
+    rows = list(items)
+    columns: Dict[str, List[Any]] = {}
+    for key in keys:
+        if any(key in row for row in rows):
+            columns[key] = [row.get(key) for row in rows]
+    columns["count"] = len(rows)
+    return columns
+
+
+def encode_boxes(
+    value: BoxSet | MatchResult | List[Dict[str, Any]],
+    layout: BoxLayout = "rows",
+    keys: Sequence[str] = BOX_KEYS,
+) -> Any:
+    """Convert BoxSet/MatchResult (or plain rows) into the requested JSON layout"""
+    if isinstance(value, (BoxSet, MatchResult)):
+        return value.to_columns() if layout == "columnar" else value.to_dicts()
+    if layout == "columnar":
+        return to_columnar(value, keys)
+    return value
+
+
+def shape_analysis_payload(
+    result: Dict[str, Any],
+    *,
+    fields: set[str] | None = None,
+    include_boxes: bool = True,
+    layout: BoxLayout = "rows",
+) -> Dict[str, Any]:
+    """Apply projection and box layout to a ModelWorker.analyze result"""
+    payload: Dict[str, Any] = {}
+    for key, value in result.items():
+        if fields is not None and key not in fields and key != "image_id":
+            continue
+        if key in BOX_PAYLOAD_KEYS:
+            if not include_boxes:
+                continue
+            value = encode_boxes(value, layout, MATCH_KEYS if key == "matches" else BOX_KEYS)
+        payload[key] = value
+    if layout == "columnar" and include_boxes:
+        payload["layout"] = "columnar"
+    return payload
+
+
+class BatchAnalysisRequest(BaseModel):
+    """Body of POST /api/v1/analysis/batch; options apply to every item"""
+
+    image_ids: List[str] = Field(min_length=1)
+    iou_threshold: float = 0.5
+    class_aware: bool = True
+    include_boxes: bool = True
+    fields: str | None = None
+    layout: BoxLayout = "rows"
+
+
+class ModelReloadRequest(BaseModel):
+    """Body of POST /api/v1/admin/model/reload"""
+
+    model_config = ConfigDict(protected_namespaces=())
+
+    model_file: str | None = None
+
+
+class MergePartialsRequest(BaseModel):
+    """Body of POST /api/v1/analysis/dataset/evaluation/merge"""
+
+    partials: List[Dict[str, Any]] = Field(min_length=1)
@@ -0,0 +1,208 @@
+"""INT8 post-training quantization and FP32/INT8 comparison report"""
+import logging
+import random
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Literal, Sequence
+
+import numpy as np
+
+from app.infrastructure.model_runner import OnnxModelRunner
+from app.providers.interfaces import IAnnotationProvider, IImageProvider
+from app.services.model_worker import ModelWorker
+from app.utils.exceptions import InvalidFormatError
+
+logger = logging.getLogger(__name__)
+
+QuantizationMode = Literal["dynamic", "static"]
+
+
+def sample_image_ids(
+    image_provider: IImageProvider,
+    size: int,
+    seed: int = 0,
+) -> List[str]:
+    image_ids = image_provider.list_image_ids()
+    if size <= 0 or size >= len(image_ids):
+        return image_ids
+    return sorted(random.Random(seed).sample(image_ids, size))
+
+
+class ProviderCalibrationReader:
+    """Feeds preprocessed images from image provider to ORT static calibration"""
+
+    def __init__(
+        self,
+        runner: OnnxModelRunner,
+        image_provider: IImageProvider,
+        image_ids: Sequence[str],
+    ) -> None:
+        self._runner = runner
+        self._image_provider = image_provider
+        self._image_ids = list(image_ids)
+        self._iterator: Iterator[Dict[str, np.ndarray]] | None = None
+
+    def _blobs(self) -> Iterator[Dict[str, np.ndarray]]:
+        for image_id in self._image_ids:
+            image_bytes = self._image_provider.get_image(image_id)
+            blob = self._runner.preprocess(image_bytes)[0]
+            yield {self._runner.input_name: blob}
+
+    def get_next(self) -> Dict[str, np.ndarray] | None:
+        if self._iterator is None:
+            self._iterator = self._blobs()
+        return next(self._iterator, None)
+
+    def rewind(self) -> None:
+        self._iterator = None
+
+
+def quantize_model(
+    model_path: str | Path,
+    output_path: str | Path,
+    *,
+    mode: QuantizationMode = "dynamic",
+    image_provider: IImageProvider | None = None,
+    calibration_size: int = 32,
+    seed: int = 0,
+    img_size: int = 640,
+    letterbox: bool = False,
+) -> Path:
+    """Write INT8 copy of ONNX model using onnxruntime quantization tooling"""
+    try:
+        from onnxruntime.quantization import (
+            CalibrationDataReader,
+            QuantFormat,
+            QuantType,
+            quantize_dynamic,
+            quantize_static,
+        )
+    except Exception as exc:  # pragma: no cover - depends on runtime env
+        raise InvalidFormatError(f"onnxruntime quantization import failed: {exc}") from exc
+
+    model_path = Path(model_path)
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    if mode == "dynamic":
+        logger.info("Dynamic INT8 quantization: %s -> %s", model_path, output_path)
+        quantize_dynamic(str(model_path), str(output_path), weight_type=QuantType.QUInt8)
+        return output_path
+
+    if mode != "static":
+        raise InvalidFormatError(f"Unsupported quantization mode: {mode}")
+    if image_provider is None:
+        raise InvalidFormatError("Static quantization requires an image provider")
+
+    runner = OnnxModelRunner(model_path, img_size=img_size, letterbox=letterbox)
+    image_ids = sample_image_ids(image_provider, calibration_size, seed=seed)
+    if not image_ids:
+        raise InvalidFormatError("Calibration subset is empty")
+
+    class _Reader(ProviderCalibrationReader, CalibrationDataReader):
+        pass
+
+    reader = _Reader(runner, image_provider, image_ids)
+    logger.info(
+        "Static INT8 quantization: %s -> %s calibration_images=%d",
+        model_path,
+        output_path,
+        len(image_ids),
+    )
+    quantize_static(
+        str(model_path),
+        str(output_path),
+        reader,
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+    )
+    return output_path
+
+
+def _latency_stats(latencies: Sequence[float]) -> Dict[str, float]:
+    if not latencies:
+        return {"mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "images_per_sec": 0.0}
+    values = np.asarray(latencies, dtype=np.float64) * 1000
+    total_sec = float(values.sum()) / 1000
+    return {
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "images_per_sec": len(values) / total_sec if total_sec > 0 else 0.0,
+    }
+
+
+def benchmark_runner(
+    runner: OnnxModelRunner,
+    image_provider: IImageProvider,
+    annotation_provider: IAnnotationProvider,
+    *,
+    image_ids: Sequence[str],
+    iou_threshold: float = 0.5,
+    class_aware: bool = True,
+    warmup_runs: int = 3,
+) -> Dict[str, Any]:
+    runner.warmup(warmup_runs)
+    payloads = [image_provider.get_image(image_id) for image_id in image_ids]
+    latencies: List[float] = []
+    for image_bytes in payloads:
+        started = time.perf_counter()
+        runner.predict(image_bytes)
+        latencies.append(time.perf_counter() - started)
+
+    worker = ModelWorker(image_provider, annotation_provider, runner)
+    started = time.perf_counter()
+    dataset = worker.analyze_dataset(iou_threshold=iou_threshold, class_aware=class_aware)
+    dataset_sec = time.perf_counter() - started
+
+    return {
+        "model_path": str(runner.model_path),
+        "model_size_bytes": runner.model_path.stat().st_size,
+        "latency": _latency_stats(latencies),
+        "dataset_seconds": dataset_sec,
+        "dataset_images_per_sec": dataset["processed_count"] / dataset_sec if dataset_sec > 0 else 0.0,
+        "stats": dataset["stats"],
+    }
+
+
+def build_quantization_report(
+    fp32_runner: OnnxModelRunner,
+    int8_runner: OnnxModelRunner,
+    image_provider: IImageProvider,
+    annotation_provider: IAnnotationProvider,
+    *,
+    latency_sample_size: int = 32,
+    iou_threshold: float = 0.5,
+    class_aware: bool = True,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Compare latency, throughput and dataset F1 for FP32 and INT8 runners"""
+    image_ids = sample_image_ids(image_provider, latency_sample_size, seed=seed)
+    results = {
+        name: benchmark_runner(
+            runner,
+            image_provider,
+            annotation_provider,
+            image_ids=image_ids,
+            iou_threshold=iou_threshold,
+            class_aware=class_aware,
+        )
+        for name, runner in (("fp32", fp32_runner), ("int8", int8_runner))
+    }
+    fp32, int8 = results["fp32"], results["int8"]
+    fp32_latency = fp32["latency"]["mean_ms"]
+    return {
+        "latency_sample_size": len(image_ids),
+        "iou_threshold": iou_threshold,
+        "class_aware": class_aware,
+        "fp32": fp32,
+        "int8": int8,
+        "delta": {
+            "f1": int8["stats"]["f1"] - fp32["stats"]["f1"],
+            "precision": int8["stats"]["precision"] - fp32["stats"]["precision"],
+            "recall": int8["stats"]["recall"] - fp32["stats"]["recall"],
+            "speedup": fp32_latency / int8["latency"]["mean_ms"] if int8["latency"]["mean_ms"] else 0.0,
+            "size_ratio": int8["model_size_bytes"] / fp32["model_size_bytes"] if fp32["model_size_bytes"] else 0.0,
+        },
+    }
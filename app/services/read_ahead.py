@@ -0,0 +1,94 @@
+"""Concurrent read-ahead of dataset items while earlier ones are being inferred"""
+from collections import deque
+from concurrent.futures import Executor, Future
+from contextvars import copy_context
+from typing import Callable, Deque, Generic, Iterable, Iterator, Tuple, TypeVar
+
+from app.utils.exceptions import ValidationMicroserviceError
+
+T = TypeVar("T")
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def _item_bytes(value: object) -> int:
+    """Payload size of a read result: bytes objects, or tuples holding them"""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, tuple):
+        return sum(_item_bytes(part) for part in value)
+    return 0
+
+
+class ReadAhead(Generic[T]):
+    """Iterate `(image_id, result)` in input order with reads submitted ahead
+
+    Up to `max_in_flight` reads run on `executor` at once, and new reads are
+    only submitted while the buffered bytes (finished reads not yet consumed,
+    plus the average size so far for each read still in flight) stay under
+    `max_bytes`. At least one read is always allowed so oversized images
+    still flow. Provider errors (ValidationMicroserviceError) are yielded as
+    the result so callers can report or raise them per item; anything else
+    propagates. Breaking out of the loop cancels reads not yet started.
+    """
+
+    def __init__(
+        self,
+        image_ids: Iterable[str],
+        read: Callable[[str], T],
+        executor: Executor,
+        max_in_flight: int = 8,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self._image_ids = iter(image_ids)
+        self._read = read
+        self._executor = executor
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_bytes = max(1, max_bytes)
+        self._read_count = 0
+        self._read_bytes = 0
+
+    def _average_bytes(self) -> float:
+        # Until one read has finished its size is unknown: assume the whole
+        # budget, so read-ahead starts with a single read in flight.
+        return self._read_bytes / self._read_count if self._read_count else float(self.max_bytes)
+
+    def _buffered_bytes(self, pending: Deque[Tuple[str, Future]]) -> float:
+        average = self._average_bytes()
+        return sum(
+            _item_bytes(future.result()) if future.done() and not future.exception() else average
+            for _, future in pending
+        )
+
+    def _can_submit(self, pending: Deque[Tuple[str, Future]]) -> bool:
+        if not pending:
+            return True
+        return len(pending) < self.max_in_flight and self._buffered_bytes(pending) < self.max_bytes
+
+    def __iter__(self) -> Iterator[Tuple[str, T | ValidationMicroserviceError]]:
+        pending: Deque[Tuple[str, Future]] = deque()
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and self._can_submit(pending):
+                    image_id = next(self._image_ids, None)
+                    if image_id is None:
+                        exhausted = True
+                        break
+                    # Copy the caller context so stage timings reach the request profile.
+                    pending.append((image_id, self._executor.submit(copy_context().run, self._read, image_id)))
+                if not pending:
+                    return
+                image_id, future = pending.popleft()
+                try:
+                    result = future.result()
+                except ValidationMicroserviceError as exc:
+                    yield image_id, exc
+                    continue
+                self._read_count += 1
+                self._read_bytes += _item_bytes(result)
+                yield image_id, result
+        finally:
+            for _, future in pending:
+                future.cancel()
+
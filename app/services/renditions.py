@@ -0,0 +1,255 @@
+"""Downscaled renditions and pyramid tiles for the viewer"""
+import logging
+import math
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+from PIL import Image
+
+from app.config import settings
+from app.infrastructure.disk_cache import DiskCache
+from app.infrastructure.image_regions import ImageRegionReader
+from app.providers.local_fs import LocalFSImageProvider
+from app.utils.exceptions import InvalidFormatError
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPES: Dict[str, str] = {"webp": "image/webp", "jpeg": "image/jpeg"}
+_PIL_FORMATS: Dict[str, str] = {"webp": "WEBP", "jpeg": "JPEG"}
+# Sources kept open for tile reads; a non-lazy reader holds the decoded image.
+_READER_CACHE_SIZE = 2
+
+
+def _normalize_format(image_format: str) -> str:
+    normalized = image_format.lower().strip()
+    if normalized == "jpg":
+        normalized = "jpeg"
+    if normalized not in MEDIA_TYPES:
+        raise InvalidFormatError(f"Unsupported rendition format: {image_format}")
+    return normalized
+
+
+def _validate_quality(quality: int) -> int:
+    if not 1 <= quality <= 100:
+        raise InvalidFormatError("quality must be in range 1..100")
+    return quality
+
+
+class RenditionService:
+    """Generates level renditions/tiles on demand and caches encoded files on disk.
+
+    Level 0 is the original resolution; each next level halves both sides
+    until the longest side fits into one tile. Tile misses reuse a reader of
+    the last few sources, so a format without lazy region reads is decoded
+    once per pyramid rather than once per tile.
+    """
+
+    def __init__(
+        self,
+        image_provider: LocalFSImageProvider,
+        cache: DiskCache,
+        tile_size: int = 256,
+        max_decoded_pixels: int = 0,
+    ) -> None:
+        self._image_provider = image_provider
+        self._cache = cache
+        self.tile_size = tile_size
+        self.max_decoded_pixels = max_decoded_pixels
+        self._readers: "OrderedDict[str, ImageRegionReader]" = OrderedDict()
+        self._readers_lock = threading.Lock()
+
+    def _source(self, image_id: str) -> Tuple[Path, str]:
+        path = self._image_provider.get_image_path(image_id)
+        stat = path.stat()
+        return path, f"{image_id}:{stat.st_mtime_ns}:{stat.st_size}"
+
+    def _reader(self, path: Path, version: str) -> ImageRegionReader:
+        with self._readers_lock:
+            reader = self._readers.get(version)
+            if reader is not None:
+                self._readers.move_to_end(version)
+                return reader
+        reader = ImageRegionReader(path.read_bytes(), self.max_decoded_pixels)
+        with self._readers_lock:
+            reader = self._readers.setdefault(version, reader)
+            self._readers.move_to_end(version)
+            while len(self._readers) > _READER_CACHE_SIZE:
+                self._readers.popitem(last=False)
+        return reader
+
+    @staticmethod
+    def _image_size(path: Path) -> Tuple[int, int]:
+        with Image.open(path) as image:
+            return image.size
+
+    def level_count(self, width: int, height: int) -> int:
+        longest = max(width, height, 1)
+        if longest <= self.tile_size:
+            return 1
+        return math.ceil(math.log2(longest / self.tile_size)) + 1
+
+    def levels(self, image_id: str) -> List[Dict[str, Any]]:
+        path, _ = self._source(image_id)
+        width, height = self._image_size(path)
+        result = []
+        for level in range(self.level_count(width, height)):
+            level_w, level_h = self._level_size(width, height, level)
+            result.append(
+                {
+                    "level": level,
+                    "width": level_w,
+                    "height": level_h,
+                    "cols": math.ceil(level_w / self.tile_size),
+                    "rows": math.ceil(level_h / self.tile_size),
+                }
+            )
+        return result
+
+    @staticmethod
+    def _level_size(width: int, height: int, level: int) -> Tuple[int, int]:
+        factor = 2**level
+        return max(1, math.ceil(width / factor)), max(1, math.ceil(height / factor))
+
+    def _encode(self, image: Image.Image, image_format: str, quality: int) -> bytes:
+        output = BytesIO()
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.save(output, format=_PIL_FORMATS[image_format], quality=quality)
+        return output.getvalue()
+
+    def get_rendition(
+        self,
+        image_id: str,
+        *,
+        level: int | None = None,
+        size: int | None = None,
+        image_format: str = "webp",
+        quality: int = 80,
+    ) -> Path:
+        """Return cached file with the whole image at pyramid level or max side `size`"""
+        image_format = _normalize_format(image_format)
+        quality = _validate_quality(quality)
+        path, version = self._source(image_id)
+        width, height = self._image_size(path)
+        if size is not None:
+            if size <= 0:
+                raise InvalidFormatError("size must be positive")
+            scale = min(1.0, size / max(width, height))
+            target = (max(1, round(width * scale)), max(1, round(height * scale)))
+        else:
+            level = level or 0
+            if not 0 <= level < self.level_count(width, height):
+                raise InvalidFormatError(f"level out of range: {level}")
+            target = self._level_size(width, height, level)
+
+        key = f"rendition:{version}:{target[0]}x{target[1]}:{image_format}:{quality}"
+        cached = self._cache.get(key, f".{image_format}")
+        if cached is not None:
+            return cached
+
+        with Image.open(path) as image:
+            # draft() lets JPEG decode directly at a reduced scale.
+            image.draft("RGB", target)
+            image = image.convert("RGB")
+            if image.size != target:
+                image = image.resize(target, Image.LANCZOS, reducing_gap=3.0)
+            data = self._encode(image, image_format, quality)
+        logger.debug("Rendition generated: image_id=%s size=%s format=%s", image_id, target, image_format)
+        return self._cache.put(key, data, f".{image_format}")
+
+    def get_tile(
+        self,
+        image_id: str,
+        level: int,
+        col: int,
+        row: int,
+        *,
+        image_format: str = "webp",
+        quality: int = 80,
+        reader: ImageRegionReader | None = None,
+    ) -> Path:
+        """Return cached tile (col, row) of pyramid level"""
+        image_format = _normalize_format(image_format)
+        quality = _validate_quality(quality)
+        path, version = self._source(image_id)
+        width, height = self._image_size(path)
+        if not 0 <= level < self.level_count(width, height):
+            raise InvalidFormatError(f"level out of range: {level}")
+        level_w, level_h = self._level_size(width, height, level)
+        if not (0 <= col < math.ceil(level_w / self.tile_size) and 0 <= row < math.ceil(level_h / self.tile_size)):
+            raise InvalidFormatError(f"tile out of range: level={level} col={col} row={row}")
+
+        key = f"tile:{version}:{self.tile_size}:{level}:{col}:{row}:{image_format}:{quality}"
+        cached = self._cache.get(key, f".{image_format}")
+        if cached is not None:
+            return cached
+
+        factor = 2**level
+        source_box = (
+            col * self.tile_size * factor,
+            row * self.tile_size * factor,
+            min(width, (col + 1) * self.tile_size * factor),
+            min(height, (row + 1) * self.tile_size * factor),
+        )
+        target = (
+            min(self.tile_size, level_w - col * self.tile_size),
+            min(self.tile_size, level_h - row * self.tile_size),
+        )
+        if reader is None:
+            reader = self._reader(path, version)
+        tile = reader.read(source_box)
+        if tile.size != target:
+            tile = tile.resize(target, Image.LANCZOS)
+        return self._cache.put(key, self._encode(tile, image_format, quality), f".{image_format}")
+
+    def pregenerate(
+        self,
+        image_ids: Iterable[str],
+        *,
+        levels: Iterable[int] | None = None,
+        tiles: bool = False,
+        image_format: str = "webp",
+        quality: int = 80,
+    ) -> Dict[str, int]:
+        """Warm the cache for many images; returns generated counters"""
+        counters = {"images": 0, "renditions": 0, "tiles": 0}
+        for image_id in image_ids:
+            level_info = {item["level"]: item for item in self.levels(image_id)}
+            selected = [level for level in (levels if levels is not None else level_info) if level in level_info]
+            path, version = self._source(image_id)
+            reader = None
+            for level in selected:
+                self.get_rendition(image_id, level=level, image_format=image_format, quality=quality)
+                counters["renditions"] += 1
+                if not tiles:
+                    continue
+                if reader is None:
+                    reader = self._reader(path, version)
+                info = level_info[level]
+                for row in range(info["rows"]):
+                    for col in range(info["cols"]):
+                        self.get_tile(
+                            image_id,
+                            level,
+                            col,
+                            row,
+                            image_format=image_format,
+                            quality=quality,
+                            reader=reader,
+                        )
+                        counters["tiles"] += 1
+            counters["images"] += 1
+        return counters
+
+
+def build_rendition_service(image_provider: LocalFSImageProvider) -> RenditionService:
+    """Rendition service with the cache, tile size and decode limit from settings"""
+    return RenditionService(
+        image_provider,
+        DiskCache(settings.RENDITION_CACHE_PATH, settings.RENDITION_CACHE_MAX_BYTES, name="renditions"),
+        tile_size=settings.RENDITION_TILE_SIZE,
+        max_decoded_pixels=settings.IMAGE_MAX_DECODED_PIXELS,
+    )
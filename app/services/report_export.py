@@ -1,5 +1,7 @@
 """Dataset report export helpers."""
+import csv
 from dataclasses import dataclass
+from io import BytesIO, StringIO
 from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
 
 
@@ -38,3 +40,86 @@ def build_report_table(
     headers = [field.header for field in fields]
     data = [[field.getter(row) for field in fields] for row in rows]
     return headers, data
+
+
+PER_CLASS_FIELDS: Sequence[ReportField] = (
+    ReportField("class_id", "Class ID", lambda row: row["class_id"]),
+    ReportField("expert_count", "Expert boxes", lambda row: row["expert_count"]),
+    ReportField("model_count", "Model boxes", lambda row: row["model_count"]),
+    ReportField("tp", "TP", lambda row: row["tp"]),
+    ReportField("fp", "FP", lambda row: row["fp"]),
+    ReportField("fn", "FN", lambda row: row["fn"]),
+    ReportField("precision", "Precision", lambda row: row["precision"]),
+    ReportField("recall", "Recall", lambda row: row["recall"]),
+    ReportField("f1", "F1", lambda row: row["f1"]),
+)
+
+SUMMARY_FIELDS: Sequence[ReportField] = (
+    ReportField("variant", "Matching", lambda row: "class aware" if row["class_aware"] else "class agnostic"),
+    *(field for field in DEFAULT_IMAGE_REPORT_FIELDS if field.key not in ("image_id", "class_aware")),
+)
+
+
+def build_per_class_table(evaluation: Dict[str, Any]) -> Tuple[List[str], List[List[Any]]]:
+    return build_report_table(evaluation["per_class"], PER_CLASS_FIELDS)
+
+
+def build_summary_table(evaluation: Dict[str, Any]) -> Tuple[List[str], List[List[Any]]]:
+    rows = [{"stats": evaluation[key], **evaluation[key]} for key in ("class_aware", "class_agnostic")]
+    return build_report_table(rows, SUMMARY_FIELDS)
+
+
+def build_confusion_table(evaluation: Dict[str, Any]) -> Tuple[List[str], List[List[Any]]]:
+    """Rows are expert classes, columns model classes (background last)"""
+    confusion = evaluation["confusion_matrix"]
+    labels = [str(label) for label in confusion["labels"]]
+    headers = ["Expert \\ Model", *labels]
+    data = [[label, *row] for label, row in zip(labels, confusion["matrix"])]
+    return headers, data
+
+
+Table = Tuple[str, List[str], List[List[Any]]]
+
+
+def build_evaluation_tables(evaluation: Dict[str, Any]) -> List[Table]:
+    """Extra (title, headers, rows) tables for an evaluate_dataset result"""
+    return [
+        ("Summary", *build_summary_table(evaluation)),
+        ("Per class", *build_per_class_table(evaluation)),
+        ("Confusion matrix", *build_confusion_table(evaluation)),
+    ]
+
+
+def render_csv(headers: List[str], data: List[List[Any]], extra_tables: Sequence[Table] = ()) -> bytes:
+    """Per-image table first; extra tables follow as `# Title` sections after a blank row"""
+    text_stream = StringIO()
+    csv_writer = csv.writer(text_stream)
+    csv_writer.writerow(headers)
+    csv_writer.writerows(data)
+    for title, table_headers, table_data in extra_tables:
+        csv_writer.writerow([])
+        csv_writer.writerow([f"# {title}"])
+        csv_writer.writerow(table_headers)
+        csv_writer.writerows(table_data)
+    return text_stream.getvalue().encode("utf-8")
+
+
+def render_xlsx(headers: List[str], data: List[List[Any]], extra_tables: Sequence[Table] = ()) -> bytes:
+    """Per-image table on the first sheet; one sheet per extra table"""
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Dataset report"
+    sheet.append(headers)
+    for row in data:
+        sheet.append(row)
+    for title, table_headers, table_data in extra_tables:
+        extra_sheet = workbook.create_sheet(title)
+        extra_sheet.append(table_headers)
+        for row in table_data:
+            extra_sheet.append(row)
+
+    output = BytesIO()
+    workbook.save(output)
+    return output.getvalue()
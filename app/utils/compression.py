@@ -0,0 +1,152 @@
+"""Response compression middleware (brotli when available, gzip otherwise)"""
+import zlib
+from typing import Any, Callable
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+# Already-compressed payloads are passed through untouched.
+_INCOMPRESSIBLE_PREFIXES = (
+    "image/",
+    "video/",
+    "application/zip",
+    "application/gzip",
+    "application/vnd.openxmlformats",
+    "application/vnd.apache.parquet",
+    "application/vnd.apache.arrow",
+)
+# Progress streams must reach the client line by line; a compressor would
+# hold them back until its buffer fills.
+_STREAMING_PREFIXES = ("application/x-ndjson",)
+
+
+def _accepted(accept_encoding: str) -> set[str]:
+    encodings = set()
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        if name:
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int) -> None:
+        self.encoding = encoding
+        if encoding == "br":
+            self._impl: Any = brotli.Compressor(quality=brotli_quality)
+            self._compress: Callable[[bytes], bytes] = self._impl.process
+            self._finish: Callable[[], bytes] = self._impl.finish
+        else:
+            self._impl = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+            self._compress = self._impl.compress
+            self._finish = self._impl.flush
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compress(data)
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+class CompressionMiddleware:
+    """Compress responses above `minimum_size` with br or gzip per Accept-Encoding"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accepted = _accepted(Headers(scope=scope).get("accept-encoding", ""))
+        if brotli is not None and "br" in accepted:
+            encoding: str | None = "br"
+        elif "gzip" in accepted:
+            encoding = "gzip"
+        else:
+            # Still wrapped: the identity body needs Vary too.
+            encoding = None
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str | None, send: Send) -> None:
+        self._middleware = middleware
+        self._encoding = encoding
+        self._send = send
+        self._initial: Message | None = None
+        self._compressor: _Compressor | None = None
+        self._passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self._initial = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            incompressible = "content-encoding" in headers or content_type.startswith(_INCOMPRESSIBLE_PREFIXES)
+            if not incompressible:
+                # Caches must keep the identity and encoded bodies apart
+                # (304s included, so revalidation picks the right one).
+                MutableHeaders(raw=message["headers"]).add_vary_header("Accept-Encoding")
+            self._passthrough = (
+                incompressible
+                or self._encoding is None
+                or message.get("status", 200) in (204, 304)
+                or content_type.startswith(_STREAMING_PREFIXES)
+            )
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        if self._initial is not None:
+            initial, self._initial = self._initial, None
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if self._passthrough or (not more_body and len(body) < self._middleware.minimum_size):
+                self._passthrough = True
+                await self._send(initial)
+                await self._send(message)
+                return
+            self._compressor = _Compressor(
+                self._encoding,
+                self._middleware.gzip_level,
+                self._middleware.brotli_quality,
+            )
+            headers = MutableHeaders(raw=initial["headers"])
+            headers["Content-Encoding"] = self._compressor.encoding
+            payload = self._compressor.compress(body)
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                payload += self._compressor.finish()
+                headers["Content-Length"] = str(len(payload))
+            await self._send(initial)
+            await self._send({"type": "http.response.body", "body": payload, "more_body": more_body})
+            return
+
+        if self._passthrough or self._compressor is None:
+            await self._send(message)
+            return
+        more_body = message.get("more_body", False)
+        payload = self._compressor.compress(message.get("body", b""))
+        if not more_body:
+            payload += self._compressor.finish()
+        await self._send({"type": "http.response.body", "body": payload, "more_body": more_body})
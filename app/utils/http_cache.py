@@ -0,0 +1,161 @@
+"""HTTP validators (ETag/Last-Modified) and conditional request helpers"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Iterable, Mapping
+
+from fastapi import Request, Response
+
+from app.utils.metrics import record_cache
+
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag from arbitrary parts
+
+    Weak because the same entity is served identity, gzip or br encoded
+    (byte-different bodies), which a strong validator must not cover.
+    """
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\0")
+    return f'W/"{digest.hexdigest()}"'
+
+
+def file_version(path: Path | None) -> str:
+    """Cheap file validator from mtime and size"""
+    if path is None:
+        return "missing"
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return "missing"
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def directory_version(path: Path) -> str:
+    """Validator for directory contents from entry names, mtimes and sizes"""
+    digest = hashlib.sha1()
+    try:
+        entries = sorted(os.scandir(path), key=lambda entry: entry.name)
+    except FileNotFoundError:
+        return "missing"
+    for entry in entries:
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        digest.update(f"{entry.name}:{stat.st_mtime_ns}:{stat.st_size}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class DirectoryVersionCache:
+    """directory_version() memoized while the directory's own mtime is unchanged
+
+    Adding, removing or renaming entries bumps the directory mtime and is
+    seen at once; an entry rewritten in place is only seen after `ttl_s`.
+    """
+
+    def __init__(self, ttl_s: float = 2.0) -> None:
+        self.ttl_s = ttl_s
+        self._entries: dict[str, tuple[tuple[int, int], float, str]] = {}
+        self._lock = threading.Lock()
+
+    def version(self, path: Path) -> str:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return "missing"
+        signature = (stat.st_ino, stat.st_mtime_ns)
+        now = time.monotonic()
+        key = str(path)
+        with self._lock:
+            cached = self._entries.get(key)
+        if cached is not None and cached[0] == signature and now - cached[1] < self.ttl_s:
+            record_cache("directory_version", hit=True)
+            return cached[2]
+        record_cache("directory_version", hit=False)
+        value = directory_version(path)
+        with self._lock:
+            self._entries[key] = (signature, now, value)
+        return value
+
+
+def http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
+
+
+def query_items(request: Request, exclude: Iterable[str] = ()) -> tuple[tuple[str, str], ...]:
+    excluded = set(exclude)
+    return tuple(sorted((key, value) for key, value in request.query_params.multi_items() if key not in excluded))
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison: ignore W/ prefixes.
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def is_not_modified(request: Request, etag: str, last_modified: float | None = None) -> bool:
+    """Evaluate If-None-Match (or If-Modified-Since when no ETag sent)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(last_modified) <= int(since)
+    return False
+
+
+def cache_headers(
+    etag: str,
+    cache_control: str,
+    last_modified: float | None = None,
+) -> dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified(headers: Mapping[str, str]) -> Response:
+    return Response(status_code=304, headers=dict(headers))
+
+
+class FileDigestCache:
+    """Content hashes of files memoized by (path, mtime, size)"""
+
+    def __init__(self, max_entries: int = 4096) -> None:
+        self._max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str], str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def digest(self, path: Path) -> str:
+        key = (str(path), file_version(path))
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                record_cache("file_digest", hit=True)
+                return cached
+        record_cache("file_digest", hit=False)
+        hasher = hashlib.sha1()
+        with path.open("rb") as handle:
+            for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+                hasher.update(chunk)
+        value = hasher.hexdigest()
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return value
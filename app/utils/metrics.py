@@ -0,0 +1,187 @@
+"""Prometheus metrics: HTTP, per-stage model timings, boxes, caches and queues
+
+Works with several uvicorn workers when PROMETHEUS_MULTIPROC_DIR points to an
+empty writable directory (prometheus_client multiprocess mode): every worker
+writes its samples there and /metrics aggregates them at scrape time.
+"""
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.profiling import record_stage
+
+_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+_STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+_BOX_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by route template and status",
+    ["method", "route", "status"],
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route"],
+    buckets=_LATENCY_BUCKETS,
+)
+STAGE_LATENCY = Histogram(
+    "model_stage_duration_seconds",
+    "Time spent per analysis stage",
+    ["stage"],
+    buckets=_STAGE_BUCKETS,
+)
+BOXES_PER_IMAGE = Histogram(
+    "boxes_per_image",
+    "Boxes per analyzed image",
+    ["source"],
+    buckets=_BOX_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by cache and result (hit ratio = hit / (hit + miss))",
+    ["cache", "result"],
+)
+COALESCED_REQUESTS = Counter(
+    "singleflight_requests_total",
+    "Coalesced computations by flight and role (follower = served by an in-flight run)",
+    ["flight", "role"],
+)
+QUEUE_DEPTH = Gauge(
+    "queue_depth",
+    "Requests currently waiting or in progress",
+    ["queue"],
+    multiprocess_mode="livesum",
+)
+
+# Analysis stages, in pipeline order; "predict" wraps the runner call and
+# decode..postprocess break it down for ONNX runners.
+STAGES = (
+    "read_image",
+    "read_annotations",
+    "predict",
+    "decode",
+    "preprocess",
+    "inference",
+    "postprocess",
+    "matching",
+    "distributions",
+    "stats",
+)
+_STAGE_CHILDREN = {stage: STAGE_LATENCY.labels(stage) for stage in STAGES}
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    child = _STAGE_CHILDREN.get(stage)
+    if child is None:
+        child = STAGE_LATENCY.labels(stage)
+    child.observe(seconds)
+    record_stage(stage, seconds)
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Record the duration of the enclosed block as one analysis stage"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+
+class StageTotals:
+    """Stage durations summed over repeated blocks and observed once each
+
+    For work split into parts (e.g. tiles of one image), so stage histograms
+    keep counting images rather than parts.
+    """
+
+    def __init__(self) -> None:
+        self.seconds: dict[str, float] = {}
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + time.perf_counter() - started
+
+    def observe(self) -> None:
+        for stage, seconds in self.seconds.items():
+            observe_stage(stage, seconds)
+
+
+@contextmanager
+def track_queue(queue: str) -> Iterator[None]:
+    gauge = QUEUE_DEPTH.labels(queue)
+    gauge.inc()
+    try:
+        yield
+    finally:
+        gauge.dec()
+
+
+def observe_boxes(source: str, count: int) -> None:
+    BOXES_PER_IMAGE.labels(source).observe(count)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_coalesced(flight: str, leader: bool) -> None:
+    COALESCED_REQUESTS.labels(flight, "leader" if leader else "follower").inc()
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Exposition payload, aggregated across workers in multiprocess mode"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """Count requests and observe latency per route template (not raw path)"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        with track_queue("http"):
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                # The router stores the matched route on the shared scope.
+                route = scope.get("route")
+                route_path = getattr(route, "path", "unmatched")
+                method = scope.get("method", "GET")
+                HTTP_REQUESTS.labels(method, route_path, str(status_code)).inc()
+                HTTP_LATENCY.labels(method, route_path).observe(time.perf_counter() - started)
@@ -0,0 +1,144 @@
+"""Per-request stage timings, opt-in cProfile dumps and slow-request log"""
+import cProfile
+import io
+import logging
+import pstats
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Tuple, TypeVar
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+slow_logger = logging.getLogger("app.slow_requests")
+
+T = TypeVar("T")
+
+
+class StageTimings:
+    """Accumulated duration and call count per stage for one request
+
+    Threads started from the request (read-ahead, batch reads) inherit the
+    context and add to the same instance, hence the lock.
+    """
+
+    __slots__ = ("started", "stages", "_lock")
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.stages: Dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.stages.get(stage)
+            if entry is None:
+                self.stages[stage] = [seconds, 1]
+            else:
+                entry[0] += seconds
+                entry[1] += 1
+
+    def snapshot(self) -> Dict[str, Tuple[float, int]]:
+        """Stage -> (seconds, count), copied under the lock"""
+        with self._lock:
+            return {stage: (seconds, int(count)) for stage, (seconds, count) in self.stages.items()}
+
+    @property
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_ms": round(self.elapsed_ms, 3),
+            "stages": {
+                stage: {"ms": round(seconds * 1000.0, 3), "count": count}
+                for stage, (seconds, count) in self.snapshot().items()
+            },
+        }
+
+    def server_timing(self) -> str:
+        """Server-Timing header value (visible in browser dev tools)"""
+        metrics = [f"{stage};dur={seconds * 1000.0:.2f}" for stage, (seconds, _) in self.snapshot().items()]
+        metrics.append(f"total;dur={self.elapsed_ms:.2f}")
+        return ", ".join(metrics)
+
+
+_current: ContextVar[StageTimings | None] = ContextVar("stage_timings", default=None)
+
+
+def current_timings() -> StageTimings | None:
+    return _current.get()
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    timings = _current.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+@contextmanager
+def collect_timings() -> Iterator[StageTimings]:
+    """Collect stages recorded in this context (threadpool calls inherit it)"""
+    timings = StageTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def sampled(rate: float) -> bool:
+    """True for about `rate` of calls (rate >= 1 always, rate <= 0 never)"""
+    return rate >= 1.0 or random.random() < rate
+
+
+def profile_call(
+    func: Callable[..., T],
+    *args: Any,
+    top_n: int = 25,
+    dump_dir: str | Path | None = None,
+    dump_name: str = "request",
+    **kwargs: Any,
+) -> Tuple[T, Dict[str, Any]]:
+    """Run func under cProfile; return its result and the top functions by cumulative time"""
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func, *args, **kwargs)
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top_n)
+    report: Dict[str, Any] = {"top_n": top_n, "stats": stream.getvalue()}
+    if dump_dir:
+        dump_path = Path(dump_dir) / f"{dump_name}-{time.strftime('%Y%m%dT%H%M%S')}-{time.perf_counter_ns()}.prof"
+        dump_path.parent.mkdir(parents=True, exist_ok=True)
+        stats.dump_stats(dump_path)
+        report["dump_file"] = dump_path.name
+    return result, report
+
+
+class StageTimingMiddleware:
+    """Collect stage timings per request; log the breakdown above slow_threshold_ms"""
+
+    def __init__(self, app: ASGIApp, slow_threshold_ms: float = 0.0) -> None:
+        self.app = app
+        self.slow_threshold_ms = slow_threshold_ms
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with collect_timings() as timings:
+            await self.app(scope, receive, send)
+        elapsed_ms = timings.elapsed_ms
+        if self.slow_threshold_ms > 0 and elapsed_ms >= self.slow_threshold_ms:
+            query = scope.get("query_string", b"").decode("latin-1")
+            slow_logger.warning(
+                "Slow request: %s %s%s total_ms=%.1f stages=%s",
+                scope.get("method", "GET"),
+                scope.get("path", ""),
+                f"?{query}" if query else "",
+                elapsed_ms,
+                {stage: round(seconds * 1000.0, 1) for stage, (seconds, _) in timings.snapshot().items()},
+            )
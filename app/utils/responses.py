@@ -0,0 +1,20 @@
+"""Fast JSON response class"""
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson (numpy arrays/scalars supported)"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=_ORJSON_OPTIONS)
+
+
+def json_line(content: Any) -> bytes:
+    """One newline-terminated JSON document of an NDJSON stream"""
+    return orjson.dumps(content, option=_ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE)
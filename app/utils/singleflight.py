@@ -0,0 +1,86 @@
+"""Single-flight request coalescing: identical concurrent computations run once"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Hashable, Set, TypeVar
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.utils.metrics import record_coalesced
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Share one in-flight threadpool computation between callers with the same key.
+
+    The first caller (leader) starts `func` in the threadpool; callers that
+    arrive with the same key while it runs (followers) await the same result
+    or exception. The key is released as soon as the computation finishes,
+    so later calls compute afresh. A cancelled caller (client went away)
+    does not cancel the computation for the others.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        # Callers still inside `shared` per computation, and computations
+        # whose cleanup waits for them to finish.
+        self._users: Dict[asyncio.Future, int] = {}
+        self._orphaned: Set[asyncio.Future] = set()
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def _join(self, key: Hashable, func: Callable[[], T]) -> asyncio.Future:
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(run_in_threadpool(func))
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._release(key, done))
+            record_coalesced(self.name, leader=True)
+        else:
+            record_coalesced(self.name, leader=False)
+        return future
+
+    async def run(self, key: Hashable, func: Callable[[], T]) -> T:
+        return await asyncio.shield(self._join(key, func))
+
+    @asynccontextmanager
+    async def shared(self, key: Hashable, func: Callable[[], T], cleanup: Callable[[T], None]) -> AsyncIterator[T]:
+        """Like `run`, for a result used in place (e.g. a file on disk)
+
+        `cleanup(result)` runs once, when the last caller sharing the result
+        leaves the block, or when the computation finishes if all of them
+        went away before it did.
+        """
+        future = self._join(key, func)
+        self._users[future] = self._users.get(future, 0) + 1
+        try:
+            yield await asyncio.shield(future)
+        finally:
+            self._users[future] -= 1
+            if not self._users[future]:
+                del self._users[future]
+                if future.done():
+                    _clean_up(future, cleanup)
+                elif future not in self._orphaned:
+                    self._orphaned.add(future)
+                    future.add_done_callback(lambda done: self._clean_up_orphan(done, cleanup))
+
+    def _clean_up_orphan(self, future: asyncio.Future, cleanup: Callable) -> None:
+        self._orphaned.discard(future)
+        # A caller that joined after the others left cleans up on its way out.
+        if future not in self._users:
+            _clean_up(future, cleanup)
+
+    def _release(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            # Mark the exception as retrieved even if every caller went away.
+            future.exception()
+
+
+def _clean_up(future: asyncio.Future, cleanup: Callable) -> None:
+    if not future.cancelled() and future.exception() is None:
+        cleanup(future.result())
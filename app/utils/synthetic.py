@@ -0,0 +1,126 @@
+"""Synthetic datasets and models for benchmarks, load tests and the test suite"""
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+from PIL import Image
+
+from app.core.boxes import BoxSet
+
+
+def synthetic_boxes(
+    count: int,
+    rng: np.random.Generator,
+    *,
+    num_classes: int = 3,
+    scored: bool = False,
+    max_size: float = 0.08,
+) -> BoxSet:
+    """Random boxes in normalized center format"""
+    xywh = np.column_stack(
+        [
+            rng.uniform(0.05, 0.95, count),
+            rng.uniform(0.05, 0.95, count),
+            rng.uniform(0.01, max_size, count),
+            rng.uniform(0.01, max_size, count),
+        ]
+    )
+    class_id = rng.integers(0, num_classes, count)
+    score = rng.uniform(0.25, 1.0, count) if scored else None
+    return BoxSet(class_id, xywh, score)
+
+
+def format_yolo_labels(boxes: BoxSet) -> str:
+    lines = [
+        f"{class_id} {x:.6f} {y:.6f} {w:.6f} {h:.6f}"
+        for class_id, (x, y, w, h) in zip(boxes.class_id.tolist(), boxes.xywh.tolist())
+    ]
+    return "\n".join(lines) + ("\n" if lines else "")
+
+
+def write_synthetic_dataset(
+    root: str | Path,
+    *,
+    image_count: int = 20,
+    boxes_per_image: int = 50,
+    image_size: Tuple[int, int] = (64, 48),
+    num_classes: int = 3,
+    seed: int = 0,
+    image_format: str = "png",
+) -> Path:
+    """Write `images/` and `labels/` with random pixels and YOLO boxes"""
+    root = Path(root)
+    images_dir = root / "images"
+    labels_dir = root / "labels"
+    images_dir.mkdir(parents=True, exist_ok=True)
+    labels_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    width, height = image_size
+    for index in range(image_count):
+        image_id = f"SYN-{index:06d}"
+        pixels = rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8)
+        Image.fromarray(pixels).save(images_dir / f"{image_id}.{image_format}")
+        boxes = synthetic_boxes(boxes_per_image, rng, num_classes=num_classes)
+        (labels_dir / f"{image_id}.txt").write_text(format_yolo_labels(boxes))
+    return root
+
+
+def write_tiny_onnx_model(
+    model_path: str | Path,
+    batch: int | str = 1,
+    ballast_mb: int = 0,
+    img_size: int = 32,
+) -> Path:
+    """Write a tiny YOLO-like ONNX model: (batch,3,S,S) -> (batch,6,(S/8)^2) raw output.
+
+    `ballast_mb` adds a weight matrix of roughly that size on a branch that
+    contributes zero to the output, so sessions cost real memory and compute
+    (for memory benchmarks). Requires the `onnx` package.
+    """
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+
+    rng = np.random.default_rng(0)
+    weights = numpy_helper.from_array(
+        rng.normal(0, 0.1, size=(6, 3, 8, 8)).astype(np.float32), name="conv_w"
+    )
+    candidates = (img_size // 8) ** 2
+    shape = numpy_helper.from_array(np.array([0, 6, candidates], dtype=np.int64), name="out_shape")
+    nodes = [
+        helper.make_node("Conv", ["images", "conv_w"], ["conv"], strides=[8, 8]),
+        helper.make_node("Sigmoid", ["conv"], ["act"]),
+    ]
+    initializers = [weights, shape]
+    if ballast_mb > 0:
+        features = 3 * img_size * img_size
+        columns = max(1, ballast_mb * 1024 * 1024 // (features * 4))
+        initializers += [
+            numpy_helper.from_array(
+                rng.normal(0, 0.01, size=(features, columns)).astype(np.float32), name="ballast_w"
+            ),
+            numpy_helper.from_array(np.zeros((1,), dtype=np.float32), name="zero"),
+        ]
+        nodes += [
+            helper.make_node("Flatten", ["images"], ["flat"]),
+            helper.make_node("MatMul", ["flat", "ballast_w"], ["ballast"]),
+            helper.make_node("ReduceMean", ["ballast"], ["ballast_mean"], keepdims=1),
+            helper.make_node("Mul", ["ballast_mean", "zero"], ["ballast_zero"]),
+            helper.make_node("Unsqueeze", ["ballast_zero", "unsqueeze_axes"], ["ballast_term"]),
+            helper.make_node("Add", ["act", "ballast_term"], ["act_total"]),
+        ]
+        initializers.append(numpy_helper.from_array(np.array([2, 3], dtype=np.int64), name="unsqueeze_axes"))
+        nodes.append(helper.make_node("Reshape", ["act_total", "out_shape"], ["output0"]))
+    else:
+        nodes.append(helper.make_node("Reshape", ["act", "out_shape"], ["output0"]))
+    graph = helper.make_graph(
+        nodes,
+        "tiny_detector",
+        [helper.make_tensor_value_info("images", TensorProto.FLOAT, [batch, 3, img_size, img_size])],
+        [helper.make_tensor_value_info("output0", TensorProto.FLOAT, [batch, 6, candidates])],
+        initializer=initializers,
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    model_path = Path(model_path)
+    onnx.save(model, str(model_path))
+    return model_path
@@ -0,0 +1 @@
+"""Micro-benchmarks for core hot paths"""
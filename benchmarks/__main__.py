@@ -0,0 +1,71 @@
+"""python -m benchmarks [--update-baseline] [--tolerance 0.5] [--images N --boxes M]"""
+import argparse
+import os
+import sys
+import tempfile
+from dataclasses import asdict
+from typing import List
+
+from benchmarks.cases import BenchParams, build_cases, select_cases
+from benchmarks.harness import (
+    BASELINE_PATH,
+    DEFAULT_TOLERANCE,
+    compare,
+    load_baseline,
+    measure,
+    save_baseline,
+)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    parser.add_argument("--images", type=int, default=BenchParams.images)
+    parser.add_argument("--boxes", type=int, default=BenchParams.boxes, help="Boxes per image")
+    parser.add_argument("--seed", type=int, default=BenchParams.seed)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=float(os.environ.get("BENCH_TOLERANCE", DEFAULT_TOLERANCE)),
+        help="Allowed slowdown vs baseline as a fraction (0.5 = 50%%)",
+    )
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--update-baseline", action="store_true", help="Record results as the new baseline")
+    parser.add_argument("--case", action="append", dest="cases", help="Substring filter, repeatable")
+    return parser
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    params = BenchParams(images=args.images, boxes=args.boxes, seed=args.seed)
+    baseline = load_baseline(args.baseline)
+    if not args.update_baseline and baseline.get("params") not in (None, asdict(params)):
+        print(f"warning: baseline params {baseline['params']} differ from {asdict(params)}", file=sys.stderr)
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        cases = select_cases(build_cases(workdir, params), args.cases)
+        results = [measure(name, case, repeat=args.repeat) for name, case in cases.items()]
+
+    recorded = baseline.get("results", {})
+    for result in results:
+        reference = recorded.get(result.name, {}).get("best_ms")
+        delta = f"{(result.best_ms / reference - 1) * 100:+.1f}%" if reference else "new"
+        print(f"{result.name:<32} best {result.best_ms:10.4f} ms  median {result.median_ms:10.4f} ms  {delta}")
+
+    if args.update_baseline:
+        save_baseline(results, asdict(params), args.baseline)
+        print(f"baseline written: {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(
+            f"REGRESSION {regression.name}: {regression.current_ms:.4f} ms "
+            f"vs {regression.baseline_ms:.4f} ms (x{regression.ratio:.2f}, tolerance {args.tolerance:.0%})",
+            file=sys.stderr,
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""Benchmark cases for core hot paths on a synthetic dataset"""
+import importlib.util
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from app.core.iou import compute_iou, compute_iou_matrix
+from app.core.matcher import match_boxes
+from app.infrastructure.model_runner import StubModelRunner
+from app.providers.local_fs import LocalFSAnnotationProvider, LocalFSImageProvider
+from app.services.model_worker import ModelWorker
+from app.utils.synthetic import synthetic_boxes, write_synthetic_dataset, write_tiny_onnx_model
+
+
+@dataclass(frozen=True)
+class BenchParams:
+    images: int = 20
+    boxes: int = 50
+    seed: int = 0
+
+
+Case = Callable[[], Any]
+
+
+def build_cases(workdir: str | Path, params: BenchParams) -> Dict[str, Case]:
+    """Prepare fixtures under `workdir` and return name -> zero-arg callable"""
+    workdir = Path(workdir)
+    data_path = write_synthetic_dataset(
+        workdir / "data",
+        image_count=params.images,
+        boxes_per_image=params.boxes,
+        seed=params.seed,
+    )
+    rng = np.random.default_rng(params.seed)
+    pred = synthetic_boxes(params.boxes, rng, scored=True)
+    gt = synthetic_boxes(params.boxes, rng)
+    pred_dicts = pred.to_dicts()
+    gt_dicts = gt.to_dicts()
+
+    image_provider = LocalFSImageProvider(data_path=data_path)
+    annotation_provider = LocalFSAnnotationProvider(data_path=data_path)
+    image_ids = image_provider.list_image_ids()
+    stub_runner = StubModelRunner(pred_dicts)
+    worker = ModelWorker(image_provider, annotation_provider, stub_runner)
+
+    def iou_pairwise() -> None:
+        for pred_box in pred_dicts:
+            for gt_box in gt_dicts:
+                compute_iou(pred_box, gt_box)
+
+    def load_annotations() -> None:
+        for image_id in image_ids:
+            annotation_provider.get_annotations(image_id)
+
+    cases: Dict[str, Case] = {
+        "compute_iou.pairwise": iou_pairwise,
+        "compute_iou_matrix": lambda: compute_iou_matrix(pred, gt),
+        "match_boxes.class_aware": lambda: match_boxes(pred, gt, 0.1, True),
+        "match_boxes.class_agnostic": lambda: match_boxes(pred, gt, 0.1, False),
+        "annotations.get_annotations": load_annotations,
+        "model_worker.analyze_dataset": lambda: worker.analyze_dataset(iou_threshold=0.1),
+    }
+    cases.update(_onnx_cases(workdir, image_provider.get_image(image_ids[0])))
+    return cases
+
+
+def _onnx_cases(workdir: Path, image_bytes: bytes) -> Dict[str, Case]:
+    # The tiny model needs the onnx package to be written; skip quietly without it.
+    if importlib.util.find_spec("onnx") is None or importlib.util.find_spec("onnxruntime") is None:
+        return {}
+    from app.infrastructure.model_runner import OnnxModelRunner
+
+    runner = OnnxModelRunner(write_tiny_onnx_model(workdir / "tiny.onnx"), conf_threshold=0.0)
+    blob, width, height, scale, pad = runner.preprocess(image_bytes)
+    outputs = runner._session.run(None, {runner.input_name: blob})
+
+    return {
+        "onnx_runner.preprocess": lambda: runner.preprocess(image_bytes),
+        "onnx_runner.postprocess": lambda: runner._parse_outputs(
+            outputs, width, height, scale, pad, runner.img_size
+        ),
+    }
+
+
+def select_cases(cases: Dict[str, Case], patterns: List[str] | None) -> Dict[str, Case]:
+    if not patterns:
+        return cases
+    return {name: case for name, case in cases.items() if any(pattern in name for pattern in patterns)}
@@ -0,0 +1,85 @@
+"""Timing, JSON baselines and regression comparison"""
+import json
+import platform
+import time
+import timeit
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping
+
+DEFAULT_TOLERANCE = 0.5
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+
+@dataclass
+class BenchResult:
+    name: str
+    best_ms: float
+    median_ms: float
+    loops: int
+    repeat: int
+
+
+@dataclass
+class Regression:
+    name: str
+    baseline_ms: float
+    current_ms: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current_ms / self.baseline_ms if self.baseline_ms else float("inf")
+
+
+def measure(name: str, func: Callable[[], Any], *, repeat: int = 5, min_time: float = 0.2) -> BenchResult:
+    """Time `func` with timeit autorange; best-of-repeat is the regression signal"""
+    timer = timeit.Timer(func)
+    loops, _ = timer.autorange()
+    loops = max(1, int(loops * min_time / 0.2))
+    samples = sorted(value / loops * 1000 for value in timer.repeat(repeat=repeat, number=loops))
+    return BenchResult(
+        name=name,
+        best_ms=samples[0],
+        median_ms=samples[len(samples) // 2],
+        loops=loops,
+        repeat=repeat,
+    )
+
+
+def load_baseline(path: str | Path = BASELINE_PATH) -> Dict[str, Any]:
+    path = Path(path)
+    if not path.is_file():
+        return {"results": {}}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_baseline(
+    results: List[BenchResult],
+    params: Mapping[str, Any],
+    path: str | Path = BASELINE_PATH,
+) -> None:
+    payload = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "machine": {"python": platform.python_version(), "platform": platform.platform()},
+        "params": dict(params),
+        "results": {result.name: asdict(result) for result in results},
+    }
+    Path(path).write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+
+
+def compare(
+    results: List[BenchResult],
+    baseline: Mapping[str, Any],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> List[Regression]:
+    """Cases whose best time exceeds baseline * (1 + tolerance); unknown cases are skipped"""
+    recorded = baseline.get("results", {})
+    regressions = []
+    for result in results:
+        entry = recorded.get(result.name)
+        if entry is None:
+            continue
+        baseline_ms = float(entry["best_ms"])
+        if result.best_ms > baseline_ms * (1 + tolerance):
+            regressions.append(Regression(result.name, baseline_ms, result.best_ms))
+    return regressions
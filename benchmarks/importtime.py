@@ -0,0 +1,138 @@
+"""Cold-start import time of the API: python -m benchmarks.importtime
+
+Imports the target (default `app.main`, which also builds the app) in fresh
+interpreters with `-X importtime`, parses the per-module report and prints
+the best/median cumulative time plus the costliest direct imports of the
+target. Export libraries and onnxruntime must stay out of the cold import
+(they load on first use); `--budget-ms` fails when either the budget or
+that rule is broken. tests/test_import_time.py always checks the rule and,
+with RUN_BENCHMARKS=1, the budget (IMPORT_TIME_BUDGET_MS).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List
+
+DEFAULT_TARGET = "app.main"
+DEFAULT_BUDGET_MS = 1500.0
+LAZY_MODULES = ("onnxruntime", "openpyxl", "pyarrow")
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+@dataclass(frozen=True)
+class ImportRecord:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(report: str) -> List[ImportRecord]:
+    """Records of `-X importtime` stderr lines, in report order (children first)"""
+    records = []
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        module = name.lstrip(" ")
+        records.append(
+            ImportRecord(
+                module=module.strip(),
+                self_us=int(self_us),
+                cumulative_us=int(cumulative_us),
+                depth=(len(name) - len(module) - 1) // 2,
+            )
+        )
+    return records
+
+
+def children(records: List[ImportRecord], target: str) -> List[ImportRecord]:
+    """Direct imports of `target` (they precede it in the report, one level deeper)"""
+    for index, record in enumerate(records):
+        if record.module == target:
+            break
+    else:
+        raise ValueError(f"{target} not found in importtime report")
+    found = []
+    for record in reversed(records[:index]):
+        if record.depth <= records[index].depth:
+            break
+        if record.depth == records[index].depth + 1:
+            found.append(record)
+    return found
+
+
+def measure_once(target: str = DEFAULT_TARGET, env: Dict[str, str] | None = None) -> Dict[str, Any]:
+    """Import `target` in a fresh interpreter; report and lazy modules it loaded"""
+    code = (
+        f"import sys, json, {target}; "
+        f"print(json.dumps([name for name in {LAZY_MODULES!r} if name in sys.modules]))"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT,
+        env={**os.environ, **(env or {})},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    records = parse_importtime(completed.stderr)
+    total = next(record for record in records if record.module == target)
+    return {
+        "cumulative_ms": total.cumulative_us / 1000.0,
+        "records": records,
+        "eager_lazy_modules": json.loads(completed.stdout.strip().splitlines()[-1]),
+    }
+
+
+def run(target: str = DEFAULT_TARGET, runs: int = 3, env: Dict[str, str] | None = None, top: int = 10) -> Dict[str, Any]:
+    samples = [measure_once(target, env) for _ in range(max(1, runs))]
+    best = min(samples, key=lambda sample: sample["cumulative_ms"])
+    costliest = sorted(children(best["records"], target), key=lambda record: record.cumulative_us, reverse=True)
+    return {
+        "target": target,
+        "runs": len(samples),
+        "best_ms": round(best["cumulative_ms"], 1),
+        "median_ms": round(statistics.median(sample["cumulative_ms"] for sample in samples), 1),
+        "eager_lazy_modules": sorted({name for sample in samples for name in sample["eager_lazy_modules"]}),
+        "top_imports": [
+            {"module": record.module, "cumulative_ms": round(record.cumulative_us / 1000.0, 1)}
+            for record in costliest[:top]
+        ],
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.importtime", description=__doc__)
+    parser.add_argument("--target", default=DEFAULT_TARGET)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument(
+        "--runner",
+        default="stub",
+        help="MODEL_RUNNER for the imported app (stub keeps the background model load out of the timing)",
+    )
+    parser.add_argument("--budget-ms", type=float, default=None, help=f"Fail above this (tests use {DEFAULT_BUDGET_MS:g})")
+    return parser
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    report = run(args.target, args.runs, env={"MODEL_RUNNER": args.runner}, top=args.top)
+    print(json.dumps(report, indent=2))
+    if report["eager_lazy_modules"]:
+        print(f"lazy modules imported eagerly: {', '.join(report['eager_lazy_modules'])}", file=sys.stderr)
+        return 1
+    if args.budget_ms is not None and report["best_ms"] > args.budget_ms:
+        print(f"import time {report['best_ms']} ms exceeds budget {args.budget_ms:g} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""Per-worker sessions vs shared inference server: python -m benchmarks.inference_server
+
+Spawns N "API worker" processes that each run predictions in a few threads,
+once with a local OnnxModelRunner per worker and once with RemoteModelRunner
+clients of a single InferenceServer process. Reports throughput and memory
+(PSS where available, so shared pages are not double counted).
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List
+
+AUTHKEY = b"benchmark"
+
+
+def memory_kb(pid: int | str = "self") -> Dict[str, int]:
+    """PSS and RSS of a process in KiB (Linux /proc; zeros elsewhere)"""
+    values = {"pss_kb": 0, "rss_kb": 0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", encoding="ascii") as handle:
+            for line in handle:
+                if line.startswith("Pss:"):
+                    values["pss_kb"] = int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as handle:
+            for line in handle:
+                if line.startswith("VmRSS:"):
+                    values["rss_kb"] = int(line.split()[1])
+    except OSError:
+        pass
+    return values
+
+
+def _load_images(data_path: str) -> List[bytes]:
+    return [path.read_bytes() for path in sorted((Path(data_path) / "images").iterdir())]
+
+
+def _worker(mode: str, model_path: str, address: str, data_path: str, requests: int, threads: int,
+            barrier: Any, results: Any) -> None:
+    if mode == "local":
+        from app.infrastructure.model_runner import OnnxModelRunner
+
+        runner = OnnxModelRunner(model_path, conf_threshold=0.25)
+    else:
+        from app.infrastructure.inference_server import RemoteModelRunner
+
+        runner = RemoteModelRunner(address, AUTHKEY, slots=threads, img_size=32, connect_timeout=30)
+    images = _load_images(data_path)
+    runner.predict(images[0])
+    barrier.wait()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda index: runner.predict(images[index % len(images)]), range(requests)))
+    elapsed = time.perf_counter() - started
+    results.put({"pid": os.getpid(), "elapsed_s": elapsed, "requests": requests, **memory_kb()})
+    barrier.wait()
+    if mode == "server":
+        runner.close()
+
+
+def _server(model_path: str, address: str, max_batch: int, max_wait_ms: float) -> None:
+    from app.infrastructure.inference_server import InferenceServer
+    from app.infrastructure.model_runner import OnnxModelRunner
+
+    runner = OnnxModelRunner(model_path, conf_threshold=0.25, batch_size=max_batch)
+    InferenceServer(runner, address, AUTHKEY, max_batch=max_batch, max_wait_ms=max_wait_ms).serve_forever()
+
+
+def run_mode(mode: str, args: argparse.Namespace, model_path: str, data_path: str, workdir: Path) -> Dict[str, Any]:
+    ctx = mp.get_context("spawn")
+    address = str(workdir / f"{mode}.sock")
+    server = None
+    if mode == "server":
+        server = ctx.Process(
+            target=_server,
+            args=(model_path, address, args.max_batch, args.max_wait_ms),
+            daemon=True,
+        )
+        server.start()
+
+    barrier = ctx.Barrier(args.workers + 1)
+    results = ctx.Queue()
+    workers = [
+        ctx.Process(
+            target=_worker,
+            args=(mode, model_path, address, data_path, args.requests, args.threads, barrier, results),
+        )
+        for _ in range(args.workers)
+    ]
+    for process in workers:
+        process.start()
+    barrier.wait()
+    started = time.perf_counter()
+    reports = [results.get() for _ in workers]
+    wall = time.perf_counter() - started
+    server_memory = memory_kb(server.pid) if server is not None else {"pss_kb": 0, "rss_kb": 0}
+    barrier.wait()
+    for process in workers:
+        process.join()
+    if server is not None:
+        server.terminate()
+        server.join()
+
+    total_requests = sum(report["requests"] for report in reports)
+    return {
+        "mode": mode,
+        "workers": args.workers,
+        "threads_per_worker": args.threads,
+        "requests": total_requests,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(total_requests / wall, 1),
+        "worker_pss_mb": round(sum(report["pss_kb"] for report in reports) / 1024, 1),
+        "worker_rss_mb": round(sum(report["rss_kb"] for report in reports) / 1024, 1),
+        "server_pss_mb": round(server_memory["pss_kb"] / 1024, 1),
+        "total_pss_mb": round((sum(report["pss_kb"] for report in reports) + server_memory["pss_kb"]) / 1024, 1),
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.inference_server", description=__doc__)
+    parser.add_argument("--workers", type=int, default=4, help="API worker processes")
+    parser.add_argument("--threads", type=int, default=4, help="Concurrent predictions per worker")
+    parser.add_argument("--requests", type=int, default=200, help="Predictions per worker")
+    parser.add_argument("--ballast-mb", type=int, default=64, help="Extra weights in the generated model")
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--images", type=int, default=8)
+    parser.add_argument("--modes", default="local,server")
+    parser.add_argument("--output", help="Write JSON report to this path")
+    return parser
+
+
+def main(argv: List[str] | None = None) -> int:
+    from app.utils.synthetic import write_synthetic_dataset, write_tiny_onnx_model
+
+    args = build_parser().parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="infer-bench-") as tmp:
+        workdir = Path(tmp)
+        model_path = str(write_tiny_onnx_model(workdir / "model.onnx", batch="batch", ballast_mb=args.ballast_mb))
+        data_path = str(
+            write_synthetic_dataset(workdir / "data", image_count=args.images, image_size=(640, 480), image_format="jpg")
+        )
+        modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+        report = {"results": [run_mode(mode, args, model_path, data_path, workdir) for mode in modes]}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""session.run vs IOBinding in OnnxModelRunner.predict: python -m benchmarks.iobinding
+
+Runs the same images through two runners on one generated model (fixed
+output shape, 640x640 input by default) and reports latency plus the
+allocation high-water mark per call (tracemalloc peak above the steady
+state; numpy buffers, including session.run outputs, are traced).
+"""
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List
+
+
+def _latencies(runners: List[Any], images: List[bytes], runs: int) -> List[Dict[str, float]]:
+    # Interleave the runners so CPU frequency drift hits both paths alike.
+    timings: List[List[float]] = [[] for _ in runners]
+    for index in range(runs):
+        image = images[index % len(images)]
+        for runner, samples in zip(runners, timings):
+            started = time.perf_counter()
+            runner.predict(image)
+            samples.append((time.perf_counter() - started) * 1000.0)
+    summaries = []
+    for samples in timings:
+        samples.sort()
+        summaries.append(
+            {
+                "median_ms": round(statistics.median(samples), 3),
+                "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))], 3),
+                "best_ms": round(samples[0], 3),
+            }
+        )
+    return summaries
+
+
+def _allocations(predict, images: List[bytes], runs: int) -> Dict[str, float]:
+    tracemalloc.start()
+    try:
+        peaks = []
+        for index in range(runs):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            predict(images[index % len(images)])
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - current)
+    finally:
+        tracemalloc.stop()
+    return {"peak_alloc_kb": round(statistics.median(peaks) / 1024, 1)}
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    from app.infrastructure.model_runner import OnnxModelRunner
+    from app.utils.synthetic import write_synthetic_dataset, write_tiny_onnx_model
+
+    with tempfile.TemporaryDirectory(prefix="iobinding-bench-") as tmp:
+        workdir = Path(tmp)
+        model_path = write_tiny_onnx_model(workdir / "model.onnx", img_size=args.img_size)
+        data_path = write_synthetic_dataset(
+            workdir / "data",
+            image_count=args.images,
+            image_size=(args.image_width, args.image_height),
+            image_format="jpg",
+        )
+        images = [path.read_bytes() for path in sorted((data_path / "images").iterdir())]
+        paths = {"session.run": False, "iobinding": True}
+        runners = [
+            OnnxModelRunner(model_path, img_size=args.img_size, conf_threshold=0.25, io_binding=io_binding)
+            for io_binding in paths.values()
+        ]
+        for runner in runners:
+            for image in images:
+                runner.predict(image)
+        latencies = _latencies(runners, images, args.runs)
+        results = [
+            {
+                "path": label,
+                "io_binding": runner.uses_io_binding,
+                **latency,
+                **_allocations(runner.predict, images, args.alloc_runs),
+            }
+            for label, runner, latency in zip(paths, runners, latencies)
+        ]
+    return {"img_size": args.img_size, "runs": args.runs, "results": results}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.iobinding", description=__doc__)
+    parser.add_argument("--img-size", type=int, default=640)
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--image-width", type=int, default=800)
+    parser.add_argument("--image-height", type=int, default=600)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--alloc-runs", type=int, default=20)
+    parser.add_argument("--output", help="Write JSON report to this path")
+    return parser
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    text = json.dumps(run(args), indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+"""End-to-end load generator: python -m benchmarks.loadtest
+
+Drives the API in-process (ASGI transport, synthetic dataset and runner by
+default) or over HTTP with --url, using a fixed number of closed-loop
+workers and a weighted request mix. Reports throughput, latency
+percentiles and error rates per endpoint.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Sequence
+
+import httpx
+import numpy as np
+
+# Endpoint name -> URL builder taking an image id.
+ENDPOINTS: Dict[str, Callable[[str], str]] = {
+    "images": lambda image_id: "/api/v1/images",
+    "file": lambda image_id: f"/api/v1/images/{image_id}/file",
+    "annotations": lambda image_id: f"/api/v1/images/{image_id}/annotations",
+    "viewer": lambda image_id: f"/api/v1/viewer/{image_id}",
+    "tile": lambda image_id: f"/api/v1/images/{image_id}/tiles/0/0/0",
+    "analysis": lambda image_id: f"/api/v1/analysis/{image_id}",
+    "dataset": lambda image_id: "/api/v1/analysis/dataset",
+}
+DEFAULT_MIX = "viewer=3,analysis=4,annotations=2,file=1,images=1,dataset=0.1"
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """Parse 'viewer=3,analysis=4' into endpoint weights"""
+    mix: Dict[str, float] = {}
+    for item in text.split(","):
+        if not item.strip():
+            continue
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint in mix: {name} (known: {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight) if weight else 1.0
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("Request mix must contain a positive weight")
+    return mix
+
+
+@dataclass
+class Sample:
+    endpoint: str
+    status: int
+    latency_ms: float
+
+
+@dataclass
+class LoadTestReport:
+    duration_s: float
+    concurrency: int
+    samples: List[Sample] = field(default_factory=list)
+
+    def summary(self) -> Dict[str, Any]:
+        grouped: Dict[str, List[Sample]] = defaultdict(list)
+        for sample in self.samples:
+            grouped[sample.endpoint].append(sample)
+        return {
+            "duration_s": round(self.duration_s, 3),
+            "concurrency": self.concurrency,
+            "overall": _summarize(self.samples, self.duration_s),
+            "endpoints": {
+                name: _summarize(samples, self.duration_s) for name, samples in sorted(grouped.items())
+            },
+        }
+
+
+def _summarize(samples: Sequence[Sample], duration_s: float) -> Dict[str, Any]:
+    if not samples:
+        return {"requests": 0, "errors": 0, "error_rate": 0.0, "throughput_rps": 0.0}
+    latencies = np.array([sample.latency_ms for sample in samples])
+    errors = sum(1 for sample in samples if sample.status >= 400 or sample.status == 0)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4),
+        "throughput_rps": round(len(samples) / duration_s, 2) if duration_s > 0 else 0.0,
+        "latency_ms": {
+            "mean": round(float(latencies.mean()), 3),
+            "p50": round(float(p50), 3),
+            "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3),
+            "max": round(float(latencies.max()), 3),
+        },
+    }
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    *,
+    mix: Mapping[str, float],
+    concurrency: int = 8,
+    duration_s: float | None = 10.0,
+    requests: int | None = None,
+    seed: int = 0,
+) -> LoadTestReport:
+    """Closed-loop load: each worker issues the next request when the previous returns"""
+    listing = await client.get("/api/v1/images")
+    listing.raise_for_status()
+    image_ids = [item["id"] for item in listing.json()["items"]]
+    if not image_ids:
+        raise RuntimeError("Target dataset has no images")
+
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    rng = random.Random(seed)
+    samples: List[Sample] = []
+    issued = 0
+    started = time.perf_counter()
+    deadline = started + duration_s if duration_s else None
+
+    def next_request() -> tuple[str, str] | None:
+        nonlocal issued
+        if requests is not None and issued >= requests:
+            return None
+        if deadline is not None and time.perf_counter() >= deadline:
+            return None
+        issued += 1
+        name = rng.choices(names, weights)[0]
+        return name, ENDPOINTS[name](rng.choice(image_ids))
+
+    async def worker() -> None:
+        while (item := next_request()) is not None:
+            name, url = item
+            request_started = time.perf_counter()
+            try:
+                response = await client.get(url)
+                await response.aread()
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+            samples.append(Sample(name, status, (time.perf_counter() - request_started) * 1000.0))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return LoadTestReport(time.perf_counter() - started, concurrency, samples)
+
+
+def _in_process_client(args: argparse.Namespace, workdir: Path) -> httpx.AsyncClient:
+    from app.config import settings
+    from app.main import create_app
+    from app.utils.synthetic import write_synthetic_dataset
+
+    data_path = args.data_path or write_synthetic_dataset(
+        workdir / "data",
+        image_count=args.images,
+        boxes_per_image=args.boxes,
+        image_size=(args.image_width, args.image_height),
+        image_format="jpg",
+    )
+    settings.DATA_PATH = str(data_path)
+    settings.RENDITION_CACHE_PATH = str(workdir / "renditions")
+    settings.MODEL_RUNNER = args.runner
+    settings.SYNTHETIC_BOX_COUNT = args.boxes
+    settings.SYNTHETIC_LATENCY_MS = args.latency_ms
+    settings.SYNTHETIC_JITTER_MS = args.jitter_ms
+    settings.MODEL_WARMUP_RUNS = 0
+    settings.LOG_LEVEL = args.log_level
+    app = create_app()
+    if app.state.model_loader.wait(settings.MODEL_READY_TIMEOUT) is None:
+        raise RuntimeError("Model did not become ready")
+    return httpx.AsyncClient(app=app, base_url="http://loadtest", timeout=args.timeout)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadtest", description=__doc__)
+    parser.add_argument("--url", help="Target base URL; omit to run the app in-process")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds (ignored with --requests)")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Endpoint weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write JSON report to this path")
+    parser.add_argument("--log-level", default="WARNING", help="Log level for app and HTTP client logs")
+    in_process = parser.add_argument_group("in-process mode")
+    in_process.add_argument("--data-path", help="Existing dataset; default generates a synthetic one")
+    in_process.add_argument("--images", type=int, default=50)
+    in_process.add_argument("--boxes", type=int, default=30, help="Boxes per image and per prediction")
+    in_process.add_argument("--image-width", type=int, default=1024)
+    in_process.add_argument("--image-height", type=int, default=768)
+    in_process.add_argument("--runner", choices=["synthetic", "stub", "onnx"], default="synthetic")
+    in_process.add_argument("--latency-ms", type=float, default=20.0, help="Simulated inference latency")
+    in_process.add_argument("--jitter-ms", type=float, default=5.0)
+    return parser
+
+
+async def _main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    duration = None if args.requests else args.duration
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as workdir:
+        if args.url:
+            client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+        else:
+            client = _in_process_client(args, Path(workdir))
+        async with client:
+            report = await run_load(
+                client,
+                mix=mix,
+                concurrency=args.concurrency,
+                duration_s=duration,
+                requests=args.requests,
+                seed=args.seed,
+            )
+    return report.summary()
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper())
+    logging.getLogger().setLevel(args.log_level.upper())
+    summary = asyncio.run(_main_async(args))
+    text = json.dumps(summary, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 1 if summary["overall"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
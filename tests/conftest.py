@@ -2,6 +2,17 @@
 import pytest
 from fastapi.testclient import TestClient
 from app.main import create_app
+from app.utils.synthetic import write_tiny_onnx_model
+
+
+@pytest.fixture(autouse=True)
+def manifest_path(tmp_path, monkeypatch):
+    """Keep image-id manifests written by ordered scans out of the working tree"""
+    from app.config import settings
+
+    path = tmp_path / "manifests"
+    monkeypatch.setattr(settings, "IMAGE_MANIFEST_PATH", str(path))
+    return path
 
 
 @pytest.fixture
@@ -9,3 +20,46 @@ def client():
     """Create test client"""
     app = create_app()
     return TestClient(app)
+
+
+@pytest.fixture
+def tiny_onnx_model(tmp_path):
+    pytest.importorskip("onnx")
+    return write_tiny_onnx_model(tmp_path / "tiny.onnx")
+
+
+@pytest.fixture
+def tiny_onnx_model_dynamic_batch(tmp_path):
+    pytest.importorskip("onnx")
+    return write_tiny_onnx_model(tmp_path / "tiny_dynamic.onnx", batch="batch")
+
+
+@pytest.fixture
+def tiny_dataset(tmp_path):
+    """Write a few small PNG images with YOLO labels"""
+    import numpy as np
+    from PIL import Image
+
+    images_dir = tmp_path / "dataset" / "images"
+    labels_dir = tmp_path / "dataset" / "labels"
+    images_dir.mkdir(parents=True)
+    labels_dir.mkdir(parents=True)
+    rng = np.random.default_rng(1)
+    for index in range(4):
+        pixels = rng.integers(0, 255, size=(48, 64, 3), dtype=np.uint8)
+        Image.fromarray(pixels).save(images_dir / f"IMG-{index:03d}.png")
+        (labels_dir / f"IMG-{index:03d}.txt").write_text("0 0.5 0.5 0.3 0.3\n1 0.2 0.2 0.1 0.1\n")
+    return tmp_path / "dataset"
+
+
+@pytest.fixture
+def dataset_client(tiny_dataset, tmp_path, monkeypatch):
+    """Test client serving `tiny_dataset` with the stub model runner"""
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "DATA_PATH", str(tiny_dataset))
+    monkeypatch.setattr(settings, "MODELS_PATH", str(tmp_path / "no-models"))
+    monkeypatch.setattr(settings, "RENDITION_CACHE_PATH", str(tmp_path / "renditions"))
+    app = create_app()
+    app.state.model_loader.wait(5)
+    return TestClient(app)
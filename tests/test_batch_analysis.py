@@ -0,0 +1,91 @@
+"""Batch analysis endpoint and batched inference tests"""
+import numpy as np
+import pytest
+
+from app.infrastructure.model_runner import OnnxModelRunner
+from app.providers.local_fs import LocalFSAnnotationProvider, LocalFSImageProvider
+from app.services.model_worker import ModelWorker
+from app.utils.exceptions import InvalidFormatError
+
+
+def test_batch_analysis_matches_single_requests(dataset_client):
+    response = dataset_client.post(
+        "/api/v1/analysis/batch",
+        json={"image_ids": ["IMG-002", "IMG-000"], "iou_threshold": 0.3},
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["image_id"] for item in body["items"]] == ["IMG-002", "IMG-000"]
+    assert body["processed_count"] == 2
+    for item in body["items"]:
+        single = dataset_client.get(f"/api/v1/analysis/{item['image_id']}", params={"iou_threshold": 0.3})
+        assert item == single.json()
+    assert body["aggregate"]["tp"] == sum(item["stats"]["tp"] for item in body["items"])
+
+
+def test_batch_analysis_reports_missing_images_per_item(dataset_client):
+    response = dataset_client.post(
+        "/api/v1/analysis/batch",
+        json={"image_ids": ["IMG-001", "NOPE", "../etc"], "include_boxes": False},
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["image_count"] == 3
+    assert body["processed_count"] == 1
+    assert body["failed_count"] == 2
+    assert "model_boxes" not in body["items"][0]
+    assert body["items"][1]["error"]["status"] == 404
+    assert body["items"][2]["error"]["status"] in (400, 404)
+    assert body["aggregate"]["expert_count"] == 2
+
+
+def test_batch_analysis_limits(dataset_client, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "ANALYSIS_BATCH_MAX_IMAGES", 2)
+
+    assert dataset_client.post("/api/v1/analysis/batch", json={"image_ids": []}).status_code == 422
+    too_many = dataset_client.post("/api/v1/analysis/batch", json={"image_ids": ["IMG-000"] * 3})
+    assert too_many.status_code == 413
+
+
+def test_onnx_predict_batch_matches_single_predictions(tiny_onnx_model_dynamic_batch, tiny_dataset):
+    runner = OnnxModelRunner(tiny_onnx_model_dynamic_batch, conf_threshold=0.0, batch_size=3)
+    images = [path.read_bytes() for path in sorted((tiny_dataset / "images").iterdir())]
+    calls = []
+    original_run = runner._session.run
+
+    def counting_run(output_names, feeds):
+        calls.append(next(iter(feeds.values())).shape[0])
+        return original_run(output_names, feeds)
+
+    runner._session.run = counting_run
+    batched = runner.predict_batch(images)
+
+    assert calls == [3, 1]
+    for image_bytes, boxes in zip(images, batched):
+        single = runner.predict(image_bytes)
+        np.testing.assert_allclose(boxes.xywh, single.xywh, atol=1e-5)
+        np.testing.assert_array_equal(boxes.class_id, single.class_id)
+
+
+# Single predictions go through IOBinding; the dynamic model also batches.
+@pytest.mark.parametrize("model", ["tiny_onnx_model", "tiny_onnx_model_dynamic_batch"])
+def test_undecodable_image_fails_only_its_item(request, tiny_dataset, model):
+    (tiny_dataset / "images" / "IMG-001.png").write_bytes(b"not an image")
+    runner = OnnxModelRunner(request.getfixturevalue(model), conf_threshold=0.0, batch_size=4)
+    worker = ModelWorker(
+        LocalFSImageProvider(data_path=tiny_dataset),
+        LocalFSAnnotationProvider(data_path=tiny_dataset),
+        runner,
+    )
+
+    with pytest.raises(InvalidFormatError):
+        runner.predict(b"not an image")
+    result = worker.analyze_batch(["IMG-000", "IMG-001", "IMG-002", "IMG-003"], batch_size=4)
+
+    assert result["processed_count"] == 3
+    assert result["items"][1]["error"]["status"] == 400
+    assert all("error" not in item for index, item in enumerate(result["items"]) if index != 1)
@@ -0,0 +1,126 @@
+"""Headless evaluation CLI: checkpointing, resume and report output"""
+import csv
+import io
+import json
+from functools import partial
+
+import pytest
+
+from app.infrastructure.model_runner import StubModelRunner
+from app.providers.local_fs import LocalFSAnnotationProvider, LocalFSImageProvider
+from app.services.batch_evaluation import EvaluationCheckpoint, ProgressReporter, run_evaluation
+from app.services.model_worker import ModelWorker
+from app.utils.exceptions import InvalidFormatError
+
+CONFIG = {"iou_threshold": 0.3, "class_aware": True, "thresholds": [], "model_fingerprint": "stub"}
+
+
+def _worker(data_path):
+    return ModelWorker(
+        LocalFSImageProvider(data_path=data_path),
+        LocalFSAnnotationProvider(data_path=data_path),
+        StubModelRunner(),
+    )
+
+
+def test_evaluate_cli_writes_aggregate_and_report(tiny_dataset, tmp_path, monkeypatch, capsys):
+    from app.cli import main
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "MODEL_RUNNER", "stub")
+    output = tmp_path / "result.json"
+    report = tmp_path / "report.csv"
+
+    code = main(
+        [
+            "evaluate",
+            "--data-path", str(tiny_dataset),
+            "--iou-threshold", "0.3",
+            "--workers", "2",
+            "--checkpoint", str(tmp_path / "checkpoint.jsonl"),
+            "--output", str(output),
+            "--report", str(report),
+        ]
+    )
+
+    assert code == 0
+    result = json.loads(output.read_text())
+    expected = _worker(tiny_dataset).evaluate_dataset(iou_threshold=0.3)
+    for key in ("image_count", "processed_count", "class_aware", "class_agnostic", "per_class", "confusion_matrix"):
+        assert result[key] == expected[key]
+    rows = list(csv.reader(io.StringIO(report.read_text())))
+    assert [row[0] for row in rows[1:5]] == ["IMG-000", "IMG-001", "IMG-002", "IMG-003"]
+    assert "evaluate: 4/4 (100.0%)" in capsys.readouterr().err
+
+
+def test_interrupted_run_resumes_from_checkpoint(tiny_dataset, tmp_path):
+    worker = _worker(tiny_dataset)
+    image_ids = worker._image_provider.list_image_ids()
+    evaluate_item = partial(worker.evaluate_item, iou_threshold=0.3)
+    path = tmp_path / "checkpoint.jsonl"
+    calls = []
+    crash_at = [2]
+
+    def crashing(image_id):
+        if len(calls) == crash_at[0]:
+            raise KeyboardInterrupt
+        calls.append(image_id)
+        return evaluate_item(image_id)
+
+    checkpoint = EvaluationCheckpoint(path, CONFIG)
+    with pytest.raises(KeyboardInterrupt):
+        run_evaluation(crashing, image_ids, checkpoint)
+    checkpoint.close()
+    with path.open("a") as handle:
+        handle.write('{"image_id": "IMG-00')  # half-written line from the crash
+
+    resumed = EvaluationCheckpoint(path, CONFIG)
+    assert sorted(resumed.completed) == sorted(calls)
+    crash_at[0] = 3
+    with pytest.raises(KeyboardInterrupt):
+        run_evaluation(crashing, image_ids, resumed)
+    resumed.close()
+
+    # The second resume must still see every image of the first two runs.
+    resumed = EvaluationCheckpoint(path, CONFIG)
+    assert sorted(resumed.completed) == sorted(calls)
+    result = run_evaluation(evaluate_item, image_ids, resumed, progress=ProgressReporter(4, done=3, stream=io.StringIO()))
+    resumed.close()
+
+    expected = worker.evaluate_dataset(iou_threshold=0.3, include_images=True)
+    assert result["resumed_count"] == 3
+    assert result["class_aware"] == expected["class_aware"]
+    assert result["confusion_matrix"] == expected["confusion_matrix"]
+    assert result["images"] == expected["images"]
+    # Rows keep raw values, not sketch states; rebuilding them in image
+    # order gives exactly the single-run sketches.
+    assert result["distributions"] == expected["distributions"]
+    assert '"sketch"' not in path.read_text()
+
+
+def test_checkpoint_rejects_different_settings(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    EvaluationCheckpoint(path, CONFIG).close()
+
+    with pytest.raises(InvalidFormatError):
+        EvaluationCheckpoint(path, {**CONFIG, "iou_threshold": 0.5})
+    EvaluationCheckpoint(path, {**CONFIG, "iou_threshold": 0.5}, restart=True).close()
+
+
+def test_unexpected_item_error_is_recorded_not_fatal(tiny_dataset, tmp_path):
+    worker = _worker(tiny_dataset)
+    image_ids = worker._image_provider.list_image_ids()
+    evaluate_item = partial(worker.evaluate_item, iou_threshold=0.3)
+
+    def flaky(image_id):
+        if image_id == "IMG-001":
+            raise OSError("image file is truncated")
+        return evaluate_item(image_id)
+
+    checkpoint = EvaluationCheckpoint(tmp_path / "checkpoint.jsonl", CONFIG)
+    result = run_evaluation(flaky, image_ids, checkpoint, workers=2)
+    checkpoint.close()
+
+    assert result["processed_count"] == 3
+    assert [row["image_id"] for row in result["failed"]] == ["IMG-001"]
+    assert "OSError" in result["failed"][0]["error"]
@@ -0,0 +1,42 @@
+"""Benchmark harness tests (the timing gate runs with RUN_BENCHMARKS=1)"""
+import os
+
+import pytest
+
+from benchmarks.cases import BenchParams, build_cases
+from benchmarks.harness import BenchResult, compare, load_baseline, save_baseline
+
+
+def _result(name: str, best_ms: float) -> BenchResult:
+    return BenchResult(name=name, best_ms=best_ms, median_ms=best_ms, loops=1, repeat=1)
+
+
+def test_compare_flags_only_cases_beyond_tolerance(tmp_path):
+    baseline_path = tmp_path / "baseline.json"
+    save_baseline([_result("fast", 1.0), _result("slow", 1.0)], {"images": 1}, baseline_path)
+    baseline = load_baseline(baseline_path)
+
+    regressions = compare(
+        [_result("fast", 1.4), _result("slow", 2.0), _result("new", 50.0)],
+        baseline,
+        tolerance=0.5,
+    )
+
+    assert [regression.name for regression in regressions] == ["slow"]
+    assert regressions[0].ratio == pytest.approx(2.0)
+
+
+def test_build_cases_on_synthetic_dataset(tmp_path):
+    cases = build_cases(tmp_path, BenchParams(images=2, boxes=5))
+
+    assert "match_boxes.class_aware" in cases
+    result = cases["model_worker.analyze_dataset"]()
+    assert result["image_count"] == 2
+    assert result["stats"]["expert_count"] == 10
+
+
+@pytest.mark.skipif(os.environ.get("RUN_BENCHMARKS") != "1", reason="set RUN_BENCHMARKS=1 to run the timing gate")
+def test_hot_paths_within_baseline_tolerance():
+    from benchmarks.__main__ import main
+
+    assert main([]) == 0
@@ -0,0 +1,87 @@
+"""Parquet/Arrow per-box export from the service, endpoint and CLI"""
+import io
+import shutil
+import zipfile
+
+import pytest
+
+from app.infrastructure.model_runner import StubModelRunner
+from app.providers.local_fs import LocalFSAnnotationProvider, LocalFSImageProvider
+from app.services.columnar_export import write_columnar_export
+from app.services.model_worker import ModelWorker
+
+pa = pytest.importorskip("pyarrow")
+ipc = pytest.importorskip("pyarrow.ipc")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def _results(data_path, iou_threshold=0.3):
+    worker = ModelWorker(
+        LocalFSImageProvider(data_path=data_path),
+        LocalFSAnnotationProvider(data_path=data_path),
+        StubModelRunner(),
+    )
+    return [
+        worker.analyze(image_id, iou_threshold=iou_threshold)
+        for image_id in sorted(LocalFSImageProvider(data_path=data_path).list_image_ids())
+    ]
+
+
+def test_parquet_tables_hold_every_box_and_match(tiny_dataset, tmp_path):
+    results = _results(tiny_dataset)
+
+    # Tiny batches force several row groups per table.
+    paths = write_columnar_export(iter(results), tmp_path / "out", "parquet", batch_rows=3)
+
+    images = pq.read_table(paths["images"])
+    boxes = pq.read_table(paths["boxes"])
+    matches = pq.read_table(paths["matches"])
+    assert images.column("image_id").to_pylist() == [result["image_id"] for result in results]
+    assert images.column("tp").to_pylist() == [result["stats"]["tp"] for result in results]
+    expected_boxes = sum(len(result["expert_boxes"]) + len(result["model_boxes"]) for result in results)
+    assert boxes.num_rows == expected_boxes
+    assert pq.ParquetFile(paths["boxes"]).metadata.num_row_groups > 1
+    assert pq.ParquetFile(paths["boxes"]).metadata.row_group(0).column(0).compression == "ZSTD"
+    expert = boxes.filter(pa.compute.equal(boxes.column("source"), "expert"))
+    assert expert.column("score").null_count == expert.num_rows
+    assert matches.num_rows == sum(len(result["matches"]) for result in results)
+    assert matches.column("iou").to_pylist() == pytest.approx(
+        [iou for result in results for iou in result["matches"].iou.tolist()]
+    )
+
+
+def test_arrow_export_endpoint_returns_zip(dataset_client):
+    response = dataset_client.get(
+        "/api/v1/analysis/dataset/export",
+        params={"format": "arrow", "iou_threshold": 0.3},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert sorted(archive.namelist()) == ["boxes.arrow", "images.arrow", "matches.arrow"]
+    images = ipc.open_file(pa.BufferReader(archive.read("images.arrow"))).read_all()
+    assert images.num_rows == 4
+    assert dataset_client.get("/api/v1/analysis/dataset/export", params={"format": "feather"}).status_code == 400
+
+
+def test_columnar_export_of_missing_images_directory_is_404(dataset_client, tiny_dataset):
+    shutil.rmtree(tiny_dataset / "images")
+
+    for export_format in ("parquet", "arrow"):
+        response = dataset_client.get("/api/v1/analysis/dataset/export", params={"format": export_format})
+        assert response.status_code == 404
+
+
+def test_cli_export_writes_zip(tiny_dataset, tmp_path, monkeypatch):
+    from app.cli import main
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "MODEL_RUNNER", "stub")
+    output = tmp_path / "export.zip"
+
+    assert main(["export", "--data-path", str(tiny_dataset), "--output", str(output), "--shard", "0/2"]) == 0
+
+    with zipfile.ZipFile(output) as archive:
+        images = pq.read_table(io.BytesIO(archive.read("images.parquet")))
+    assert images.column("image_id").to_pylist() == ["IMG-000", "IMG-002"]
@@ -0,0 +1,103 @@
+"""Single-pass evaluation: per-class metrics, confusion matrix and export"""
+import csv
+from io import BytesIO, StringIO
+
+import numpy as np
+from openpyxl import load_workbook
+
+from app.core.boxes import BoxSet
+from app.core.evaluation import BACKGROUND, DatasetEvaluation, evaluate_image
+
+
+def _boxes(rows, scored=False):
+    class_id = [row[0] for row in rows]
+    xywh = [row[1:] for row in rows]
+    score = np.ones(len(rows)) if scored else None
+    return BoxSet(np.array(class_id), np.array(xywh).reshape(-1, 4), score)
+
+
+def test_confusion_matrix_counts_misclassifications_and_background():
+    gt = _boxes([(0, 0.1, 0.1, 0.04, 0.04), (1, 0.3, 0.3, 0.04, 0.04), (1, 0.5, 0.5, 0.04, 0.04)])
+    pred = _boxes([(0, 0.1, 0.1, 0.04, 0.04), (0, 0.3, 0.3, 0.04, 0.04), (1, 0.8, 0.8, 0.04, 0.04)], scored=True)
+
+    evaluation = DatasetEvaluation(iou_threshold=0.5)
+    image = evaluation.add(pred, gt)
+    result = evaluation.to_dict()
+
+    assert len(image.class_aware) == 1
+    assert len(image.class_agnostic) == 2
+    assert result["confusion_matrix"]["labels"] == [0, 1, BACKGROUND]
+    # Rows are expert classes, columns model classes.
+    assert result["confusion_matrix"]["matrix"] == [
+        [1, 0, 0],
+        [1, 0, 1],
+        [0, 1, 0],
+    ]
+    per_class = {row["class_id"]: row for row in result["per_class"]}
+    assert per_class[0]["tp"] == 1 and per_class[0]["fp"] == 1 and per_class[0]["fn"] == 0
+    assert per_class[1]["tp"] == 0 and per_class[1]["fp"] == 1 and per_class[1]["fn"] == 2
+    assert result["class_aware"]["tp"] == 1
+    assert result["class_agnostic"]["tp"] == 2
+
+
+def test_merge_matches_single_run():
+    rng = np.random.default_rng(7)
+    images = []
+    for _ in range(6):
+        gt = _boxes([(int(c), *xy, 0.1, 0.1) for c, xy in zip(rng.integers(0, 3, 5), rng.uniform(0, 0.5, (5, 2)))])
+        pred = _boxes(
+            [(int(c), *xy, 0.1, 0.1) for c, xy in zip(rng.integers(0, 3, 4), rng.uniform(0, 0.5, (4, 2)))],
+            scored=True,
+        )
+        images.append((pred, gt))
+
+    combined = DatasetEvaluation()
+    for pred, gt in images:
+        combined.add(pred, gt)
+    left, right = DatasetEvaluation(), DatasetEvaluation()
+    for pred, gt in images[:2]:
+        left.add(pred, gt, evaluate_image(pred, gt))
+    for pred, gt in images[2:]:
+        right.add(pred, gt)
+
+    assert left.merge(right).to_dict() == combined.to_dict()
+
+
+def test_dataset_evaluation_endpoint_matches_separate_runs(dataset_client):
+    response = dataset_client.get("/api/v1/analysis/dataset/evaluation", params={"iou_threshold": 0.3})
+
+    assert response.status_code == 200
+    body = response.json()
+    aware = dataset_client.get("/api/v1/analysis/dataset", params={"iou_threshold": 0.3}).json()["stats"]
+    agnostic = dataset_client.get(
+        "/api/v1/analysis/dataset", params={"iou_threshold": 0.3, "class_aware": False}
+    ).json()["stats"]
+    for key in ("tp", "fp", "fn", "precision", "recall", "f1"):
+        assert body["class_aware"][key] == aware[key]
+        assert body["class_agnostic"][key] == agnostic[key]
+    assert body["image_count"] == 4
+    matrix = np.array(body["confusion_matrix"]["matrix"])
+    assert matrix[:-1, :].sum() == aware["expert_count"]
+    assert matrix[:, :-1].sum() == aware["model_count"]
+
+    etag = response.headers["etag"]
+    cached = dataset_client.get(
+        "/api/v1/analysis/dataset/evaluation",
+        params={"iou_threshold": 0.3},
+        headers={"If-None-Match": etag},
+    )
+    assert cached.status_code == 304
+
+
+def test_export_with_evaluation_adds_tables(dataset_client):
+    xlsx = dataset_client.get("/api/v1/analysis/dataset/export", params={"evaluation": True})
+    assert xlsx.status_code == 200
+    workbook = load_workbook(BytesIO(xlsx.content))
+    assert workbook.sheetnames[1:] == ["Summary", "Per class", "Confusion matrix"]
+    assert workbook.worksheets[0].max_row == 5
+
+    response = dataset_client.get("/api/v1/analysis/dataset/export", params={"evaluation": True, "format": "csv"})
+    assert response.status_code == 200
+    rows = list(csv.reader(StringIO(response.text)))
+    titles = [row[0] for row in rows if row and row[0].startswith("# ")]
+    assert titles == ["# Summary", "# Per class", "# Confusion matrix"]
@@ -24,3 +24,15 @@ def test_info_endpoint(client: TestClient):
     assert "version" in data
     assert "environment" in data
     assert "debug" in data
+
+
+def test_ready_endpoint_after_warmup(client: TestClient):
+    """Test readiness endpoint reports warm-up results"""
+    client.app.state.model_loader.wait(5)
+    response = client.get("/ready")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "ready"
+    assert data["runner"]
+    assert "warmup_duration_ms" in data
+    assert "first_inference_ms" in data
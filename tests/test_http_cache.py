@@ -0,0 +1,62 @@
+"""Tests for conditional HTTP caching"""
+import os
+
+
+def _revalidate(client, url):
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"]
+    second = client.get(url, headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["etag"] == etag
+    return etag
+
+
+def test_image_file_and_rendition_revalidate(dataset_client):
+    _revalidate(dataset_client, "/api/v1/images/IMG-000/file")
+    _revalidate(dataset_client, "/api/v1/images/IMG-000/rendition?level=0&format=jpeg")
+    response = dataset_client.get("/api/v1/images/IMG-000/file")
+    assert "last-modified" in response.headers
+
+
+def test_analysis_etag_depends_on_params_and_labels(dataset_client, tiny_dataset):
+    etag = _revalidate(dataset_client, "/api/v1/analysis/IMG-001?iou_threshold=0.5")
+    other = dataset_client.get("/api/v1/analysis/IMG-001?iou_threshold=0.7")
+    assert other.headers["etag"] != etag
+
+    labels_file = tiny_dataset / "labels" / "IMG-001.txt"
+    labels_file.write_text("0 0.4 0.4 0.2 0.2\n")
+    os.utime(labels_file, (1_000_000, 1_000_000))
+    changed = dataset_client.get(
+        "/api/v1/analysis/IMG-001?iou_threshold=0.5",
+        headers={"If-None-Match": etag},
+    )
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_dataset_and_annotations_revalidate(dataset_client):
+    _revalidate(dataset_client, "/api/v1/images/IMG-002/annotations")
+    _revalidate(dataset_client, "/api/v1/viewer/IMG-002")
+    _revalidate(dataset_client, "/api/v1/analysis/dataset")
+
+
+def test_dataset_export_revalidates(dataset_client):
+    _revalidate(dataset_client, "/api/v1/analysis/dataset/export?format=csv")
+    _revalidate(dataset_client, "/api/v1/analysis/dataset/export")
+
+
+def test_dataset_version_follows_directory_changes(tmp_path):
+    from app.utils.http_cache import DirectoryVersionCache
+
+    (tmp_path / "a.txt").write_text("a")
+    versions = DirectoryVersionCache(ttl_s=60)
+    first = versions.version(tmp_path)
+    assert versions.version(tmp_path) == first
+
+    (tmp_path / "b.txt").write_text("b")
+    # Coarse filesystem clocks may leave the mtime unchanged within a tick.
+    os.utime(tmp_path, ns=(1, 1))
+    assert versions.version(tmp_path) != first
+    assert versions.version(tmp_path / "missing") == "missing"
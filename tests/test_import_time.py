@@ -0,0 +1,40 @@
+"""Cold-start import budget for the API (see benchmarks/importtime.py)"""
+import os
+
+import pytest
+
+from benchmarks.importtime import DEFAULT_BUDGET_MS, children, parse_importtime, run
+
+REPORT = """import time: self [us] | cumulative | imported package
+import time:       100 |        100 |     numpy.core
+import time:       300 |        400 |   numpy
+import time:        50 |         50 |   app.config
+import time:        20 |        470 | app.main
+"""
+
+
+def test_parse_importtime_tracks_nesting():
+    records = parse_importtime(REPORT)
+
+    assert [(record.module, record.depth) for record in records] == [
+        ("numpy.core", 2),
+        ("numpy", 1),
+        ("app.config", 1),
+        ("app.main", 0),
+    ]
+    assert [record.module for record in children(records, "app.main")] == ["app.config", "numpy"]
+
+
+def test_app_import_keeps_heavy_modules_lazy():
+    report = run("app.main", runs=1, env={"MODEL_RUNNER": "stub"})
+
+    assert report["eager_lazy_modules"] == []
+
+
+@pytest.mark.skipif(os.environ.get("RUN_BENCHMARKS") != "1", reason="set RUN_BENCHMARKS=1 to run the timing gate")
+def test_app_import_stays_within_budget():
+    budget_ms = float(os.environ.get("IMPORT_TIME_BUDGET_MS", DEFAULT_BUDGET_MS))
+
+    report = run("app.main", runs=3, env={"MODEL_RUNNER": "stub"})
+
+    assert report["best_ms"] <= budget_ms, report["top_imports"]
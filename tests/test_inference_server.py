@@ -0,0 +1,80 @@
+"""Shared inference server and shared-memory client tests"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from app.infrastructure.inference_server import InferenceServer, RemoteModelRunner
+from app.infrastructure.model_runner import OnnxModelRunner
+from app.utils.exceptions import InvalidFormatError, ModelNotFoundError
+
+AUTHKEY = b"test-secret"
+
+
+@pytest.fixture
+def inference_server(tiny_onnx_model_dynamic_batch, tmp_path):
+    runner = OnnxModelRunner(tiny_onnx_model_dynamic_batch, conf_threshold=0.0, batch_size=4)
+    server = InferenceServer(runner, str(tmp_path / "inference.sock"), AUTHKEY, max_batch=4, max_wait_ms=5)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.stop()
+
+
+def _images(tiny_dataset):
+    return [path.read_bytes() for path in sorted((tiny_dataset / "images").iterdir())]
+
+
+def test_remote_runner_matches_local_predictions(inference_server, tiny_dataset):
+    client = RemoteModelRunner(inference_server.address, AUTHKEY, slots=2, img_size=32, connect_timeout=5)
+    try:
+        assert client.fingerprint == inference_server.runner.fingerprint
+        for image_bytes in _images(tiny_dataset):
+            remote = client.predict(image_bytes)
+            local = inference_server.runner.predict(image_bytes)
+            np.testing.assert_allclose(remote.xywh, local.xywh, atol=1e-6)
+            np.testing.assert_array_equal(remote.class_id, local.class_id)
+        with pytest.raises(InvalidFormatError):
+            client.predict(b"not an image")
+    finally:
+        client.close()
+
+
+def test_concurrent_clients_share_one_session(inference_server, tiny_dataset):
+    clients = [
+        RemoteModelRunner(inference_server.address, AUTHKEY, slots=2, img_size=32, connect_timeout=5)
+        for _ in range(2)
+    ]
+    images = _images(tiny_dataset) * 4
+    expected = [len(inference_server.runner.predict(image_bytes)) for image_bytes in images]
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            counts = list(
+                pool.map(lambda item: len(clients[item[0] % 2].predict(item[1])), enumerate(images))
+            )
+        assert counts == expected
+    finally:
+        for client in clients:
+            client.close()
+
+
+def test_close_stops_receiver_and_releases_shared_memory(inference_server, tiny_dataset):
+    client = RemoteModelRunner(inference_server.address, AUTHKEY, slots=2, img_size=32, connect_timeout=5)
+    client.predict(_images(tiny_dataset)[0])
+    shm_name = client._shm.name
+
+    client.close()
+    client.close()
+
+    assert not client._receiver.is_alive()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=shm_name)
+    with pytest.raises(InvalidFormatError):
+        client.predict(_images(tiny_dataset)[0])
+
+
+def test_remote_runner_fails_fast_without_server(tmp_path):
+    with pytest.raises(ModelNotFoundError):
+        RemoteModelRunner(str(tmp_path / "missing.sock"), AUTHKEY, connect_timeout=0.3)
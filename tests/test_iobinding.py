@@ -0,0 +1,93 @@
+"""IOBinding single-image inference with preallocated buffers"""
+import threading
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from app.infrastructure.model_runner import OnnxModelRunner
+
+
+def _images(count: int = 3) -> list:
+    rng = np.random.default_rng(0)
+    images = []
+    for _ in range(count):
+        output = BytesIO()
+        Image.fromarray(rng.integers(0, 255, size=(48, 40, 3), dtype=np.uint8)).save(output, format="PNG")
+        images.append(output.getvalue())
+    return images
+
+
+def _runner(model_path, io_binding: bool) -> OnnxModelRunner:
+    return OnnxModelRunner(model_path, img_size=32, conf_threshold=0.05, io_binding=io_binding)
+
+
+def _same(left, right) -> bool:
+    return (
+        np.allclose(left.xywh, right.xywh, atol=1e-6)
+        and np.array_equal(left.class_id, right.class_id)
+        and np.allclose(left.score, right.score, atol=1e-6)
+    )
+
+
+def test_bound_predictions_match_session_run(tiny_onnx_model, tiny_onnx_model_dynamic_batch):
+    images = _images()
+    for model_path in (tiny_onnx_model, tiny_onnx_model_dynamic_batch):
+        bound = _runner(model_path, io_binding=True)
+        plain = _runner(model_path, io_binding=False)
+        assert bound.uses_io_binding and not plain.uses_io_binding
+
+        results = [bound.predict(image) for image in images]
+
+        assert len(results[0]) > 0
+        for image, result in zip(images, results):
+            # Later calls reuse the buffers; earlier results must be unaffected.
+            assert _same(result, plain.predict(image))
+
+
+def test_dynamic_output_shape_falls_back_to_session_run(tiny_onnx_model, tmp_path):
+    import onnx
+    from onnx import numpy_helper
+
+    # Symbolic input size makes the candidate count depend on the input.
+    model = onnx.load(str(tiny_onnx_model))
+    for axis, name in ((2, "height"), (3, "width")):
+        model.graph.input[0].type.tensor_type.shape.dim[axis].dim_param = name
+    model.graph.output[0].type.tensor_type.shape.dim[2].dim_param = "candidates"
+    for index, initializer in enumerate(model.graph.initializer):
+        if initializer.name == "out_shape":
+            model.graph.initializer[index].CopyFrom(
+                numpy_helper.from_array(np.array([0, 6, -1], dtype=np.int64), name="out_shape")
+            )
+    dynamic_path = tmp_path / "dynamic_output.onnx"
+    onnx.save(model, str(dynamic_path))
+
+    runner = _runner(dynamic_path, io_binding=True)
+
+    assert not runner.uses_io_binding
+    image = _images(1)[0]
+    assert _same(runner.predict(image), _runner(tiny_onnx_model, io_binding=False).predict(image))
+
+
+def test_each_thread_binds_its_own_buffers(tiny_onnx_model):
+    runner = _runner(tiny_onnx_model, io_binding=True)
+    plain = _runner(tiny_onnx_model, io_binding=False)
+    images = _images(4)
+    expected = [plain.predict(image) for image in images]
+    buffers = {}
+    mismatches = []
+
+    def work(index: int) -> None:
+        for _ in range(20):
+            if not _same(runner.predict(images[index]), expected[index]):
+                mismatches.append(index)
+        buffers[index] = runner._bound_buffers()
+
+    threads = [threading.Thread(target=work, args=(index,)) for index in range(len(images))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert mismatches == []
+    assert len({id(buffer) for buffer in buffers.values()}) == len(images)
@@ -0,0 +1,63 @@
+"""Load generator and synthetic runner tests"""
+import asyncio
+
+import httpx
+import pytest
+
+from app.infrastructure.model_runner import SyntheticModelRunner
+from benchmarks.loadtest import parse_mix, run_load
+
+
+def test_synthetic_runner_is_deterministic_per_image():
+    runner = SyntheticModelRunner(box_count=7, num_classes=2)
+
+    first = runner.predict(b"image-a")
+
+    assert len(first) == 7
+    assert first.score is not None
+    assert set(first.class_id.tolist()) <= {0, 1}
+    assert runner.predict(b"image-a") == first
+    assert runner.predict(b"image-b") != first
+
+
+def test_synthetic_runner_simulates_latency():
+    runner = SyntheticModelRunner(box_count=1, latency_ms=20)
+
+    latencies = runner.warmup(2)
+
+    assert len(latencies) == 2
+    # Seconds, like every runner's warmup.
+    assert 0.015 <= min(latencies) <= max(latencies) < 1.0
+
+
+def test_parse_mix_rejects_unknown_endpoint():
+    assert parse_mix("viewer=3,analysis") == {"viewer": 3.0, "analysis": 1.0}
+    with pytest.raises(ValueError):
+        parse_mix("viewer=1,unknown=2")
+
+
+def test_run_load_reports_latency_and_errors(dataset_client, monkeypatch):
+    from app.config import settings
+    from app.main import create_app
+
+    monkeypatch.setattr(settings, "MODEL_RUNNER", "synthetic")
+    monkeypatch.setattr(settings, "MODEL_WARMUP_RUNS", 0)
+    app = create_app()
+    app.state.model_loader.wait(5)
+
+    async def scenario():
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            return await run_load(
+                client,
+                mix={"viewer": 1, "analysis": 1, "annotations": 1},
+                concurrency=3,
+                duration_s=None,
+                requests=12,
+            )
+
+    summary = asyncio.run(scenario()).summary()
+
+    assert summary["overall"]["requests"] == 12
+    assert summary["overall"]["errors"] == 0
+    assert set(summary["overall"]["latency_ms"]) == {"mean", "p50", "p95", "p99", "max"}
+    assert set(summary["endpoints"]) <= {"viewer", "analysis", "annotations"}
@@ -0,0 +1,80 @@
+"""Tests for BoxSet IoU and matching"""
+import numpy as np
+import pytest
+
+from app.core.boxes import BoxSet
+from app.core.iou import compute_iou, compute_iou_matrix
+from app.core.matcher import match_boxes
+
+
+def _random_boxes(rng, count, scored):
+    rows = []
+    for _ in range(count):
+        box = {
+            "class_id": int(rng.integers(0, 3)),
+            "x_center": float(rng.uniform(0, 1)),
+            "y_center": float(rng.uniform(0, 1)),
+            "width": float(rng.uniform(0.0, 0.3)),
+            "height": float(rng.uniform(0.0, 0.3)),
+        }
+        if scored:
+            box["score"] = float(rng.uniform(0, 1))
+        rows.append(box)
+    return BoxSet.from_dicts(rows)
+
+
+def _reference_match(pred, gt, iou_threshold, class_aware):
+    pred_rows, gt_rows = pred.to_dicts(), gt.to_dicts()
+    candidates = []
+    for pred_idx, pred_box in enumerate(pred_rows):
+        for gt_idx, gt_box in enumerate(gt_rows):
+            if class_aware and pred_box["class_id"] != gt_box["class_id"]:
+                continue
+            iou = compute_iou(pred_box, gt_box)
+            if iou >= iou_threshold:
+                candidates.append((iou, pred_idx, gt_idx))
+    candidates.sort(key=lambda item: item[0], reverse=True)
+    used_pred, used_gt, pairs = set(), set(), []
+    for _, pred_idx, gt_idx in candidates:
+        if pred_idx in used_pred or gt_idx in used_gt:
+            continue
+        used_pred.add(pred_idx)
+        used_gt.add(gt_idx)
+        pairs.append((pred_idx, gt_idx))
+    return pairs
+
+
+def test_iou_matrix_matches_scalar_iou():
+    rng = np.random.default_rng(0)
+    pred = _random_boxes(rng, 20, scored=True)
+    gt = _random_boxes(rng, 15, scored=False)
+    matrix = compute_iou_matrix(pred, gt)
+    for pred_idx, pred_box in enumerate(pred.to_dicts()):
+        for gt_idx, gt_box in enumerate(gt.to_dicts()):
+            assert matrix[pred_idx, gt_idx] == pytest.approx(compute_iou(pred_box, gt_box), abs=1e-6)
+
+
+@pytest.mark.parametrize("class_aware", [True, False])
+def test_match_boxes_agrees_with_reference(class_aware):
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        pred = _random_boxes(rng, 30, scored=True)
+        gt = _random_boxes(rng, 25, scored=False)
+        result = match_boxes(pred, gt, iou_threshold=0.1, class_aware=class_aware)
+        pairs = list(zip(result.pred_index.tolist(), result.gt_index.tolist()))
+        assert pairs == _reference_match(pred, gt, 0.1, class_aware)
+        assert len(result) + len(result.unmatched_pred) == len(pred)
+        assert len(result) + len(result.unmatched_gt) == len(gt)
+
+
+def test_boxset_round_trip_and_dtypes():
+    boxes = BoxSet.from_dicts(
+        [{"class_id": 2, "x_center": 0.1, "y_center": 0.2, "width": 0.3, "height": 0.4, "score": 0.5}]
+    )
+    assert boxes.class_id.dtype == np.int16
+    assert boxes.xywh.dtype == np.float32
+    assert boxes.to_dicts() == [
+        {"class_id": 2, "x_center": 0.1, "y_center": 0.2, "width": 0.3, "height": 0.4, "score": 0.5}
+    ]
+    assert boxes.to_columns()["score"] == [0.5]
+    assert len(BoxSet.concat([boxes, boxes])) == 2
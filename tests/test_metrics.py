@@ -0,0 +1,68 @@
+"""Prometheus metrics endpoint tests"""
+from prometheus_client.parser import text_string_to_metric_families
+
+
+def _samples(text):
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(text)
+        for sample in family.samples
+    }
+
+
+def test_metrics_expose_routes_stages_boxes_and_queues(dataset_client):
+    assert dataset_client.get("/api/v1/analysis/IMG-000").status_code == 200
+    assert dataset_client.get("/api/v1/images/IMG-001/annotations").status_code == 200
+
+    response = dataset_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    samples = _samples(response.text)
+    route_count = samples[
+        ("http_requests_total", (("method", "GET"), ("route", "/api/v1/analysis/{image_id}"), ("status", "200")))
+    ]
+    assert route_count >= 1
+    for stage in ("read_image", "read_annotations", "predict", "matching", "stats"):
+        assert samples[("model_stage_duration_seconds_count", (("stage", stage),))] >= 1
+    assert samples[("boxes_per_image_count", (("source", "expert"),))] >= 1
+    assert ("queue_depth", (("queue", "inference"),)) in samples
+    assert samples[("cache_requests_total", (("cache", "file_digest"), ("result", "miss")))] >= 1
+
+
+def test_onnx_runner_records_inner_stages(tiny_onnx_model, tiny_dataset):
+    from prometheus_client import REGISTRY
+
+    from app.infrastructure.model_runner import OnnxModelRunner
+
+    def stage_count(stage):
+        return REGISTRY.get_sample_value("model_stage_duration_seconds_count", {"stage": stage}) or 0
+
+    before = {stage: stage_count(stage) for stage in ("decode", "preprocess", "inference", "postprocess")}
+    runner = OnnxModelRunner(tiny_onnx_model)
+    runner.predict((tiny_dataset / "images" / "IMG-000.png").read_bytes())
+
+    for stage, count in before.items():
+        assert stage_count(stage) == count + 1
+
+
+def test_tiled_inference_records_each_stage_once(tiny_onnx_model_dynamic_batch):
+    from io import BytesIO
+
+    import numpy as np
+    from PIL import Image
+    from prometheus_client import REGISTRY
+
+    from app.infrastructure.model_runner import OnnxModelRunner
+
+    def stage_count(stage):
+        return REGISTRY.get_sample_value("model_stage_duration_seconds_count", {"stage": stage}) or 0
+
+    output = BytesIO()
+    Image.fromarray(np.zeros((100, 140, 3), dtype=np.uint8)).save(output, format="TIFF")
+    runner = OnnxModelRunner(tiny_onnx_model_dynamic_batch, img_size=32, conf_threshold=0.0, tile_size=48)
+    before = {stage: stage_count(stage) for stage in ("decode", "preprocess", "inference", "postprocess")}
+    runner.predict(output.getvalue())
+
+    for stage, count in before.items():
+        assert stage_count(stage) == count + 1
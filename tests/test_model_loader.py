@@ -0,0 +1,204 @@
+"""Tests for background model loader"""
+import shutil
+import threading
+from pathlib import Path
+
+from app.infrastructure.model_runner import StubModelRunner
+from app.services.model_loader import ModelFileWatcher, ModelLoader
+
+
+class _WarmRunner(StubModelRunner):
+    def __init__(self) -> None:
+        super().__init__()
+        self.warmup_calls = 0
+
+    def warmup(self, runs: int = 1):
+        self.warmup_calls += runs
+        return [0.004] * runs
+
+
+def test_model_loader_not_ready_until_factory_returns():
+    release = threading.Event()
+    runner = _WarmRunner()
+
+    def factory():
+        release.wait(5)
+        return runner
+
+    loader = ModelLoader(factory, warmup_runs=2)
+    loader.start()
+    assert loader.ready is False
+    assert loader.status()["ready"] is False
+
+    release.set()
+    assert loader.wait(5) is runner
+    status = loader.status()
+    assert status["ready"] is True
+    assert status["state"] == "ready"
+    assert status["first_inference_ms"] == 4.0
+    assert runner.warmup_calls == 2
+
+
+def test_model_loader_reports_failure():
+    def factory():
+        raise RuntimeError("broken model")
+
+    loader = ModelLoader(factory)
+    assert loader.load() is None
+    status = loader.status()
+    assert status["ready"] is False
+    assert status["state"] == "failed"
+    assert "broken model" in status["error"]
+
+
+class _TaggedRunner(_WarmRunner):
+    def __init__(self, tag: str) -> None:
+        super().__init__()
+        self.tag = tag
+        self.closed = False
+
+    def close(self) -> None:
+        self.closed = True
+
+    @property
+    def fingerprint(self) -> str:
+        return f"tagged-{self.tag}"
+
+
+def test_reload_swaps_after_warmup_and_keeps_serving_meanwhile():
+    old = _TaggedRunner("old")
+    loader = ModelLoader(lambda: old)
+    loader.load()
+    release = threading.Event()
+    new = _TaggedRunner("new")
+
+    def factory():
+        release.wait(5)
+        return new
+
+    assert loader.reload(factory) is True
+    assert loader.reload(factory) is False
+    # The old runner serves until the replacement is warm.
+    assert loader.wait(0) is old
+    assert loader.status()["reload_state"] == "loading"
+
+    release.set()
+    assert loader.wait_reload(5)
+    status = loader.status()
+    assert loader.runner is new and new.warmup_calls == 3
+    assert old.closed and not new.closed
+    assert status["fingerprint"] == "tagged-new"
+    assert status["generation"] == 2
+    assert status["reload_state"] == "ready"
+    # Later reloads without a factory rebuild what is serving.
+    assert loader.reload() is True and loader.wait_reload(5)
+    assert loader.runner is new and loader.status()["generation"] == 3
+
+
+class _Request:
+    def __init__(self, runner) -> None:
+        self.runner = runner
+
+
+def test_replaced_runner_closes_after_in_flight_requests():
+    old = _TaggedRunner("old")
+    loader = ModelLoader(lambda: old)
+    loader.load()
+    first = loader.acquire(_Request)
+    second = loader.acquire(_Request)
+    new = _TaggedRunner("new")
+
+    assert loader.reload(lambda: new) and loader.wait_reload(5)
+    assert first.runner is old and loader.acquire(_Request).runner is new
+    assert not old.closed
+    del first
+    assert not old.closed
+    del second
+    assert old.closed and not new.closed
+
+
+def test_failed_reload_keeps_current_runner():
+    old = _TaggedRunner("old")
+    loader = ModelLoader(lambda: old)
+    loader.load()
+
+    def factory():
+        raise RuntimeError("truncated model")
+
+    assert loader.reload(factory) and loader.wait_reload(5)
+
+    status = loader.status()
+    assert loader.runner is old
+    assert status["ready"] is True and status["generation"] == 1
+    assert status["reload_state"] == "failed"
+    assert "truncated model" in status["reload_error"]
+
+
+def test_watcher_fires_once_change_settles(tmp_path):
+    model = tmp_path / "model.onnx"
+    other = tmp_path / "other.onnx"
+    model.write_bytes(b"v1")
+    other.write_bytes(b"other")
+    watched = [model]
+    changes = []
+    watcher = ModelFileWatcher(lambda: watched[0], lambda: changes.append(1) or True)
+
+    assert watcher.poll() is False
+    model.write_bytes(b"v2-longer")
+    assert watcher.poll() is False
+    assert watcher.poll() is True
+    assert watcher.poll() is False
+    assert changes == [1]
+
+    # Switching files re-baselines instead of firing.
+    watched[0] = other
+    assert watcher.poll() is False
+    assert watcher.poll() is False
+    assert changes == [1]
+
+
+def test_reload_endpoint_switches_model_and_fingerprint(dataset_client, tiny_onnx_model, monkeypatch):
+    from app.config import settings
+
+    models_path = Path(settings.MODELS_PATH)
+    models_path.mkdir(parents=True)
+    shutil.copy(tiny_onnx_model, models_path / "tiny.onnx")
+    loader = dataset_client.app.state.model_loader
+    before = dataset_client.get("/api/v1/analysis/IMG-001")
+    url = "/api/v1/admin/model/reload"
+
+    assert dataset_client.post(url, json={"model_file": "tiny.onnx"}).status_code == 403
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "admin-secret")
+    headers = {"X-Admin-Token": "admin-secret"}
+    assert dataset_client.post(url, json={"model_file": "tiny.onnx"}).status_code == 401
+    assert dataset_client.post(url, json={"model_file": "../tiny.onnx"}, headers=headers).status_code == 400
+    assert dataset_client.post(url, json={"model_file": "missing.onnx"}, headers=headers).status_code == 404
+
+    response = dataset_client.post(url, json={"model_file": "tiny.onnx"}, headers=headers)
+    assert response.status_code == 202
+    assert loader.wait_reload(10)
+
+    ready = dataset_client.get("/ready").json()
+    after = dataset_client.get("/api/v1/analysis/IMG-001", headers={"If-None-Match": before.headers["etag"]})
+    assert ready["reload_state"] == "ready" and ready["runner"] == "OnnxModelRunner"
+    assert before.headers["x-model-fingerprint"].startswith("stub-")
+    # Cached results of the previous model no longer validate.
+    assert after.status_code == 200
+    assert after.headers["x-model-fingerprint"] == ready["fingerprint"]
+    assert after.headers["etag"] != before.headers["etag"]
+
+
+def test_reload_endpoint_rejects_model_switch_in_server_mode(dataset_client, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "admin-secret")
+    monkeypatch.setattr(settings, "INFERENCE_MODE", "server")
+    monkeypatch.setattr(settings, "MODEL_RUNNER", "onnx")
+    generation = dataset_client.get("/ready").json()["generation"]
+
+    response = dataset_client.post(
+        "/api/v1/admin/model/reload", json={"model_file": "tiny.onnx"}, headers={"X-Admin-Token": "admin-secret"}
+    )
+
+    assert response.status_code == 409
+    assert dataset_client.get("/ready").json()["generation"] == generation
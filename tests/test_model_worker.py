@@ -52,4 +52,4 @@ def test_model_worker_allows_missing_annotations(tmp_path):
     result = worker.analyze("IMG-404", allow_missing_annotations=True)
 
     assert result["image_id"] == "IMG-404"
-    assert result["expert_boxes"] == []
+    assert len(result["expert_boxes"]) == 0
@@ -0,0 +1,90 @@
+"""Per-request profiling and slow-request log tests"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import create_app
+from app.utils.profiling import StageTimings
+
+
+@pytest.fixture
+def profiling_client(tiny_dataset, tmp_path, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "DATA_PATH", str(tiny_dataset))
+    monkeypatch.setattr(settings, "MODELS_PATH", str(tmp_path / "no-models"))
+    monkeypatch.setattr(settings, "RENDITION_CACHE_PATH", str(tmp_path / "renditions"))
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(settings, "PROFILE_DUMP_PATH", str(tmp_path / "profiles"))
+    monkeypatch.setattr(settings, "SLOW_REQUEST_THRESHOLD_MS", 0.001)
+    app = create_app()
+    app.state.model_loader.wait(5)
+    return TestClient(app)
+
+
+def test_profile_rejected_when_disabled(dataset_client):
+    response = dataset_client.get("/api/v1/analysis/IMG-000", params={"profile": "true"})
+
+    assert response.status_code == 403
+
+
+def test_profile_returns_stage_timings(profiling_client):
+    response = profiling_client.get("/api/v1/analysis/IMG-000", params={"profile": "true"})
+
+    assert response.status_code == 200
+    timings = response.json()["timings"]
+    assert {"read_image", "read_annotations", "predict", "matching", "stats"} <= set(timings["stages"])
+    assert timings["total_ms"] >= timings["stages"]["predict"]["ms"]
+    assert "cprofile" not in response.json()
+    assert response.headers["cache-control"] == "no-store"
+    assert "matching;dur=" in response.headers["server-timing"]
+
+
+def test_profile_dump_attaches_cprofile_report(profiling_client, tmp_path):
+    response = profiling_client.get("/api/v1/analysis/dataset", params={"profile_dump": "true"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["timings"]["stages"]["predict"]["count"] == 4
+    assert "analyze_dataset" in body["cprofile"]["stats"]
+    assert (tmp_path / "profiles" / body["cprofile"]["dump_file"]).is_file()
+
+
+def test_profile_sample_rate_skips_cprofile(profiling_client, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "PROFILE_SAMPLE_RATE", 0.0)
+    body = profiling_client.get("/api/v1/analysis/IMG-000", params={"profile_dump": "true"}).json()
+
+    assert "predict" in body["timings"]["stages"]
+    assert "cprofile" not in body
+
+
+def test_stage_timings_from_many_threads():
+    timings = StageTimings()
+
+    with ThreadPoolExecutor(8) as pool:
+        for _ in range(8):
+            pool.submit(lambda: [timings.add("read", 0.001) for _ in range(5000)])
+
+    assert timings.to_dict()["stages"]["read"]["count"] == 40000
+
+
+def test_profiled_export_sets_server_timing(profiling_client):
+    response = profiling_client.get(
+        "/api/v1/analysis/dataset/export",
+        params={"format": "csv", "profile": "true"},
+    )
+
+    assert response.status_code == 200
+    assert "predict;dur=" in response.headers["server-timing"]
+
+
+def test_slow_requests_are_logged_with_stage_breakdown(profiling_client, caplog):
+    with caplog.at_level(logging.WARNING, logger="app.slow_requests"):
+        profiling_client.get("/api/v1/analysis/IMG-001")
+
+    messages = [record.getMessage() for record in caplog.records if record.name == "app.slow_requests"]
+    assert any("/api/v1/analysis/IMG-001" in message and "'matching'" in message for message in messages)
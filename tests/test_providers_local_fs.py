@@ -1,7 +1,11 @@
 """Tests for local filesystem providers"""
+import os
+import time
+
 import pytest
 
 from app.providers.local_fs import LocalFSAnnotationProvider, LocalFSImageProvider
+from app.providers.manifest import ImageIdManifest
 from app.utils.exceptions import AnnotationNotFoundError, ImageNotFoundError, InvalidFormatError
 
 
@@ -35,6 +39,61 @@ def test_local_fs_image_provider_lists_images(tmp_path):
     assert provider.list_image_ids() == ["IMG-001", "IMG-002"]
 
 
+def test_iter_image_ids_streams_unique_files(tmp_path):
+    images_dir = tmp_path / "images"
+    images_dir.mkdir()
+    (images_dir / "IMG-002.jpg").write_bytes(b"image-2")
+    (images_dir / "IMG-001.png").write_bytes(b"image-1")
+    (images_dir / "IMG-001.bmp").write_bytes(b"dup")
+    (images_dir / "nested.d").mkdir()
+
+    provider = LocalFSImageProvider(data_path=tmp_path, manifest_path=tmp_path / "manifests")
+
+    assert sorted(provider.iter_image_ids()) == ["IMG-001", "IMG-002"]
+    assert list(provider.iter_image_ids(ordered=True)) == ["IMG-001", "IMG-002"]
+    missing = LocalFSImageProvider(data_path=tmp_path / "missing", manifest_path=tmp_path / "manifests")
+    with pytest.raises(ImageNotFoundError):
+        next(missing.iter_image_ids())
+    with pytest.raises(ImageNotFoundError):
+        next(missing.iter_image_ids(ordered=True))
+
+
+def test_ordered_ids_come_from_manifest_until_directory_changes(tmp_path, monkeypatch):
+    images_dir = tmp_path / "images"
+    images_dir.mkdir()
+    for name in ("c.png", "a.png", "b.jpg"):
+        (images_dir / name).write_bytes(b"x")
+    # Listings changed within the last clock ticks are never trusted.
+    past = time.time() - 60
+    os.utime(images_dir, (past, past))
+    provider = LocalFSImageProvider(data_path=tmp_path, manifest_path=tmp_path / "manifests")
+    assert list(provider.iter_image_ids(ordered=True)) == ["a", "b", "c"]
+    scan = provider._scan_image_ids
+
+    def no_scan():
+        raise AssertionError("directory rescanned")
+
+    monkeypatch.setattr(provider, "_scan_image_ids", no_scan)
+    assert list(provider.iter_image_ids(ordered=True)) == ["a", "b", "c"]
+
+    monkeypatch.setattr(provider, "_scan_image_ids", scan)
+    (images_dir / "b.jpg").unlink()
+    (images_dir / "d.png").write_bytes(b"x")
+    assert list(provider.iter_image_ids(ordered=True)) == ["a", "c", "d"]
+
+
+def test_manifest_merges_sorted_runs(tmp_path):
+    ids = [f"IMG-{index:04d}" for index in range(50)]
+    scrambled = ids[::-1][:25] + ids[::-1] + ids[::3]
+    directory = tmp_path / "images"
+    directory.mkdir()
+
+    manifest = ImageIdManifest(tmp_path / "ids.manifest", run_size=7)
+
+    assert list(manifest.iter_ids(directory, lambda: iter(scrambled))) == ids
+    assert not [path for path in tmp_path.iterdir() if path.name.startswith("manifest-")]
+
+
 def test_local_fs_annotation_provider_reads_boxes(tmp_path):
     labels_dir = tmp_path / "labels"
     labels_dir.mkdir()
@@ -44,7 +103,9 @@ def test_local_fs_annotation_provider_reads_boxes(tmp_path):
     provider = LocalFSAnnotationProvider(data_path=tmp_path)
     boxes = provider.get_annotations("IMG-123")
 
-    assert boxes == [
+    assert len(boxes) == 2
+    assert boxes.score is None
+    assert boxes.to_dicts() == [
         {
             "class_id": 0,
             "x_center": 0.5,
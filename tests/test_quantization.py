@@ -0,0 +1,47 @@
+"""Tests for INT8 quantization tooling"""
+from app.core.boxes import BoxSet
+from app.infrastructure.model_runner import OnnxModelRunner
+from app.providers.local_fs import LocalFSAnnotationProvider, LocalFSImageProvider
+from app.services.quantization import build_quantization_report, quantize_model
+
+
+def test_quantize_dynamic_produces_servable_model(tiny_onnx_model, tiny_dataset, tmp_path):
+    int8_path = quantize_model(tiny_onnx_model, tmp_path / "tiny.int8.onnx", mode="dynamic")
+
+    runner = OnnxModelRunner(int8_path, img_size=32, conf_threshold=0.0)
+    image_bytes = LocalFSImageProvider(data_path=tiny_dataset).get_image("IMG-000")
+    assert isinstance(runner.predict(image_bytes), BoxSet)
+
+
+def test_quantize_static_with_provider_calibration(tiny_onnx_model, tiny_dataset, tmp_path):
+    image_provider = LocalFSImageProvider(data_path=tiny_dataset)
+    int8_path = quantize_model(
+        tiny_onnx_model,
+        tmp_path / "tiny.static.onnx",
+        mode="static",
+        image_provider=image_provider,
+        calibration_size=2,
+        img_size=32,
+    )
+    assert int8_path.is_file()
+
+
+def test_quantization_report_compares_fp32_and_int8(tiny_onnx_model, tiny_dataset, tmp_path):
+    int8_path = quantize_model(tiny_onnx_model, tmp_path / "tiny.int8.onnx")
+    image_provider = LocalFSImageProvider(data_path=tiny_dataset)
+    annotation_provider = LocalFSAnnotationProvider(data_path=tiny_dataset)
+
+    report = build_quantization_report(
+        OnnxModelRunner(tiny_onnx_model, img_size=32),
+        OnnxModelRunner(int8_path, img_size=32),
+        image_provider,
+        annotation_provider,
+        latency_sample_size=2,
+    )
+
+    assert report["latency_sample_size"] == 2
+    for variant in ("fp32", "int8"):
+        assert report[variant]["latency"]["mean_ms"] > 0
+        assert "f1" in report[variant]["stats"]
+    assert "f1" in report["delta"]
+    assert "speedup" in report["delta"]
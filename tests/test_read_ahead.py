@@ -0,0 +1,128 @@
+"""Read-ahead of dataset items and async provider reads"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.infrastructure.model_runner import StubModelRunner
+from app.providers.local_fs import LocalFSAnnotationProvider, LocalFSImageProvider
+from app.services.model_worker import ModelWorker
+from app.services.read_ahead import ReadAhead
+from app.utils.exceptions import AnnotationNotFoundError, ImageNotFoundError
+
+IDS = [f"IMG-{index:03d}" for index in range(12)]
+
+
+class _Reads:
+    """Slow reads that track how many items are read but not yet consumed"""
+
+    def __init__(self, size: int = 100, delay: float = 0.01) -> None:
+        self.size = size
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.started = 0
+        self.consumed = 0
+        self.max_ahead = 0
+
+    def __call__(self, image_id: str) -> tuple:
+        with self.lock:
+            self.started += 1
+            self.max_ahead = max(self.max_ahead, self.started - self.consumed)
+        time.sleep(self.delay)
+        if image_id == "IMG-005":
+            raise ImageNotFoundError("gone")
+        return (b"x" * self.size, image_id)
+
+
+def test_reads_overlap_but_results_keep_input_order():
+    reads = _Reads(delay=0.02)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        started = time.perf_counter()
+        results = []
+        for image_id, result in ReadAhead(IDS, reads, pool, max_in_flight=4):
+            reads.consumed += 1
+            results.append((image_id, result))
+        elapsed = time.perf_counter() - started
+
+    assert [image_id for image_id, _ in results] == IDS
+    assert isinstance(results[5][1], ImageNotFoundError)
+    assert results[6][1][1] == "IMG-006"
+    assert reads.max_ahead <= 4
+    assert elapsed < len(IDS) * reads.delay * 0.6
+
+
+def test_byte_budget_limits_buffered_reads():
+    reads = _Reads(size=100, delay=0.001)
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        for _ in ReadAhead(IDS, reads, pool, max_in_flight=10, max_bytes=250):
+            time.sleep(0.005)
+            reads.consumed += 1
+
+    # Two buffered 100-byte items are under budget, a third reaches it; the
+    # item being consumed counts as well.
+    assert reads.max_ahead <= 4
+    assert reads.started == len(IDS)
+
+
+def test_breaking_out_cancels_queued_reads():
+    reads = _Reads(delay=0.01)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        for _ in ReadAhead(IDS, reads, pool, max_in_flight=6):
+            break
+
+    assert reads.started <= 2
+
+
+def test_worker_read_ahead_matches_sequential_reads(tiny_dataset):
+    def worker(read_ahead: int) -> ModelWorker:
+        return ModelWorker(
+            LocalFSImageProvider(data_path=tiny_dataset),
+            LocalFSAnnotationProvider(data_path=tiny_dataset),
+            StubModelRunner(),
+            read_ahead=read_ahead,
+        )
+
+    sequential, ahead = worker(0), worker(3)
+
+    assert ahead.analyze_dataset(iou_threshold=0.3) == sequential.analyze_dataset(iou_threshold=0.3)
+    assert ahead.evaluate_dataset(include_images=True) == sequential.evaluate_dataset(include_images=True)
+    assert [result["image_id"] for result in ahead.iter_analyze(IDS[:4])] == IDS[:4]
+
+    (tiny_dataset / "labels" / "IMG-002.txt").unlink()
+    with pytest.raises(AnnotationNotFoundError):
+        ahead.analyze_dataset()
+
+
+def test_single_item_reads_without_a_pool(tiny_dataset, monkeypatch):
+    from app.services import model_worker
+
+    worker = ModelWorker(
+        LocalFSImageProvider(data_path=tiny_dataset),
+        LocalFSAnnotationProvider(data_path=tiny_dataset),
+        StubModelRunner(),
+        read_ahead=3,
+    )
+    monkeypatch.setattr(model_worker, "ThreadPoolExecutor", None)
+
+    assert worker.evaluate_item("IMG-001")["image_id"] == "IMG-001"
+
+
+def test_async_provider_reads(tiny_dataset):
+    images = LocalFSImageProvider(data_path=tiny_dataset)
+    labels = LocalFSAnnotationProvider(data_path=tiny_dataset)
+
+    async def scenario():
+        return await asyncio.gather(
+            images.get_image_async("IMG-001"),
+            labels.get_annotations_async("IMG-001"),
+            images.get_image_async("MISSING"),
+            return_exceptions=True,
+        )
+
+    image_bytes, boxes, missing = asyncio.run(scenario())
+
+    assert image_bytes == images.get_image("IMG-001")
+    assert boxes.to_dicts() == labels.get_annotations("IMG-001").to_dicts()
+    assert isinstance(missing, ImageNotFoundError)
@@ -0,0 +1,114 @@
+"""Tests for viewer renditions and disk cache"""
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.infrastructure.disk_cache import DiskCache
+from app.providers.local_fs import LocalFSImageProvider
+from app.services import renditions
+from app.services.renditions import RenditionService
+from app.utils.exceptions import InvalidFormatError
+
+
+@pytest.fixture
+def rendition_service(tmp_path):
+    images_dir = tmp_path / "data" / "images"
+    images_dir.mkdir(parents=True)
+    pixels = np.random.default_rng(0).integers(0, 255, size=(300, 520, 3), dtype=np.uint8)
+    Image.fromarray(pixels).save(images_dir / "SLIDE-1.png")
+    cache = DiskCache(tmp_path / "cache", max_bytes=10 * 1024 * 1024)
+    return RenditionService(LocalFSImageProvider(data_path=tmp_path / "data"), cache, tile_size=128)
+
+
+def test_levels_halve_until_single_tile(rendition_service):
+    levels = rendition_service.levels("SLIDE-1")
+    assert [(item["width"], item["height"]) for item in levels] == [
+        (520, 300),
+        (260, 150),
+        (130, 75),
+        (65, 38),
+    ]
+    assert levels[0]["cols"] == 5 and levels[0]["rows"] == 3
+
+
+def test_rendition_is_generated_once_and_cached(rendition_service):
+    first = rendition_service.get_rendition("SLIDE-1", level=1, image_format="jpeg", quality=70)
+    mtime = first.stat().st_mtime_ns
+    with Image.open(first) as image:
+        assert image.size == (260, 150)
+        assert image.format == "JPEG"
+
+    second = rendition_service.get_rendition("SLIDE-1", level=1, image_format="jpeg", quality=70)
+    assert second == first
+    assert second.stat().st_mtime_ns >= mtime
+
+    by_size = rendition_service.get_rendition("SLIDE-1", size=100)
+    with Image.open(by_size) as image:
+        assert max(image.size) == 100
+
+
+def test_tile_sizes_at_edges(rendition_service):
+    tile = rendition_service.get_tile("SLIDE-1", 0, 4, 2)
+    with Image.open(tile) as image:
+        assert image.size == (520 - 4 * 128, 300 - 2 * 128)
+    with pytest.raises(InvalidFormatError):
+        rendition_service.get_tile("SLIDE-1", 0, 5, 0)
+
+
+def test_tile_misses_decode_the_source_once(rendition_service, monkeypatch):
+    decodes = []
+    reader_class = renditions.ImageRegionReader
+
+    def counting_reader(*args):
+        decodes.append(args)
+        return reader_class(*args)
+
+    monkeypatch.setattr(renditions, "ImageRegionReader", counting_reader)
+    for col in range(5):
+        rendition_service.get_tile("SLIDE-1", 0, col, 0)
+    rendition_service.get_tile("SLIDE-1", 1, 0, 0)
+
+    assert len(decodes) == 1
+
+
+def test_pregenerate_counts_tiles(rendition_service):
+    counters = rendition_service.pregenerate(["SLIDE-1"], levels=[2, 3], tiles=True)
+    assert counters == {"images": 1, "renditions": 2, "tiles": 3}
+
+
+def test_cli_pregeneration_uses_server_settings(rendition_service, tmp_path, monkeypatch):
+    from app.cli import main
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "RENDITION_CACHE_PATH", str(tmp_path / "cli-cache"))
+    monkeypatch.setattr(settings, "IMAGE_MAX_DECODED_PIXELS", 1000)
+
+    with pytest.raises(InvalidFormatError):
+        main(["renditions", "--data-path", str(tmp_path / "data"), "--levels", "0", "--tiles"])
+    assert renditions.build_rendition_service(LocalFSImageProvider())._cache.name == "renditions"
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(tmp_path / "cache", max_bytes=250)
+    old = cache.put("old", b"x" * 100)
+    recent = cache.put("recent", b"y" * 100)
+    os.utime(old, (1_000, 1_000))
+    os.utime(recent, (2_000, 2_000))
+    cache.put("new", b"z" * 100)
+
+    assert not old.exists()
+    assert cache.get("recent") is not None
+    assert cache.get("new") is not None
+    assert cache.size_bytes() <= 250
+
+
+def test_disk_cache_rescans_entries_of_other_workers(tmp_path):
+    cache = DiskCache(tmp_path / "cache", max_bytes=250, rescan_s=0.0)
+    other = DiskCache(tmp_path / "cache", max_bytes=250)
+    cache.put("first", b"x" * 100)
+    other.put("second", b"y" * 100)
+    cache.put("third", b"z" * 100)
+
+    assert DiskCache(tmp_path / "cache", max_bytes=250).size_bytes() <= 250
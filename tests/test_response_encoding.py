@@ -0,0 +1,91 @@
+"""Tests for compact response encoding and compression"""
+from app.services.payloads import shape_analysis_payload
+
+RESULT = {
+    "image_id": "IMG-1",
+    "expert_boxes": [{"class_id": 0, "x_center": 0.5, "y_center": 0.5, "width": 0.1, "height": 0.1}],
+    "model_boxes": [
+        {"class_id": 0, "x_center": 0.5, "y_center": 0.5, "width": 0.1, "height": 0.1, "score": 0.9},
+        {"class_id": 1, "x_center": 0.2, "y_center": 0.2, "width": 0.1, "height": 0.1, "score": 0.4},
+    ],
+    "matches": [{"pred_index": 0, "gt_index": 0, "iou": 1.0}],
+    "stats": {"tp": 1},
+}
+
+
+def test_columnar_layout_uses_parallel_arrays():
+    payload = shape_analysis_payload(RESULT, layout="columnar")
+    assert payload["layout"] == "columnar"
+    assert payload["model_boxes"]["score"] == [0.9, 0.4]
+    assert payload["model_boxes"]["count"] == 2
+    assert "score" not in payload["expert_boxes"]
+    assert payload["matches"] == {"pred_index": [0], "gt_index": [0], "iou": [1.0], "count": 1}
+
+
+def test_projection_skips_boxes():
+    assert shape_analysis_payload(RESULT, include_boxes=False) == {"image_id": "IMG-1", "stats": {"tp": 1}}
+    assert shape_analysis_payload(RESULT, fields={"stats"}) == {"image_id": "IMG-1", "stats": {"tp": 1}}
+
+
+def test_analysis_endpoint_projection(dataset_client):
+    stats_only = dataset_client.get("/api/v1/analysis/IMG-000?include_boxes=false")
+    assert stats_only.status_code == 200
+    assert set(stats_only.json()) == {"image_id", "stats", "image_url"}
+
+    columnar = dataset_client.get("/api/v1/analysis/IMG-000?layout=columnar")
+    assert columnar.json()["model_boxes"]["count"] == 2
+
+    export = dataset_client.get("/api/v1/analysis/dataset/export?format=csv")
+    assert export.status_code == 200
+    assert export.headers["etag"]
+
+    image = dataset_client.get("/api/v1/images/IMG-000/file", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in image.headers
+
+
+def test_gzip_middleware_encodes_large_json():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.utils.compression import CompressionMiddleware
+    from app.utils.responses import ORJSONResponse
+
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/big")
+    async def big():
+        return ORJSONResponse({"values": list(range(1000))})
+
+    @app.get("/small")
+    async def small():
+        return ORJSONResponse({"ok": True})
+
+    client = TestClient(app)
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert response.json()["values"][-1] == 999
+
+    response = client.get("/big", headers={"Accept-Encoding": "br, gzip"})
+    assert response.headers["content-encoding"] in ("br", "gzip")
+
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+
+def test_encoded_variants_share_a_weak_etag_and_vary(dataset_client):
+    url = "/api/v1/analysis/dataset"
+    identity = dataset_client.get(url, headers={"Accept-Encoding": "identity"})
+    encoded = dataset_client.get(url, headers={"Accept-Encoding": "gzip"})
+
+    assert identity.headers["etag"].startswith('W/"')
+    assert encoded.headers["etag"] == identity.headers["etag"]
+    for response in (identity, encoded):
+        assert "accept-encoding" in response.headers["vary"].lower()
+
+    revalidated = dataset_client.get(
+        url, headers={"Accept-Encoding": "gzip", "If-None-Match": identity.headers["etag"]}
+    )
+    assert revalidated.status_code == 304
+    assert "accept-encoding" in revalidated.headers["vary"].lower()
@@ -0,0 +1,145 @@
+"""Sampled dataset stats with confidence intervals"""
+import json
+
+import numpy as np
+import pytest
+
+from app.core.sampling import SampledStats, sample_order, wilson_interval
+from app.infrastructure.model_runner import StubModelRunner
+from app.providers.local_fs import LocalFSAnnotationProvider, LocalFSImageProvider
+from app.services.model_worker import ModelWorker
+from app.utils.exceptions import AnnotationNotFoundError, InvalidFormatError
+
+IDS = [f"IMG-{index:04d}" for index in range(1000)]
+
+
+def _population(size: int = 2000, seed: int = 3) -> np.ndarray:
+    """Per-image (tp, predictions, expert boxes) with image-level variation"""
+    rng = np.random.default_rng(seed)
+    gt = rng.integers(1, 8, size=size)
+    pred = gt + rng.integers(-1, 3, size=size).clip(min=-gt + 1)
+    rate = rng.beta(8, 2, size=size)
+    tp = np.minimum(rng.binomial(gt, rate), pred)
+    return np.stack([tp, pred, gt], axis=1)
+
+
+def test_sample_order_is_deterministic_and_independent_of_listing():
+    first = sample_order(IDS, seed=7)
+
+    assert sample_order(list(reversed(IDS)), seed=7) == first
+    assert sorted(first) == IDS
+    assert first != IDS
+    assert sample_order(IDS, seed=8) != first
+
+
+def test_stratified_prefixes_are_proportional():
+    strata = {image_id: ("rare" if index % 10 == 0 else "common") for index, image_id in enumerate(IDS)}
+
+    order = sample_order(IDS, seed=1, strata=strata)
+
+    assert sorted(order) == IDS
+    for prefix in (20, 100, 500):
+        rare = sum(strata[image_id] == "rare" for image_id in order[:prefix])
+        assert abs(rare - prefix / 10) <= 1
+
+
+def test_wilson_interval():
+    low, high = wilson_interval(80, 100, 0.95)
+
+    assert low == pytest.approx(0.7112, abs=1e-3)
+    assert high == pytest.approx(0.8666, abs=1e-3)
+    assert wilson_interval(0, 0, 0.95) == (0.0, 1.0)
+
+
+@pytest.mark.parametrize("method", ["wilson", "bootstrap"])
+def test_intervals_narrow_and_cover_the_full_dataset_value(method):
+    counts = _population()
+    tp, pred, gt = counts.sum(axis=0)
+    truth = {"precision": tp / pred, "recall": tp / gt, "f1": 2 * tp / (pred + gt)}
+    order = np.random.default_rng(1).permutation(len(counts))
+    sampled = SampledStats(len(counts), iou_threshold=0.5, class_aware=True)
+    widths = []
+    for prefix in (100, 400, 1600):
+        while len(sampled) < prefix:
+            sampled.add(*counts[order[len(sampled)]])
+        summary = sampled.summary(method=method, resamples=500, seed=1)
+        widths.append(summary["max_half_width"])
+        for metric, interval in summary["intervals"].items():
+            assert interval["low"] <= truth[metric] <= interval["high"]
+
+    assert widths[0] > widths[1] > widths[2]
+    assert sampled.summary(method=method, resamples=500, seed=1) == summary
+
+
+def test_full_sample_collapses_the_interval():
+    counts = _population(size=50)
+    sampled = SampledStats(len(counts), iou_threshold=0.5, class_aware=True)
+    for row in counts:
+        sampled.add(*row)
+
+    summary = sampled.summary(method="bootstrap", resamples=200)
+
+    assert summary["fraction"] == 1.0
+    for metric, interval in summary["intervals"].items():
+        assert interval["low"] == interval["high"] == summary["stats"][metric]
+
+
+def _worker(data_path) -> ModelWorker:
+    return ModelWorker(
+        LocalFSImageProvider(data_path=data_path),
+        LocalFSAnnotationProvider(data_path=data_path),
+        StubModelRunner(),
+        read_ahead=2,
+    )
+
+
+def test_worker_sample_matches_full_analysis(tiny_dataset):
+    worker = _worker(tiny_dataset)
+
+    snapshots = list(worker.sample_dataset(seed=3, stratify=True, report_every=2))
+
+    assert [snapshot["sample_count"] for snapshot in snapshots] == [0, 2, 4]
+    assert [snapshot["done"] for snapshot in snapshots] == [False, False, True]
+    assert snapshots[-1]["stop_reason"] == "sample_exhausted"
+    assert snapshots[-1]["stats"] == worker.analyze_dataset()["stats"]
+    assert list(worker.sample_dataset(seed=3, stratify=True, report_every=2)) == snapshots
+    with pytest.raises(InvalidFormatError):
+        next(worker.sample_dataset(confidence=1.5))
+
+
+def test_missing_annotations_fail_like_full_analysis(tiny_dataset):
+    (tiny_dataset / "labels" / "IMG-002.txt").unlink()
+    worker = _worker(tiny_dataset)
+
+    with pytest.raises(AnnotationNotFoundError):
+        worker.analyze_dataset()
+    with pytest.raises(AnnotationNotFoundError):
+        list(worker.sample_dataset())
+    # Stratifying reads every label up front, so it fails before any snapshot.
+    with pytest.raises(AnnotationNotFoundError):
+        next(worker.sample_dataset(stratify=True))
+
+
+def test_sample_endpoint(dataset_client):
+    response = dataset_client.get(
+        "/api/v1/analysis/dataset/sample",
+        params={"size": 3, "seed": 5, "method": "bootstrap", "resamples": 200},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["sample_count"] == 3
+    assert body["done"] and body["image_count"] == 4
+    assert response.headers["ETag"]
+
+    streamed = dataset_client.get(
+        "/api/v1/analysis/dataset/sample",
+        params={"size": 3, "seed": 5, "method": "bootstrap", "resamples": 200, "report_every": 1, "stream": True},
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert streamed.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in streamed.text.splitlines()]
+    assert [line["sample_count"] for line in lines] == [0, 1, 2, 3]
+    assert lines[-1] == body
+
+    assert dataset_client.get("/api/v1/analysis/dataset/sample", params={"confidence": 0}).status_code == 400
+    assert dataset_client.get("/api/v1/analysis/dataset/sample", params={"resamples": 10**9}).status_code == 400
@@ -0,0 +1,105 @@
+"""Sharded evaluation: shard specs, partial serialization and exact merges"""
+import json
+import shutil
+
+import pytest
+
+from app.core.sharding import ShardSpec, check_complete, merge_partials, parse_shard
+from app.infrastructure.model_runner import StubModelRunner
+from app.providers.local_fs import LocalFSAnnotationProvider, LocalFSImageProvider
+from app.services.model_worker import ModelWorker
+from app.utils.exceptions import InvalidFormatError
+
+IMAGE_IDS = [f"IMG-{index:03d}" for index in range(10)]
+
+
+def _worker(data_path):
+    return ModelWorker(
+        LocalFSImageProvider(data_path=data_path),
+        LocalFSAnnotationProvider(data_path=data_path),
+        StubModelRunner(),
+    )
+
+
+def test_parse_shard_and_select():
+    assert parse_shard("2/4") == ShardSpec(index=2, count=4)
+    assert parse_shard("IMG-003:IMG-005").select(IMAGE_IDS) == ["IMG-003", "IMG-004"]
+    assert parse_shard(":IMG-002").select(reversed(IMAGE_IDS)) == ["IMG-000", "IMG-001"]
+    assert str(parse_shard("IMG-008:")) == "IMG-008:"
+
+    selected = [parse_shard(f"{index}/3").select(IMAGE_IDS) for index in range(3)]
+    assert sorted(sum(selected, [])) == IMAGE_IDS
+    for spec in ("1/3", "IMG-003:IMG-005", ":IMG-002", "IMG-008:"):
+        shard = parse_shard(spec)
+        assert list(shard.iter_select(iter(IMAGE_IDS))) == shard.select(IMAGE_IDS)
+
+    for invalid in ("3/3", "1/0", "a/b", "IMG-5:IMG-1", "IMG-1"):
+        with pytest.raises(InvalidFormatError):
+            parse_shard(invalid)
+    with pytest.raises(InvalidFormatError):
+        check_complete([ShardSpec(0, 3), ShardSpec(2, 3)])
+    check_complete([parse_shard(spec) for spec in ("IMG-005:", ":IMG-003", "IMG-003:IMG-005")])
+    for overlapping in ((":IMG-004", "IMG-003:"), ("IMG-001:", "IMG-005:IMG-007"), (":IMG-002", ":IMG-004")):
+        with pytest.raises(InvalidFormatError):
+            check_complete([parse_shard(spec) for spec in overlapping])
+
+
+def test_merged_partials_equal_single_run(tiny_dataset):
+    worker = _worker(tiny_dataset)
+    thresholds = [0.3, 0.5, 0.75]
+    full = worker.evaluate_dataset(iou_threshold=0.3, thresholds=thresholds)
+
+    partials = [
+        worker.evaluate_partial(parse_shard(f"{index}/3"), iou_threshold=0.3, thresholds=thresholds)
+        for index in range(3)
+    ]
+    # Partials travel as JSON between machines.
+    merged = merge_partials(json.loads(json.dumps(partials)))
+
+    full.pop("processed_count")
+    assert merged.to_dict() == full
+    assert [row["iou_threshold"] for row in full["thresholds"]] == thresholds
+    with pytest.raises(InvalidFormatError):
+        merge_partials(partials[:2])
+
+
+def test_evaluation_endpoint_partials_merge(dataset_client):
+    full = dataset_client.get("/api/v1/analysis/dataset/evaluation").json()
+    partials = [
+        dataset_client.get(
+            "/api/v1/analysis/dataset/evaluation", params={"shard": f"{index}/2", "partial": True}
+        ).json()
+        for index in range(2)
+    ]
+
+    merged = dataset_client.post("/api/v1/analysis/dataset/evaluation/merge", json={"partials": partials})
+
+    assert merged.status_code == 200
+    assert merged.json() == full
+    assert dataset_client.get("/api/v1/analysis/dataset/evaluation", params={"shard": "5/2"}).status_code == 400
+    assert dataset_client.get("/api/v1/analysis/dataset/evaluation", params={"partial": True}).status_code == 400
+    rejected = dataset_client.post("/api/v1/analysis/dataset/evaluation/merge", json={"partials": partials[:1]})
+    assert rejected.status_code == 400
+    no_shard = [{key: value for key, value in partial.items() if key != "shard"} for partial in partials]
+    rejected = dataset_client.post("/api/v1/analysis/dataset/evaluation/merge", json={"partials": no_shard})
+    assert rejected.status_code == 400
+
+
+def test_missing_images_directory_is_404(dataset_client, tiny_dataset):
+    shutil.rmtree(tiny_dataset / "images")
+
+    assert dataset_client.get("/api/v1/analysis/dataset/evaluation", params={"shard": "0/2"}).status_code == 404
+    assert dataset_client.get("/api/v1/analysis/dataset/export", params={"format": "csv"}).status_code == 404
+
+
+def test_local_sharded_launcher(tiny_dataset, monkeypatch):
+    from app.cli import run_sharded
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "MODEL_RUNNER", "stub")
+    report = run_sharded(3, 2, data_path=str(tiny_dataset), iou_threshold=0.3)
+
+    full = _worker(tiny_dataset).evaluate_dataset(iou_threshold=0.3)
+    assert report["shards"] == ["0/3", "1/3", "2/3"]
+    for key in ("image_count", "class_aware", "class_agnostic", "per_class", "confusion_matrix"):
+        assert report[key] == full[key]
@@ -0,0 +1,167 @@
+"""Single-flight coalescing of identical in-flight computations"""
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from app.services.columnar_export import columnar_available
+from app.utils.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_computation():
+    flight = SingleFlight("test")
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        time.sleep(0.05)
+        return {"value": value}
+
+    async def scenario():
+        same = [flight.run("a", lambda: compute("a")) for _ in range(5)]
+        other = flight.run("b", lambda: compute("b"))
+        return await asyncio.gather(*same, other)
+
+    results = asyncio.run(scenario())
+
+    assert sorted(calls) == ["a", "b"]
+    assert all(result is results[0] for result in results[:5])
+    assert results[5] == {"value": "b"}
+    assert len(flight) == 0
+
+
+def test_errors_reach_every_caller_and_key_is_released():
+    flight = SingleFlight("test")
+    calls = []
+
+    def failing():
+        calls.append(1)
+        time.sleep(0.02)
+        raise ValueError("boom")
+
+    async def scenario():
+        results = await asyncio.gather(*(flight.run("k", failing) for _ in range(3)), return_exceptions=True)
+        again = await flight.run("k", lambda: "fresh")
+        return results, again
+
+    results, again = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert all(isinstance(result, ValueError) for result in results)
+    assert again == "fresh"
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    flight = SingleFlight("test")
+    release = threading.Event()
+
+    async def scenario():
+        leader = asyncio.ensure_future(flight.run("k", lambda: release.wait(1) and "done"))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(flight.run("k", lambda: "not called"))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        release.set()
+        return await follower
+
+    assert asyncio.run(scenario()) == "done"
+
+
+@pytest.mark.parametrize(
+    "path, expected_predictions",
+    [("/api/v1/analysis/IMG-001", 1), ("/api/v1/analysis/dataset", 4)],
+)
+def test_identical_requests_run_inference_once(dataset_client, monkeypatch, path, expected_predictions):
+    app = dataset_client.app
+    runner = app.state.model_loader.wait(5)
+    predict = runner.predict
+    calls = []
+
+    def slow_predict(image_bytes):
+        calls.append(1)
+        time.sleep(0.05)
+        return predict(image_bytes)
+
+    monkeypatch.setattr(runner, "predict", slow_predict)
+
+    async def scenario():
+        async with httpx.AsyncClient(app=app, base_url="http://testserver") as client:
+            # Different response shaping still shares the computation.
+            params = [{}, {"include_boxes": "false"}, {"layout": "columnar"}, {}]
+            return await asyncio.gather(*(client.get(path, params=query) for query in params))
+
+    responses = asyncio.run(scenario())
+
+    assert [response.status_code for response in responses] == [200] * 4
+    assert len(calls) == expected_predictions
+    assert responses[0].json() == responses[3].json()
+
+
+def test_shared_result_is_cleaned_up_after_the_last_caller():
+    cleaned = []
+
+    async def scenario():
+        flight = SingleFlight("test")
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            release.wait(1)
+            return "archive"
+
+        async def use(hold: float):
+            async with flight.shared("k", compute, cleaned.append) as result:
+                await asyncio.sleep(hold)
+                assert cleaned == []
+                return result
+
+        users = [asyncio.ensure_future(use(hold)) for hold in (0.0, 0.05)]
+        await asyncio.sleep(0.01)
+        release.set()
+        results = await asyncio.gather(*users)
+        return calls, results
+
+    calls, results = asyncio.run(scenario())
+
+    assert calls == [1]
+    assert results == ["archive", "archive"]
+    assert cleaned == ["archive"]
+
+
+@pytest.mark.parametrize(
+    "export_format",
+    ["csv", pytest.param("parquet", marks=pytest.mark.skipif(not columnar_available(), reason="pyarrow missing"))],
+)
+def test_identical_exports_run_inference_once(dataset_client, monkeypatch, tmp_path, export_format):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "EXPORT_TMP_PATH", str(tmp_path / "exports"))
+    (tmp_path / "exports").mkdir()
+    app = dataset_client.app
+    runner = app.state.model_loader.wait(5)
+    predict = runner.predict
+    calls = []
+
+    def slow_predict(image_bytes):
+        calls.append(1)
+        time.sleep(0.05)
+        return predict(image_bytes)
+
+    monkeypatch.setattr(runner, "predict", slow_predict)
+
+    async def scenario():
+        async with httpx.AsyncClient(app=app, base_url="http://testserver") as client:
+            params = {"format": export_format}
+            requests = [client.get("/api/v1/analysis/dataset/export", params=params) for _ in range(3)]
+            return await asyncio.gather(*requests)
+
+    responses = asyncio.run(scenario())
+
+    assert [response.status_code for response in responses] == [200] * 3
+    assert len(calls) == 4
+    assert responses[0].content == responses[2].content
+    # Every response removed its link and the shared archive went with the last one.
+    assert list((tmp_path / "exports").iterdir()) == []
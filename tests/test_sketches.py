@@ -0,0 +1,117 @@
+"""Mergeable quantile sketches and histograms of dataset distributions"""
+import json
+
+import numpy as np
+import pytest
+
+from app.core.boxes import BoxSet
+from app.core.matcher import match_boxes
+from app.core.sketches import DistributionSketches, Histogram, QuantileSketch
+from app.infrastructure.model_runner import StubModelRunner
+from app.providers.local_fs import LocalFSAnnotationProvider, LocalFSImageProvider
+from app.services.model_worker import ModelWorker
+
+QS = np.linspace(0.01, 0.99, 99)
+
+
+def _rank_error(sketch: QuantileSketch, values: np.ndarray) -> float:
+    ordered = np.sort(values)
+    estimates = np.asarray(sketch.quantiles(QS))
+    return float(np.abs(np.searchsorted(ordered, estimates) / len(values) - QS).max())
+
+
+def test_small_streams_are_exact():
+    values = np.random.default_rng(0).random(150)
+    sketch = QuantileSketch()
+    for chunk in np.array_split(values, 30):
+        sketch.add(chunk)
+
+    assert sketch.quantiles([0.0, 0.5, 1.0]) == [values.min(), np.sort(values)[74], values.max()]
+    assert QuantileSketch().quantiles([0.5]) == [None]
+
+
+def test_memory_is_fixed_and_rank_error_small():
+    values = np.random.default_rng(1).lognormal(size=200_000)
+    sketch = QuantileSketch(k=200)
+    for chunk in np.array_split(values, 20_000):
+        sketch.add(chunk)
+
+    assert sketch.count == len(values)
+    assert sum(len(level) for level in sketch._levels) < 3 * 200
+    assert _rank_error(sketch, values) < 0.02
+    assert (sketch.min, sketch.max) == (values.min(), values.max())
+
+
+def test_merged_partials_match_the_whole_stream():
+    values = np.random.default_rng(2).normal(size=160_000)
+    parts = []
+    for part in np.array_split(values, 16):
+        sketch = QuantileSketch()
+        for chunk in np.array_split(part, 500):
+            sketch.add(chunk)
+        # Partials travel as JSON between shards and workers.
+        parts.append(QuantileSketch.from_state(json.loads(json.dumps(sketch.to_state()))))
+
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+
+    assert merged.count == len(values)
+    assert _rank_error(merged, values) < 0.02
+
+
+def test_histogram_clips_to_end_bins():
+    histogram = Histogram([0.0, 0.5, 1.0])
+    histogram.add([-1.0, 0.0, 0.49, 0.5, 1.0, 3.0])
+
+    assert histogram.counts.tolist() == [3, 3]
+
+
+def test_distribution_sketches_per_class():
+    pred = BoxSet([0, 0, 1], [[0.5, 0.5, 0.2, 0.2], [0.1, 0.1, 0.1, 0.1], [0.8, 0.8, 0.1, 0.2]], [0.9, 0.3, 0.6])
+    gt = BoxSet([0, 1], [[0.5, 0.5, 0.2, 0.2], [0.3, 0.3, 0.1, 0.1]])
+    sketches = DistributionSketches()
+
+    sketches.add(pred, gt, match_boxes(pred, gt, iou_threshold=0.5, class_aware=True))
+    result = sketches.to_dict()
+
+    assert result["iou"]["all"]["count"] == 1
+    assert result["iou"]["all"]["quantiles"]["p50"] == 1.0
+    assert result["tp_score"]["all"]["max"] == np.float32(0.9)
+    assert sorted(result["fp_score"]["all"]["histogram"]) == [0] * 18 + [1, 1]
+    fp_by_class = {row["class_id"]: row["count"] for row in result["fp_score"]["per_class"]}
+    assert fp_by_class == {0: 1, 1: 1}
+    assert result["expert_area"]["all"]["count"] == 2
+    assert result["model_area"]["per_class"][1]["max"] == pytest.approx(0.02)
+
+    restored = DistributionSketches.from_state(json.loads(json.dumps(sketches.to_state())))
+    assert restored.to_dict() == result
+
+
+def test_analyze_dataset_reports_distributions(tiny_dataset):
+    worker = ModelWorker(
+        LocalFSImageProvider(data_path=tiny_dataset),
+        LocalFSAnnotationProvider(data_path=tiny_dataset),
+        StubModelRunner(),
+    )
+
+    assert "distributions" not in worker.analyze_dataset()
+    result = worker.analyze_dataset(distributions=True)
+
+    distributions = result["distributions"]
+    assert distributions["iou"]["all"]["count"] == result["stats"]["tp"]
+    assert distributions["fp_score"]["all"]["count"] == result["stats"]["fp"]
+    assert distributions["expert_area"]["all"]["count"] == result["stats"]["expert_count"]
+    assert sum(distributions["model_area"]["all"]["histogram"]) == result["stats"]["model_count"]
+
+
+def test_image_values_rebuild_the_sketches():
+    pred = BoxSet([0, 0, 1], [[0.5, 0.5, 0.2, 0.2], [0.1, 0.1, 0.1, 0.1], [0.8, 0.8, 0.1, 0.2]], [0.9, 0.3, 0.6])
+    gt = BoxSet([0, 1], [[0.5, 0.5, 0.2, 0.2], [0.3, 0.3, 0.1, 0.1]])
+    matches = match_boxes(pred, gt, iou_threshold=0.5, class_aware=True)
+    direct, rebuilt = DistributionSketches(), DistributionSketches()
+
+    direct.add(pred, gt, matches)
+    rebuilt.add_values(json.loads(json.dumps(DistributionSketches.image_values(pred, gt, matches))))
+
+    assert rebuilt.to_state() == direct.to_state()
@@ -0,0 +1,84 @@
+"""Tests for tiled inference over large images"""
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.core.boxes import BoxSet
+from app.core.nms import nms
+from app.infrastructure.image_regions import ImageRegionReader, tile_boxes
+from app.infrastructure.model_runner import OnnxModelRunner
+from app.utils.exceptions import InvalidFormatError
+
+
+def _encode(pixels: np.ndarray, image_format: str) -> bytes:
+    output = BytesIO()
+    Image.fromarray(pixels).save(output, format=image_format)
+    return output.getvalue()
+
+
+def test_tile_boxes_cover_image_with_overlap():
+    boxes = list(tile_boxes(500, 300, 128, 32))
+    assert boxes[0] == (0, 0, 128, 128)
+    assert max(box[2] for box in boxes) == 500
+    assert max(box[3] for box in boxes) == 300
+    assert all(box[2] - box[0] == 128 and box[3] - box[1] == 128 for box in boxes)
+
+
+def test_region_reader_matches_full_decode():
+    pixels = np.random.default_rng(0).integers(0, 255, size=(150, 210, 3), dtype=np.uint8)
+    for image_format, lazy in (("TIFF", True), ("PNG", False)):
+        reader = ImageRegionReader(_encode(pixels, image_format))
+        assert reader.lazy is lazy
+        for x0, y0, x1, y1 in tile_boxes(210, 150, 64, 16):
+            region = np.asarray(reader.read((x0, y0, x1, y1)))
+            assert np.array_equal(region, pixels[y0:y1, x0:x1])
+
+
+def test_region_reader_16bit_and_decode_limit():
+    pixels = np.random.default_rng(1).integers(0, 65535, size=(60, 80), dtype=np.uint16)
+    output = BytesIO()
+    Image.fromarray(pixels, "I;16").save(output, format="TIFF")
+    reader = ImageRegionReader(output.getvalue())
+
+    assert reader.lazy
+    region = np.asarray(reader.read((10, 20, 50, 60)))
+    assert np.array_equal(region[..., 0], (pixels[20:60, 10:50] >> 8).astype(np.uint8))
+
+    png = _encode(np.zeros((60, 80, 3), dtype=np.uint8), "PNG")
+    assert ImageRegionReader(png, max_decoded_pixels=4800).read((0, 0, 8, 8)).size == (8, 8)
+    with pytest.raises(InvalidFormatError):
+        ImageRegionReader(png, max_decoded_pixels=4799).read((0, 0, 8, 8))
+
+
+def test_nms_is_class_aware():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 10, 10], [0, 0, 10, 10]], dtype=np.float32)
+    scores = np.array([0.9, 0.8, 0.7])
+    assert nms(boxes, scores, 0.5).tolist() == [0]
+    assert nms(boxes, scores, 0.5, class_ids=np.array([0, 0, 1])).tolist() == [0, 2]
+
+
+def test_predict_tiled_returns_normalized_global_boxes(tiny_onnx_model_dynamic_batch):
+    pixels = np.random.default_rng(2).integers(0, 255, size=(100, 140, 3), dtype=np.uint8)
+    runner = OnnxModelRunner(
+        tiny_onnx_model_dynamic_batch,
+        img_size=32,
+        conf_threshold=0.0,
+        letterbox=False,
+        tile_size=48,
+        tile_overlap=8,
+        tile_batch_size=3,
+    )
+    boxes = runner.predict(_encode(pixels, "TIFF"))
+
+    assert len(boxes) > 0
+    assert boxes.score is not None
+    assert np.all((boxes.xywh[:, :2] >= 0.0) & (boxes.xywh[:, :2] <= 1.0))
+    assert np.all(boxes.xywh[:, 2:] > 0)
+
+
+def test_predict_tiled_with_fixed_batch_model(tiny_onnx_model):
+    pixels = np.random.default_rng(3).integers(0, 255, size=(80, 80, 3), dtype=np.uint8)
+    runner = OnnxModelRunner(tiny_onnx_model, img_size=32, conf_threshold=0.0, tile_size=48)
+    assert isinstance(runner.predict(_encode(pixels, "PNG")), BoxSet)